@@ -0,0 +1,297 @@
+# benchmarks/run.py
+#
+# Microbenchmarks for the analysis engines, on synthetic inputs only:
+#
+#   python -m benchmarks.run                                  # everything, JSON to stdout
+#   python -m benchmarks.run --only balance gaze --output bench.json
+#   python -m benchmarks.run --only middleware                # old vs new request middleware
+#   python -m benchmarks.run --model-path outputs/wav2vec2_full_20250516-042720
+#
+# Each case reports p50/p95/p99 latency (ms), throughput (calls/s) and peak
+# memory: the largest Python/NumPy allocation peak seen by tracemalloc during
+# one call, plus the process max RSS. Compare two JSON files between releases
+# to spot regressions.
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+import numpy as np
+from benchmarks import synthetic
+
+SUITES = ("speech", "balance", "gaze", "middleware")
+
+
+def measure(name: str, fn: Callable, repeats: int, warmup: int = 3, memory_calls: int = 3, **params) -> Dict:
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        call_start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows allocations down, so it stays out of the timings
+    tracemalloc.start()
+    peak = 0
+    for _ in range(memory_calls):
+        tracemalloc.reset_peak()
+        fn()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    result = {
+        "name": name,
+        "params": params,
+        "repeats": repeats,
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(np.mean(latencies)), 4),
+        "throughput_per_s": round(repeats / elapsed, 2),
+        "peak_traced_mb": round(peak / 2**20, 3),
+        "max_rss_mb": round(_max_rss_bytes() / 2**20, 1),
+    }
+    print(f"⏱️ {name} {params}: p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+          f"{result['throughput_per_s']}/s peak={result['peak_traced_mb']}MiB", file=sys.stderr)
+    return result
+
+def _max_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+# === Suites ===
+def bench_speech(args) -> List[Dict]:
+    from service.ml import analyze_speech_file, load_model, preprocess_audio_from_bytes
+
+    model_path, tiny_model = args.model_path, False
+    if not (model_path and os.path.isdir(model_path)):
+        model_path, tiny_model = synthetic.tiny_speech_model_dir(), True
+    processor, model, device = load_model(model_path)
+    if tiny_model:
+        shutil.rmtree(model_path, ignore_errors=True)
+
+    results = []
+    for seconds in (2.0, 4.2, 10.0, 30.0):
+        audio = synthetic.speech_wav_bytes(seconds)
+        results.append(measure("speech.preprocess_audio_from_bytes", lambda: preprocess_audio_from_bytes(audio),
+                               args.repeats, seconds=seconds))
+
+    audio = synthetic.speech_wav_bytes(4.2)
+    results.append(measure("speech.analyze_speech_file", lambda: analyze_speech_file(audio, processor, model, device),
+                           args.repeats, seconds=4.2, windowed=False))
+    audio = synthetic.speech_wav_bytes(20.0)
+    results.append(measure("speech.analyze_speech_file",
+                           lambda: analyze_speech_file(audio, processor, model, device, windowed=True),
+                           max(1, args.repeats // 4), seconds=20.0, windowed=True))
+    return results
+
+def bench_balance(args) -> List[Dict]:
+    from service.balance import analyze_balance, analyze_balance_batch
+
+    results = []
+    for samples in (100, 1_000, 10_000, 100_000):
+        accel, gyro = synthetic.balance_session(samples)
+        results.append(measure("balance.analyze_balance", lambda: analyze_balance(accel, gyro),
+                               args.repeats, samples=samples))
+
+    # Request-body decoding: JSON via SensorData vs the packed binary format
+    from pydantic import BaseModel
+    from utils.sensor_codec import decode_sensor_payload, encode_raw
+
+    class SensorData(BaseModel):
+        # Mirrors routes/detection.SensorData without importing the app settings
+        accel: List[List[float]]
+        gyro: List[List[float]]
+
+    accel, gyro = synthetic.balance_session(10_000)
+    json_body = json.dumps({"accel": accel.tolist(), "gyro": gyro.tolist()}).encode()
+    raw_body = encode_raw(accel, gyro, 50.0)
+    results.append(measure("balance.decode_json", lambda: SensorData.model_validate_json(json_body),
+                           args.repeats, samples=10_000, body_bytes=len(json_body)))
+    results.append(measure("balance.decode_raw",
+                           lambda: decode_sensor_payload(raw_body, "application/x-imu-f32", 200_000),
+                           args.repeats, samples=10_000, body_bytes=len(raw_body)))
+
+    sessions = [synthetic.balance_session(1_000, seed=i) for i in range(1_000)]
+    accel = np.stack([a for a, _ in sessions])
+    gyro = np.stack([g for _, g in sessions])
+    results.append(measure("balance.analyze_balance_batch", lambda: analyze_balance_batch(accel, gyro),
+                           max(1, args.repeats // 10), sessions=1_000, samples=1_000))
+
+    from service.balance import extract_features_batch
+    extract_features_batch(accel[:1], gyro[:1])  # JIT compile outside the timings
+    results.append(measure("balance.extract_features_batch", lambda: extract_features_batch(accel, gyro),
+                           max(1, args.repeats // 5), sessions=1_000, samples=1_000))
+    return results
+
+def bench_gaze(args) -> List[Dict]:
+    from service.gaze import classify_directions, determine_gaze_direction, gaze_ratios, get_gaze_ratio
+
+    frames = 1_000
+    eye, iris = synthetic.eye_landmarks(frames)
+    frame_shape = (720, 1280, 3)
+
+    def ratios():
+        for i in range(frames):
+            get_gaze_ratio(eye[i], iris[i], frame_shape)
+
+    def directions():
+        # Same per-frame work as the live test: both eyes, averaged, then classified
+        for i in range(frames):
+            left_x, left_y = get_gaze_ratio(eye[i], iris[i], frame_shape)
+            right_x, right_y = get_gaze_ratio(eye[i], iris[i], frame_shape)
+            determine_gaze_direction((left_x + right_x) / 2, (left_y + right_y) / 2)
+
+    # The server path: all frames at once, (frames, 22, 2) in GAZE_LANDMARK_INDICES order
+    points = np.concatenate([eye, eye, iris, iris], axis=1)
+
+    def batch_directions():
+        ratio = gaze_ratios(points)
+        classify_directions(ratio[:, 0], ratio[:, 1])
+
+    return [
+        measure("gaze.get_gaze_ratio", ratios, args.repeats, frames=frames),
+        measure("gaze.frame_direction", directions, args.repeats, frames=frames),
+        measure("gaze.batch_directions", batch_directions, args.repeats, frames=frames),
+    ]
+
+def _legacy_middleware():
+    # The BaseHTTPMiddleware versions middleware.py replaced, kept as the baseline
+    from datetime import datetime, timezone
+    import psutil
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            start = datetime.now(timezone.utc)
+            response = await call_next(request)
+            duration = (datetime.now(timezone.utc) - start).total_seconds()
+            request.app.state.telemetry.push("logs", {
+                "path": request.url.path, "method": request.method, "timestamp": start.isoformat(),
+                "duration": duration, "status_code": response.status_code
+            })
+            return response
+
+    class LegacyProfilingMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            start_time = datetime.now(timezone.utc)
+            process = psutil.Process()
+            cpu_start = psutil.cpu_percent(interval=None)
+            mem_start = process.memory_info().rss / (1024 * 1024)
+            response = await call_next(request)
+            duration = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+            cpu_end = psutil.cpu_percent(interval=None)
+            mem_end = process.memory_info().rss / (1024 * 1024)
+            request.app.state.telemetry.push("profiling", {
+                "time_stamp": start_time.isoformat(), "cpu_usage": (cpu_start + cpu_end) / 2,
+                "memory_usage": (mem_start + mem_end) / 2, "latency_ms": duration, "endpoint": request.url.path
+            })
+            return response
+
+    return LegacyLoggingMiddleware, LegacyProfilingMiddleware
+
+def bench_middleware(args) -> List[Dict]:
+    # Requests through the same middleware stack main.py builds, in process
+    # (httpx ASGITransport): no network or Mongo, so only the stack is measured.
+    import asyncio
+    import httpx
+    from fastapi import FastAPI, File, UploadFile
+    from fastapi.middleware.cors import CORSMiddleware
+    from collections import deque
+    from middleware import LoggingMiddleware, ProfilingMiddleware
+    from service.metrics import ProcessSampler
+
+    class QueueOnlySink:
+        # TelemetrySink.push without the Mongo writer (service.telemetry needs the app settings)
+        def __init__(self):
+            self.records = deque(maxlen=1000)
+
+        def push(self, collection: str, record: Dict):
+            self.records.append((collection, record))
+
+    class NoProfilingSession:
+        # RequestProfiler with no admin session active, its normal state
+        session = None
+
+    def build(logging_cls, profiling_cls):
+        app = FastAPI()
+        app.state.telemetry = QueueOnlySink()
+        app.state.process_sampler = ProcessSampler()  # never started: the last sample is reused
+        app.state.request_profiler = NoProfilingSession()
+
+        @app.get("/ping")
+        async def ping():
+            return {"message": "pong"}
+
+        @app.post("/upload")
+        async def upload(file: UploadFile = File(...)):
+            return {"bytes": len(await file.read())}
+
+        app.add_middleware(logging_cls)
+        app.add_middleware(profiling_cls)
+        app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
+                           allow_methods=["*"], allow_headers=["*"])
+        return app
+
+    upload_mb = 8
+    payload = {"file": ("recording.bin", os.urandom(upload_mb * 1024 * 1024), "application/octet-stream")}
+    loop = asyncio.new_event_loop()
+    results = []
+    try:
+        for label, classes in (("legacy", _legacy_middleware()), ("asgi", (LoggingMiddleware, ProfilingMiddleware))):
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=build(*classes)), base_url="http://bench")
+            results.append(measure(f"middleware.{label}.ping", lambda: loop.run_until_complete(client.get("/ping")),
+                                   args.repeats * 20, memory_calls=1, stack=label))
+            results.append(measure(f"middleware.{label}.upload",
+                                   lambda: loop.run_until_complete(client.post("/upload", files=payload)),
+                                   max(1, args.repeats // 5), memory_calls=1, stack=label, upload_mb=upload_mb))
+            loop.run_until_complete(client.aclose())
+    finally:
+        loop.close()
+    return results
+
+
+def _environment() -> Dict:
+    import torch
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analysis engine microbenchmarks (synthetic inputs)")
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--model-path", default=None, help="Real speech model dir; a tiny random model is used if missing")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    suites = {"speech": bench_speech, "balance": bench_balance, "gaze": bench_gaze, "middleware": bench_middleware}
+    report = {"environment": _environment(), "results": []}
+    for suite in args.only:
+        report["results"].extend(suites[suite](args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,141 @@
+# benchmarks/synthetic.py
+#
+# Deterministic synthetic inputs for the benchmark suite: no network, model
+# download or camera needed.
+
+import io
+import json
+import os
+import tempfile
+import numpy as np
+import soundfile as sf
+
+# === Speech ===
+def speech_wav_bytes(seconds: float, sr: int = 44100, seed: int = 0, lead_silence: float = 0.3) -> bytes:
+    """A voiced-looking WAV: harmonic tone with syllable-rate amplitude modulation plus noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 120 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))  # ~4 syllables per second
+    audio = 0.3 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    audio[:int(lead_silence * sr)] = 0.001 * rng.standard_normal(int(lead_silence * sr))
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio.astype(np.float32), sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+def tiny_speech_model_dir() -> str:
+    """Save a randomly initialised, tiny wav2vec2 classifier + processor to a temp dir.
+
+    Same architecture and preprocessing as the real model, just small enough
+    that the numbers measure our pipeline rather than the transformer.
+    """
+    from transformers import (Wav2Vec2Config, Wav2Vec2CTCTokenizer, Wav2Vec2FeatureExtractor,
+                              Wav2Vec2ForSequenceClassification, Wav2Vec2Processor)
+
+    out = tempfile.mkdtemp(prefix="tiny_wav2vec2_")
+    config = Wav2Vec2Config(
+        hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        conv_dim=(32, 32), conv_stride=(5, 2), conv_kernel=(10, 3),
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2, num_labels=2,
+    )
+    Wav2Vec2ForSequenceClassification(config).eval().save_pretrained(out)
+
+    vocab_path = os.path.join(out, "bench_vocab.json")
+    with open(vocab_path, "w") as f:
+        json.dump({"<pad>": 0, "<unk>": 1, "|": 2}, f)
+    feature_extractor = Wav2Vec2FeatureExtractor(
+        feature_size=1, sampling_rate=16000, padding_value=0.0, do_normalize=True, return_attention_mask=True,
+    )
+    Wav2Vec2Processor(feature_extractor=feature_extractor, tokenizer=Wav2Vec2CTCTokenizer(vocab_path)).save_pretrained(out)
+    return out
+
+
+# === Balance ===
+def balance_session(samples: int, sway: float = 0.02, seed: int = 0):
+    """(accel, gyro) arrays shaped (samples, 3): slow postural sway plus sensor noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples) / 50.0  # 50 Hz IMU
+    drift = sway * np.stack([np.sin(2 * np.pi * 0.3 * t), np.cos(2 * np.pi * 0.2 * t), np.zeros_like(t)], axis=1)
+    accel = drift + rng.normal(0, sway, size=(samples, 3))
+    gyro = rng.normal(0, sway / 2, size=(samples, 3))
+    return accel, gyro
+
+
+# === Gaze ===
+def eye_landmarks(frames: int, seed: int = 0):
+    """Per-frame (eye, iris) pixel landmarks shaped (frames, 6, 2) and (frames, 5, 2)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(200, 400, size=(frames, 1, 2))
+    eye_offsets = np.array([[-30, 0], [-15, -8], [15, -8], [30, 0], [15, 8], [-15, 8]], dtype=float)
+    eye = np.rint(centers + eye_offsets + rng.normal(0, 1, size=(frames, 6, 2))).astype(int)
+    gaze = rng.uniform(-20, 20, size=(frames, 1, 2)) * np.array([1, 0.3])
+    iris_offsets = np.array([[0, 0], [4, 0], [0, -4], [-4, 0], [0, 4]], dtype=float)
+    iris = np.rint(centers + gaze + iris_offsets).astype(int)
+    return eye, iris
+
+def gaze_video(path: str, fps: float = 30.0, seconds_per_direction: float = 1.0, size=(640, 480),
+               miss=(), reaction_s: float = 0.3, seed: int = 0):
+    """Write a gaze-test video of a drawn face and return its instruction schedule.
+
+    Each of the 8 directions is shown for `seconds_per_direction`; the eyes
+    look at the centre for `reaction_s`, then follow the instruction unless it
+    is in `miss`. Read it back with marker_landmarker() in place of FaceMesh.
+    """
+    import cv2
+    from service.gaze import DIRECTION_VECTORS, DIRECTIONS
+
+    rng = np.random.default_rng(seed)
+    order = list(DIRECTIONS)
+    rng.shuffle(order)
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    schedule = []
+    per_direction = int(round(seconds_per_direction * fps))
+    for n, direction in enumerate(order):
+        schedule.append({"direction": direction, "start_s": n * per_direction / fps,
+                         "end_s": (n + 1) * per_direction / fps})
+        for i in range(per_direction):
+            dx, dy = (0, 0) if direction in miss or i < reaction_s * fps else DIRECTION_VECTORS[direction]
+            cx, cy = width // 2 + int(rng.integers(-4, 5)), height // 2 + int(rng.integers(-4, 5))
+            frame = np.zeros((height, width, 3), dtype=np.uint8)
+            cv2.rectangle(frame, (cx - 110, cy - 140), (cx + 110, cy + 140), (90, 90, 90), -1)
+            for ex in (cx - 50, cx + 50):
+                cv2.rectangle(frame, (ex - 30, cy - 60), (ex + 30, cy - 20), (255, 255, 255), -1)
+                iris = (ex + int(18 * dx), cy - 40 + int(12 * dy))
+                cv2.circle(frame, iris, 5, (0, 0, 255), -1)
+            writer.write(frame)
+    writer.release()
+    return schedule
+
+def marker_landmarker():
+    """Landmarker for gaze_video() frames (service/gaze_video.py interface)."""
+    def detect(rgb: np.ndarray):
+        height, width = rgb.shape[:2]
+        face = rgb.max(axis=2) > 40
+        white = rgb.min(axis=2) > 180
+        red = (rgb[..., 0] > 150) & (rgb[..., 1] < 100)
+        if not white.any() or not red.any():
+            return None
+        ys, xs = np.nonzero(face)
+        box = np.array([xs.min() / width, ys.min() / height, (xs.max() + 1) / width, (ys.max() + 1) / height])
+
+        wy, wx = np.nonzero(white | red)
+        middle = (wx.min() + wx.max()) / 2
+        eyes, irises = [], []
+        for side in (wx < middle, wx >= middle):
+            x0, x1, y0, y1 = wx[side].min(), wx[side].max(), wy[side].min(), wy[side].max()
+            ym = (y0 + y1) / 2
+            third = (x1 - x0) / 3
+            eyes.append([(x0, ym), (x0 + third, y0), (x1 - third, y0), (x1, ym), (x1 - third, y1), (x0 + third, y1)])
+            ry, rx = np.nonzero(red[y0:y1 + 1, x0:x1 + 1])
+            if not len(rx):
+                return None
+            ix, iy = rx.mean() + x0, ry.mean() + y0
+            irises.append([(ix, iy), (ix + 4, iy), (ix, iy - 4), (ix - 4, iy), (ix, iy + 4)])
+        gaze = np.array(eyes[0] + eyes[1] + irises[0] + irises[1], dtype=np.float64) / np.array([width, height])
+        return gaze, box
+
+    return detect
@@ -20,6 +20,75 @@ class Settings(BaseSettings):
     MODEL_BUCKET: str
     MODEL_PREFIX: str
     MODEL_LOCAL_PATH: str
+    MODEL_SYNC_WORKERS: int = 8
+
+    # 🎤 Speech inference micro-batching
+    SPEECH_BATCH_MAX_SIZE: int = 8
+    SPEECH_BATCH_MAX_WAIT_MS: float = 10.0
+
+    # 🧵 Where speech decoding + inference run: "thread" or "process"
+    SPEECH_EXECUTOR: str = "thread"
+    SPEECH_EXECUTOR_WORKERS: int = 0  # 0 = one per CPU core
+
+    # 🧠 Speech inference backend: "torch" (fp32), "int8" (dynamic quantization) or "onnx"
+    SPEECH_BACKEND: str = "torch"
+    # Memory-map the fp32 weights from safetensors so uvicorn/executor workers share one copy
+    SPEECH_WEIGHTS_MMAP: bool = False
+
+    # 🪟 Windowed analysis of long recordings
+    SPEECH_WINDOW_HOP_SEC: float = 2.1
+    SPEECH_MAX_WINDOWS: int = 8
+
+    # 🗂️ Batch speech endpoint limits
+    SPEECH_BATCH_MAX_FILES: int = 200
+    SPEECH_BATCH_MAX_UNCOMPRESSED_MB: int = 512
+    SPEECH_BATCH_MAX_FILE_MB: int = 64  # per recording, uploaded or inside the archive
+    SPEECH_BATCH_IN_FLIGHT: int = 16  # recordings read into memory at once
+
+    # 🔇 Voice-activity gate: trim silence, reject uploads with too little speech
+    SPEECH_VAD_ENABLED: bool = True
+    SPEECH_MIN_VOICED_SEC: float = 0.5
+
+    # ⚖️ Balance uploads (JSON or packed binary, see utils/sensor_codec.py)
+    BALANCE_MODEL_PATH: str = "outputs/balance_classifier.json"  # threshold rules if missing
+    BALANCE_MAX_SAMPLES: int = 200_000
+    BALANCE_NUMBA_THREADING: str = "omp tbb workqueue"  # numba threading layers by preference, applied at startup
+    BALANCE_STREAM_EMIT_EVERY: int = 50  # samples between metric pushes on /ws/analyze_balance
+
+    # 📼 Long recordings (/api/v1/balance_jobs): streamed to disk, analyzed chunk by chunk
+    BALANCE_JOB_DIR: str = "data/balance_jobs"
+    BALANCE_JOB_MAX_MB: int = 2048
+    BALANCE_JOB_MEMORY_MB: int = 64  # working-set ceiling per running job
+    BALANCE_JOB_CONCURRENCY: int = 1
+    BALANCE_JOB_KEEP_FILES: bool = False
+
+    # 👁️ Gaze test uploads (/api/v1/analyze_gaze)
+    GAZE_MAX_FRAMES: int = 3600
+    GAZE_VIDEO_WORKERS: int = 2  # FaceMesh processes, started on the first video upload
+    GAZE_VIDEO_MAX_MB: int = 200
+    GAZE_VIDEO_MAX_SKIP: int = 8  # frames skipped at most while the gaze holds steady
+
+    # 📈 /metrics process gauges
+    METRICS_SAMPLE_INTERVAL_S: float = 5.0
+
+    # 🔬 Admin request profiling (/api/v1/admin/profiling)
+    PROFILING_REFRESH_S: float = 5.0  # how often workers pick up session changes
+
+    # 📝 Request logs/profiles, written to Mongo in batches behind the response
+    TELEMETRY_MAX_QUEUE: int = 10_000  # oldest records are dropped beyond this
+    TELEMETRY_BATCH_SIZE: int = 500
+    TELEMETRY_FLUSH_INTERVAL_MS: float = 1000.0  # at least 10
+    TELEMETRY_DRAIN_TIMEOUT_S: float = 10.0  # shutdown waits this long for queued records
+    TELEMETRY_RAW_RETENTION_HOURS: float = 48  # raw logs/profiling are time-series, expired after this
+    TELEMETRY_ROLLUP_RETENTION_DAYS: int = 90  # per-minute summaries (request_rollups) outlive the raw data
+    TELEMETRY_ROLLUP_INTERVAL_S: float = 60.0
+    TELEMETRY_ROLLUP_DELAY_S: float = 30.0  # wait for write-behind records before closing a minute
+
+    # 🗃️ Result cache for retried analyses
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    RESULT_CACHE_TTL_SECONDS: int = 3600
+    RESULT_CACHE_SHARED: bool = False  # also share results across workers via Mongo
 
     class Config:
         env_file = ".env.local"
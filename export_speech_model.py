@@ -0,0 +1,141 @@
+# export_speech_model.py
+#
+# Offline tooling for the speech inference backends (see service/backends.py).
+#
+#   python export_speech_model.py export  --model-path outputs/wav2vec2_full_20250516-042720
+#   python export_speech_model.py compare --model-path outputs/wav2vec2_full_20250516-042720 --audio samples/*.wav
+#   python export_speech_model.py safetensors --model-path outputs/wav2vec2_full_20250516-042720
+#
+# `compare` loads every backend in its own fresh process, checks its logits
+# against plain fp32 PyTorch and reports latency and memory, so a backend can
+# be picked per deployment with SPEECH_BACKEND.
+
+import argparse
+import glob
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+import numpy as np
+import psutil
+from service.ml import MAX_LENGTH, MODEL_PATH, TARGET_SR, load_model, preprocess_audio
+from service.backends import BACKENDS, default_onnx_path, export_onnx
+
+
+def _load_inputs(audio_globs, num_samples: int, seed: int) -> np.ndarray:
+    paths = sorted(p for pattern in audio_globs for p in glob.glob(pattern))
+    if paths:
+        return np.stack([preprocess_audio(p) for p in paths[:num_samples]])
+    # No recordings given: fall back to noise, which is enough for a numeric parity check
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.1, size=(num_samples, MAX_LENGTH)).astype(np.float32)
+
+
+def _run_backend(model_path: str, backend: str, audio: np.ndarray, batch_size: int, repeats: int):
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    load_start = time.perf_counter()
+    processor, model, _ = load_model(model_path, backend=backend)
+    load_s = time.perf_counter() - load_start
+    rss_loaded = process.memory_info().rss
+
+    def forward(batch):
+        inputs = processor(list(batch), sampling_rate=TARGET_SR, return_tensors="pt", padding=True)
+        return model.logits(inputs).cpu().numpy()
+
+    logits = np.concatenate([forward(audio[i:i + batch_size]) for i in range(0, len(audio), batch_size)])
+
+    latencies = []
+    for _ in range(repeats):
+        for i in range(0, len(audio), batch_size):
+            start = time.perf_counter()
+            forward(audio[i:i + batch_size])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 3),
+        "model_rss_mb": round((rss_loaded - rss_before) / (1024 * 1024), 1),
+        "peak_rss_mb": round(process.memory_info().rss / (1024 * 1024), 1),
+        "batch_size": batch_size,
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+        "logits": logits,
+    }
+
+
+def compare(args):
+    audio = _load_inputs(args.audio, args.samples, args.seed)
+    reports = []
+    for backend in args.backends:
+        # Fresh process per backend so RSS numbers aren't polluted by the previous one
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+            reports.append(pool.submit(
+                _run_backend, args.model_path, backend, audio, args.batch_size, args.repeats
+            ).result())
+
+    reference = next((r["logits"] for r in reports if r["backend"] == "torch"), None)
+    for report in reports:
+        logits = report.pop("logits")
+        if reference is not None:
+            report["max_abs_logit_diff"] = round(float(np.max(np.abs(logits - reference))), 5)
+            report["label_agreement"] = round(float(np.mean(logits.argmax(-1) == reference.argmax(-1))), 4)
+            report["parity_ok"] = report["max_abs_logit_diff"] <= args.tolerance or report["backend"] == "torch"
+
+    print(f"{'backend':<8}{'load_s':>8}{'rss_mb':>9}{'p50_ms':>9}{'p95_ms':>9}{'max_diff':>10}{'agree':>8}")
+    for r in reports:
+        print(f"{r['backend']:<8}{r['load_s']:>8}{r['model_rss_mb']:>9}{r['latency_ms_p50']:>9}"
+              f"{r['latency_ms_p95']:>9}{r.get('max_abs_logit_diff', '-'):>10}{r.get('label_agreement', '-'):>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"samples": len(audio), "tolerance": args.tolerance, "backends": reports}, f, indent=2)
+        print(f"📝 Report written to {args.json}")
+
+    if not all(r.get("parity_ok", True) for r in reports):
+        raise SystemExit("❌ Parity check failed")
+
+
+def export(args):
+    _, model, _ = load_model(args.model_path, backend="torch")
+    output = args.output or default_onnx_path(args.model_path)
+    export_onnx(model.model, output, num_samples=MAX_LENGTH, opset=args.opset)
+    print(f"✅ Exported ONNX model to {output}")
+
+
+def safetensors(args):
+    # Rewrite the checkpoint as model.safetensors so SPEECH_WEIGHTS_MMAP can map it
+    _, model, _ = load_model(args.model_path, backend="torch")
+    model.model.to("cpu").save_pretrained(args.model_path, safe_serialization=True)
+    print(f"✅ Saved safetensors weights to {args.model_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and compare speech inference backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Export the wav2vec2 classifier to ONNX")
+    p_export.add_argument("--model-path", default=MODEL_PATH)
+    p_export.add_argument("--output", default=None, help="Defaults to <model-path>/model.onnx")
+    p_export.add_argument("--opset", type=int, default=17)
+    p_export.set_defaults(func=export)
+
+    p_safetensors = sub.add_parser("safetensors", help="Save the checkpoint as safetensors for SPEECH_WEIGHTS_MMAP")
+    p_safetensors.add_argument("--model-path", default=MODEL_PATH)
+    p_safetensors.set_defaults(func=safetensors)
+
+    p_compare = sub.add_parser("compare", help="Parity, latency and memory per backend")
+    p_compare.add_argument("--model-path", default=MODEL_PATH)
+    p_compare.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    p_compare.add_argument("--audio", nargs="*", default=[], help="Audio files/globs to use as inputs")
+    p_compare.add_argument("--samples", type=int, default=16)
+    p_compare.add_argument("--batch-size", type=int, default=1)
+    p_compare.add_argument("--repeats", type=int, default=5)
+    p_compare.add_argument("--tolerance", type=float, default=0.1, help="Max allowed |logit - fp32 logit|")
+    p_compare.add_argument("--seed", type=int, default=0)
+    p_compare.add_argument("--json", default=None, help="Also write the report as JSON")
+    p_compare.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,54 @@
+# gaze_video_test.py
+#
+# Runs the gaze test on a recorded video, headless, the way
+# /api/v1/analyze_gaze/video does, and reports frames processed per second:
+#
+#   python gaze_video_test.py recording.mp4 --schedule schedule.json --workers 4
+#
+# schedule.json lists what was on screen when:
+#   [{"direction": "Left", "start_s": 0.0, "end_s": 2.0}, ...]
+# `--synthetic` draws a test video instead and reads it with a marker
+# detector, so the pipeline can be exercised without a face or FaceMesh.
+
+import argparse
+import json
+import os
+import tempfile
+from service.gaze_video import DEFAULT_LANDMARKER, GazeVideoPool, analyze_gaze_video
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless gaze test on a video file")
+    parser.add_argument("video", nargs="?", help="Recorded video (any format OpenCV reads)")
+    parser.add_argument("--schedule", help="JSON instruction schedule for the video")
+    parser.add_argument("--synthetic", action="store_true", help="Generate and analyze a synthetic video")
+    parser.add_argument("--miss", nargs="*", default=[], help="Directions the synthetic eyes never follow")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-skip", type=int, default=8)
+    args = parser.parse_args()
+
+    landmarker = DEFAULT_LANDMARKER
+    if args.synthetic:
+        from benchmarks.synthetic import gaze_video
+        args.video = os.path.join(tempfile.mkdtemp(prefix="gaze-"), "synthetic.mp4")
+        schedule = gaze_video(args.video, miss=args.miss)
+        landmarker = "benchmarks.synthetic:marker_landmarker"
+    elif args.video and args.schedule:
+        with open(args.schedule) as f:
+            schedule = json.load(f)
+    else:
+        parser.error("Pass a video and --schedule, or --synthetic")
+
+    pool = GazeVideoPool(args.workers, landmarker)
+    pool.start()
+    try:
+        summary = analyze_gaze_video(args.video, schedule, pool, max_skip=args.max_skip)
+    finally:
+        pool.shutdown()
+
+    video = summary.pop("video")
+    print(f"👁️ {summary['notes']} ({summary['result']})")
+    for direction, score in summary["directions"].items():
+        print(f"   {'✅' if score['matched'] else '❌'} {direction:<10} {score['matched_frames']}/{score['frames']} frames")
+    print(f"⏱️ {video['frames_analyzed']} of {video['frames_read']} frames analyzed in {video['elapsed_s']}s: "
+          f"{video['frames_per_s']} frames/s, {video['realtime_factor']}x realtime")
@@ -10,38 +10,189 @@ from routes.assitance import router as assistance_router
 from routes.auth import router as auth_router
 from routes.detection import router as detection_router
 from routes.patient import router as patient_router
-from service.ml import load_model
+from routes.stats import router as stats_router
+from routes.balance_jobs import router as balance_jobs_router
+from routes.profiling import router as profiling_router
+from routes.telemetry import router as telemetry_router
+from service.executor import SpeechExecutor
+from service.batcher import SpeechBatcher
+from service.cache import ResultCache
+from service.balance_model import load_balance_classifier
+from service.balance_jobs import BalanceJobRunner
+from service.gaze_video import GazeVideoPool
+from service.telemetry import TelemetrySink
+from service.telemetry_rollup import TelemetryRollup, ensure_telemetry_collections
+from service.metrics import ProcessSampler, render_metrics
+from service.profiling_sessions import RequestProfiler
 from utils.gcs_downloader import download_folder
+from utils.artifact_sync import is_usable
 from config import settings
-import os
+from fastapi.responses import JSONResponse, Response
+import asyncio
+import numba
+import time
 
 MODEL_BUCKET = settings.MODEL_BUCKET
 MODEL_PREFIX = settings.MODEL_PREFIX
 MODEL_LOCAL_PATH = settings.MODEL_LOCAL_PATH
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Load
-    await connect_to_mongo()
-
-    # ✅ Download model files from GCS if not already present
-    if not os.path.exists(MODEL_LOCAL_PATH):
-        print("📦 Model not found locally. Downloading from GCS...")
+def download_model_artifacts():
+    # ✅ Sync model files from GCS; only new, changed or half-downloaded files are fetched
+    try:
         download_folder(
             bucket_name=MODEL_BUCKET,
             prefix=MODEL_PREFIX,
-            local_dir=MODEL_LOCAL_PATH
+            local_dir=MODEL_LOCAL_PATH,
+            max_workers=settings.MODEL_SYNC_WORKERS
+        )
+    except Exception as e:
+        if not is_usable(MODEL_LOCAL_PATH):
+            raise
+        # GCS unreachable, but a complete local copy exists: keep serving it
+        print("⚠️ Model sync failed, using local copy:", str(e))
+
+async def timed_phase(app: FastAPI, phase: str, awaitable):
+    start = time.perf_counter()
+    result = await awaitable
+    app.state.startup_timings[phase] = round(time.perf_counter() - start, 3)
+    print(f"⏱️ Startup phase '{phase}' took {app.state.startup_timings[phase]}s")
+    return result
+
+async def connect_database(app: FastAPI):
+    await connect_to_mongo()
+
+    # ✅ Content-addressed cache for retried analyses
+    app.state.result_cache = ResultCache(
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+        ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+        shared_collection="analysis_cache" if settings.RESULT_CACHE_SHARED else None
+    )
+    await app.state.result_cache.ensure_indexes()
+
+    # ✅ Time-series logs/profiling with retention, before the first telemetry flush
+    await ensure_telemetry_collections(
+        raw_retention_s=int(settings.TELEMETRY_RAW_RETENTION_HOURS * 3600),
+        rollup_retention_s=settings.TELEMETRY_ROLLUP_RETENTION_DAYS * 86400
+    )
+
+async def prepare_speech_model(app: FastAPI):
+    # Download -> load -> warm-up must stay in order; Mongo connects alongside
+    try:
+        await timed_phase(app, "model_download", asyncio.to_thread(download_model_artifacts))
+        await timed_phase(app, "model_load", asyncio.to_thread(app.state.speech_executor.start))
+        await timed_phase(app, "model_warmup", app.state.speech_executor.warm_up())
+        app.state.speech_ready = True
+        print("✅ Speech model ready")
+    except Exception as e:
+        app.state.speech_error = str(e)
+        print("❌ Speech model failed to load:", str(e))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.startup_timings = {}
+    app.state.speech_ready = False
+    app.state.speech_error = None
+    startup = time.perf_counter()
+
+    # ✅ Balance kernels are launched from request threads (asyncio.to_thread), and
+    # TBB pools started off the main thread hang interpreter exit: prefer OpenMP.
+    # Must happen before the first parallel kernel (the balance model warm-up).
+    numba.config.THREADING_LAYER_PRIORITY = settings.BALANCE_NUMBA_THREADING.split()
+
+    # ✅ Request logs/profiles are batched and written behind the response
+    app.state.telemetry = TelemetrySink(
+        max_queue=settings.TELEMETRY_MAX_QUEUE,
+        batch_size=settings.TELEMETRY_BATCH_SIZE,
+        flush_interval_ms=settings.TELEMETRY_FLUSH_INTERVAL_MS,
+        drain_timeout_s=settings.TELEMETRY_DRAIN_TIMEOUT_S
+    )
+    app.state.telemetry.start()
+
+    # ✅ Speech model runs in the configured worker pool (off the event loop)
+    app.state.speech_executor = SpeechExecutor(
+        kind=settings.SPEECH_EXECUTOR,
+        model_path="outputs/wav2vec2_full_20250516-042720",
+        workers=settings.SPEECH_EXECUTOR_WORKERS,
+        backend=settings.SPEECH_BACKEND,
+        mmap_weights=settings.SPEECH_WEIGHTS_MMAP,
+        min_voiced_sec=settings.SPEECH_MIN_VOICED_SEC if settings.SPEECH_VAD_ENABLED else None
+    )
+
+    # ✅ Micro-batch concurrent speech requests into shared forward passes
+    app.state.speech_batcher = SpeechBatcher(
+        app.state.speech_executor,
+        max_batch_size=settings.SPEECH_BATCH_MAX_SIZE,
+        max_wait_ms=settings.SPEECH_BATCH_MAX_WAIT_MS
+    )
+    app.state.speech_batcher.start()
+
+    # Model download/load/warm-up carries on in the background after we start
+    # serving; /readyz reports when it is done.
+    model_task = asyncio.create_task(prepare_speech_model(app))
+    try:
+        # ✅ Balance classifier is small: load it (and compile its feature kernel) before serving
+        _, app.state.balance_classifier = await asyncio.gather(
+            timed_phase(app, "mongo", connect_database(app)),
+            timed_phase(app, "balance_model", asyncio.to_thread(load_balance_classifier, settings.BALANCE_MODEL_PATH)),
+        )
+
+        # ✅ Background analysis of uploaded long recordings
+        app.state.balance_jobs = BalanceJobRunner(
+            lambda: app.state.balance_classifier,
+            concurrency=settings.BALANCE_JOB_CONCURRENCY,
+            memory_budget_mb=settings.BALANCE_JOB_MEMORY_MB,
+            keep_files=settings.BALANCE_JOB_KEEP_FILES
+        )
+        await app.state.balance_jobs.ensure_indexes()
+        await app.state.balance_jobs.resume()
+
+        # ✅ Per-minute request summaries from the raw telemetry
+        app.state.telemetry_rollup = TelemetryRollup(
+            interval_s=settings.TELEMETRY_ROLLUP_INTERVAL_S,
+            delay_s=settings.TELEMETRY_ROLLUP_DELAY_S,
+            backfill_s=settings.TELEMETRY_RAW_RETENTION_HOURS * 3600
         )
-    else:
-        print("✅ Model already present locally.")
-    # ✅ Load speech model once
-    processor, model, device = load_model("outputs/wav2vec2_full_20250516-042720")
-    app.state.processor = processor
-    app.state.model = model
-    app.state.device = device
-    
+        app.state.telemetry_rollup.start()
+
+        # ✅ CPU/RSS and component counters for /metrics, sampled on a timer
+        app.state.process_sampler = ProcessSampler(settings.METRICS_SAMPLE_INTERVAL_S, sources={
+            "result_cache": app.state.result_cache.stats,
+            "speech_batcher": app.state.speech_batcher.stats,
+            "speech_gate": app.state.speech_executor.gate_stats,
+            "telemetry": app.state.telemetry.stats,
+            "telemetry_rollup": app.state.telemetry_rollup.stats,
+        })
+        app.state.process_sampler.start()
+
+        # ✅ Admin request profiling; follows the active session in Mongo
+        app.state.request_profiler = RequestProfiler(settings.PROFILING_REFRESH_S)
+        app.state.request_profiler.start()
+
+        # ✅ FaceMesh workers for video gaze tests; started on the first upload
+        app.state.gaze_video_pool = GazeVideoPool(settings.GAZE_VIDEO_WORKERS)
+        print(f"⏱️ Serving after {time.perf_counter() - startup:.2f}s")
+    except BaseException:
+        # Startup failed (e.g. Mongo unreachable): don't leave the model
+        # download/load running in a process that will never serve
+        model_task.cancel()
+        await asyncio.gather(model_task, return_exceptions=True)
+        await app.state.speech_batcher.stop()
+        app.state.speech_executor.shutdown()
+        await close_mongo_connection()
+        raise
+
     yield
     # Clean up
+    model_task.cancel()
+    await app.state.balance_jobs.stop()
+    app.state.gaze_video_pool.shutdown()
+    await app.state.speech_batcher.stop()
+    app.state.speech_executor.shutdown()
+    await app.state.telemetry_rollup.stop()
+    await app.state.telemetry.stop()
+    await app.state.process_sampler.stop()
+    await app.state.request_profiler.stop()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -71,7 +222,34 @@ app.include_router(assistance_router)
 app.include_router(auth_router)
 app.include_router(detection_router)
 app.include_router(patient_router)
+app.include_router(stats_router)
+app.include_router(balance_jobs_router)
+app.include_router(profiling_router)
+app.include_router(telemetry_router)
+
+# 📈 Prometheus scrape target (all workers when PROMETHEUS_MULTIPROC_DIR is set)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/ping")
 async def root():
-    return {"message": "pong"}
\ No newline at end of file
+    return {"message": "pong"}
+
+# 💓 Liveness: the process is up and serving
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+# 🚦 Readiness: the speech model is loaded and warmed up
+@app.get("/readyz")
+async def readyz():
+    body = {
+        "status": "ready" if app.state.speech_ready else "starting",
+        "startup_timings": app.state.startup_timings,
+    }
+    if app.state.speech_error:
+        body["status"] = "failed"
+        body["error"] = app.state.speech_error
+    return JSONResponse(status_code=200 if app.state.speech_ready else 503, content=body)
\ No newline at end of file
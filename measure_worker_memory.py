@@ -0,0 +1,59 @@
+# measure_worker_memory.py
+#
+# Reports per-process memory for a running server so SPEECH_WEIGHTS_MMAP can be
+# compared against private per-worker weights:
+#
+#   uvicorn main:app --workers 4 &
+#   python measure_worker_memory.py --pid <uvicorn master pid>
+#
+# RSS counts shared pages once per process, so it overstates the total.
+# USS is memory unique to a process (what killing it would free), and PSS
+# splits shared pages evenly between the processes mapping them; the PSS sum
+# is the real footprint of the server.
+
+import argparse
+import json
+import psutil
+
+
+def _collect(root: psutil.Process, include_root: bool):
+    processes = root.children(recursive=True)
+    if include_root:
+        processes = [root] + processes
+
+    rows = []
+    for proc in processes:
+        try:
+            mem = proc.memory_full_info()
+            rows.append({
+                "pid": proc.pid,
+                "name": proc.name(),
+                "rss_mb": round(mem.rss / 2**20, 1),
+                "uss_mb": round(mem.uss / 2**20, 1),
+                "pss_mb": round(getattr(mem, "pss", 0) / 2**20, 1),
+                "shared_mb": round(getattr(mem, "shared", 0) / 2**20, 1),
+            })
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-worker USS/PSS memory report")
+    parser.add_argument("--pid", type=int, required=True, help="Server master process id")
+    parser.add_argument("--no-root", action="store_true", help="Only report child (worker) processes")
+    parser.add_argument("--json", default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    rows = _collect(psutil.Process(args.pid), include_root=not args.no_root)
+    totals = {key: round(sum(r[key] for r in rows), 1) for key in ("rss_mb", "uss_mb", "pss_mb")}
+
+    print(f"{'pid':>8} {'name':<16}{'rss_mb':>10}{'uss_mb':>10}{'pss_mb':>10}{'shared_mb':>11}")
+    for r in rows:
+        print(f"{r['pid']:>8} {r['name'][:15]:<16}{r['rss_mb']:>10}{r['uss_mb']:>10}{r['pss_mb']:>10}{r['shared_mb']:>11}")
+    print(f"{'total':>8} {'':<16}{totals['rss_mb']:>10}{totals['uss_mb']:>10}{totals['pss_mb']:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"processes": rows, "totals": totals}, f, indent=2)
+        print(f"📝 Report written to {args.json}")
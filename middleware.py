@@ -1,50 +1,90 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 from datetime import datetime, timezone
-from db.collections import get_collection
-import psutil
+import time
+from service.metrics import observe_request, route_label
+from service.profiling import activate_capture, reset_capture
+
+# Records go to app.state.telemetry (service/telemetry.py), which writes them
+# to Mongo in the background; the response never waits on the insert. Both
+# land in time-series collections keyed on the route template, rolled up per
+# minute by service/telemetry_rollup.py.
+#
+# Both are plain ASGI middleware: they only wrap `send` to see the status
+# line, so request and response bodies (uploads, StreamingResponse) pass
+# straight through without the extra task and memory stream that
+# BaseHTTPMiddleware puts around every request.
+
+def _capture_status(send, holder: dict):
+    async def send_wrapper(message):
+        if message["type"] == "http.response.start":
+            holder["status_code"] = message["status"]
+        await send(message)
+    return send_wrapper
 
 #--> logging
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class LoggingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
         start = datetime.now(timezone.utc)
-        response = await call_next(request)
-        duration = (datetime.now(timezone.utc) - start).total_seconds()
-
-        logs_collection = get_collection("logs")
-        await logs_collection.insert_one({
-            "path": request.url.path,
-            "method": request.method,
-            "timestamp": start.isoformat(),
-            "duration": duration,
-            "status_code": response.status_code
-        })
-        return response
-    
-#--> Profiling
-class ProfilingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = datetime.now(timezone.utc)
-        process = psutil.Process()
-        cpu_start = psutil.cpu_percent(interval=None)
-        mem_start = process.memory_info().rss / (1024 * 1024)
+        started = time.perf_counter()
+        response = {"status_code": 500}  # if the app raises before responding
+        try:
+            await self.app(scope, receive, _capture_status(send, response))
+        finally:
+            scope["app"].state.telemetry.push("logs", {
+                "path": scope["path"],
+                "route": route_label(scope),
+                "method": scope["method"],
+                "timestamp": start,
+                "duration": time.perf_counter() - started,
+                "status_code": response["status_code"]
+            })
 
-        response = await call_next(request)
+#--> Profiling
+# Feeds the per-route histograms behind /metrics. CPU/memory come from the
+# last ProcessSampler reading (service/metrics.py) rather than psutil calls
+# on every request.
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
 
-        end_time = datetime.now(timezone.utc)
-        duration = (end_time - start_time).total_seconds() * 1000  # in milliseconds
-        cpu_end = psutil.cpu_percent(interval=None)
-        mem_end = process.memory_info().rss / (1024 * 1024)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
 
-        profiling_data = {
-            "time_stamp":start_time.isoformat(),
-            "cpu_usage":(cpu_start + cpu_end) / 2,
-            "memory_usage":(mem_start + mem_end) / 2,
-            "latency_ms":duration,
-            "endpoint":request.url.path
-        }
+        state = scope["app"].state
+        # Admin profiling sessions (service/profiling.py); nothing to do while none is active
+        capture = token = None
+        if state.request_profiler.session is not None:
+            capture = await state.request_profiler.begin(scope)
+            if capture is not None:
+                token = activate_capture(capture)
 
-        profiling_collection = get_collection("profiling")
-        await profiling_collection.insert_one(profiling_data)
+        start_time = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        response = {"status_code": 500}
+        try:
+            await self.app(scope, receive, _capture_status(send, response))
+        finally:
+            duration = time.perf_counter() - started
+            route = route_label(scope)
+            observe_request(scope["method"], route, response["status_code"], duration)
+            if capture is not None:
+                reset_capture(token)
+                await state.request_profiler.finish(capture, response["status_code"], duration * 1000)
 
-        return response
+            sample = state.process_sampler.latest
+            profiling_data = {
+                "time_stamp":start_time,
+                "cpu_usage":sample["cpu_percent"],
+                "memory_usage":sample["rss_mb"],
+                "latency_ms":duration * 1000,
+                "endpoint":scope["path"],
+                "route":route,
+                "method":scope["method"]
+            }
+            state.telemetry.push("profiling", profiling_data)
@@ -1,7 +1,7 @@
 # models/detection.py
 
 from datetime import datetime, timezone
-from typing import Optional, Literal, List
+from typing import Dict, Optional, Literal, List
 from bson import ObjectId
 from pydantic import BaseModel, Field
 
@@ -54,6 +54,12 @@ class DetectionOut(BaseModel):
     overall_result: str
     additional_notes: Optional[str] = None
 
+class SpeechWindowScore(BaseModel):
+    start_s: float
+    end_s: float
+    result: Literal["stroke_detected", "normal"]
+    stroke_probability: float
+
 class SlurredSpeechDetectionOut(BaseModel):
     user_id: str
     username: str
@@ -63,4 +69,26 @@ class SlurredSpeechDetectionOut(BaseModel):
     test_result: DetectionResult
     overall_result: str
     additional_notes: Optional[str] = None
+    windows: Optional[List[SpeechWindowScore]] = None
+
+
+class GazeDirectionScore(BaseModel):
+    frames: int
+    matched_frames: int
+    matched: bool
+
+class GazeDetectionOut(BaseModel):
+    user_id: str
+    username: str
+    input_type: str
+    detected_at: datetime
+    model_version: str
+    test_result: DetectionResult
+    overall_result: str
+    additional_notes: Optional[str] = None
+    matched_directions: int
+    tested_directions: int
+    directions: Dict[str, GazeDirectionScore]
 
+class GazeVideoDetectionOut(GazeDetectionOut):
+    video: Dict[str, float]
@@ -1,8 +1,10 @@
 # models/profiling_model.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Literal, Optional
 from bson import ObjectId
+import fnmatch
+from service.profiling import PROFILED_PATHS
 
 class ProfilingModel(BaseModel):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -13,3 +15,21 @@ class ProfilingModel(BaseModel):
 
     class Config:
         arbitrary_types_allowed = True
+
+# Admin request-profiling session (service/profiling.py)
+class ProfilingSessionIn(BaseModel):
+    route: str = Field("/api/v1/analyze_speech*", description="fnmatch pattern on the request path")
+    every_n: Optional[int] = Field(None, ge=1, description="Profile 1 in N matching requests (per worker)")
+    next_k: Optional[int] = Field(None, ge=1, le=1000, description="Profile the next K matching requests")
+    profiler: Literal["sampling", "cprofile"] = "sampling"
+    interval_ms: float = Field(5.0, ge=0.5, le=1000, description="Stack sampling interval")
+    torch: bool = Field(True, description="Also run the torch profiler around the model stage")
+    ttl_minutes: int = Field(30, ge=1, le=24 * 60)
+
+    @model_validator(mode="after")
+    def one_sampling_rule(self):
+        if (self.every_n is None) == (self.next_k is None):
+            raise ValueError("Set exactly one of every_n or next_k")
+        if not any(fnmatch.fnmatchcase(path, self.route) for path in PROFILED_PATHS):
+            raise ValueError(f"'{self.route}' matches no profiled route; only {list(PROFILED_PATHS)} record profiles")
+        return self
@@ -38,19 +38,18 @@ class UserModel(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
-# Model for user creation (password required)
+# Model for user creation (password required). No role: everyone signs up
+# as a patient, and admin (which unlocks /api/v1/admin/*) is granted in the database
 class UserCreate(BaseModel):
     name: str
     email: EmailStr
     password: str
-    role: Literal["patient", "admin"] = "patient"
     emergency_contacts: List[EmergencyContact] = []
 
 
-# Model for user update (all fields optional)
+# Model for user update (all fields optional; the role can't be self-assigned)
 class UserUpdate(BaseModel):
     name: Optional[str] = None
-    role: Optional[Literal["patient", "admin"]] = None
     emergency_contacts: Optional[List[EmergencyContact]] = None
 
 
@@ -0,0 +1,91 @@
+# routes/balance_jobs.py
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId, errors as bson_errors
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from config import settings
+from service.balance_jobs import BalanceJobRunner, describe_recording
+from utils.jwt import get_current_user
+from utils.uploads import UploadTooLargeError, spool_to_file
+from utils.sensor_codec import MAX_SAMPLE_RATE, NPY_CONTENT_TYPES, RAW_CONTENT_TYPES, SensorPayloadError
+
+router = APIRouter(prefix="/api/v1/balance_jobs", tags=["Detection"])
+
+def _public(job: dict) -> dict:
+    job = {k: v for k, v in job.items() if k not in ("path", "user_id", "windows")}
+    job["job_id"] = str(job.pop("_id"))
+    return job
+
+async def _owned_job(job_id: str, current_user: dict) -> dict:
+    try:
+        job = await BalanceJobRunner.collection().find_one({"_id": ObjectId(job_id)})
+    except bson_errors.InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+    if job is None or job["user_id"] != str(current_user["_id"]):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# 📼 Long recording upload -> background windowed analysis
+# The body is a raw IMU1 file (application/x-imu-f32) or an .npy (application/x-npy),
+# streamed straight to disk; poll GET /{job_id} for progress and results.
+@router.post("", status_code=202)
+async def create_balance_job(
+    request: Request,
+    window_sec: float = Query(10.0, gt=0.5, le=600),
+    sample_rate: Optional[float] = Query(None, gt=0, le=MAX_SAMPLE_RATE, description="Overrides the rate in the file header"),
+    current_user: dict = Depends(get_current_user)
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in RAW_CONTENT_TYPES + NPY_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type '{content_type}'")
+
+    os.makedirs(settings.BALANCE_JOB_DIR, exist_ok=True)
+    path = os.path.join(settings.BALANCE_JOB_DIR, f"{uuid.uuid4().hex}.rec")
+    max_bytes = settings.BALANCE_JOB_MAX_MB * 1024 * 1024
+    try:
+        try:
+            written = await spool_to_file(request.stream(), path, max_bytes)
+        except UploadTooLargeError:
+            raise HTTPException(status_code=413, detail=f"Recording exceeds {settings.BALANCE_JOB_MAX_MB} MB")
+        layout = await asyncio.to_thread(describe_recording, path)
+    except SensorPayloadError as e:
+        os.remove(path)
+        raise HTTPException(status_code=422, detail=str(e))
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    job = {
+        "user_id": str(current_user["_id"]),
+        "username": current_user.get("email", "unknown"),
+        "status": "queued",
+        "created_at": datetime.now(timezone.utc),
+        "path": path,
+        "bytes": written,
+        "samples": layout["samples"],
+        "sample_rate": sample_rate or layout["sample_rate"],
+        "window_sec": window_sec,
+        "progress": 0.0,
+    }
+    result = await BalanceJobRunner.collection().insert_one(job)
+    request.app.state.balance_jobs.submit(result.inserted_id)
+    return {"job_id": str(result.inserted_id), "status": "queued", "samples": layout["samples"]}
+
+@router.get("/{job_id}")
+async def get_balance_job(
+    job_id: str,
+    include_windows: bool = Query(True, description="Include the per-window time series"),
+    current_user: dict = Depends(get_current_user)
+):
+    job = await _owned_job(job_id, current_user)
+    public = _public(job)
+    if include_windows and job["status"] == "done":
+        # Jobs finished before windows moved to their own collection kept them inline
+        public["windows"] = job.get("windows") or await BalanceJobRunner.load_windows(job["_id"])
+    return public
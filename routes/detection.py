@@ -1,41 +1,109 @@
 # routes/detection.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+from typing import Any, List, Literal, Optional, Tuple
 from datetime import datetime, timezone
 from db.collections import get_collection
 import numpy as np
-from utils.mlmodel import analyze_balance
-from service.ml import analyze_speech_file
-from utils.jwt import get_current_user
+from utils.jwt import get_current_user, get_current_user_ws
+from service.ml import TARGET_SR, aggregate_windows
+from service.audio import InsufficientSpeechError
+from service.balance import OnlineBalanceStats
+from service.balance_model import RULES_VERSION, rules_stroke_probability, score_balance
+from service.gaze import DIRECTIONS, analyze_gaze_frames
+from service.gaze_video import Schedule, analyze_gaze_video
+from service.metrics import stage_timer
+from service.profiling import current_capture
+from config import settings
 from bson import Binary
-from models.detection import DetectionOut, SlurredSpeechDetectionOut
+from models.detection import DetectionOut, GazeDetectionOut, GazeVideoDetectionOut, SlurredSpeechDetectionOut
 from fastapi import Request
+from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from utils.uploads import UploadTooLargeError, spool_to_file, upload_chunks
+from utils.sensor_codec import BINARY_CONTENT_TYPES, SensorPayloadError, decode_sensor_payload, validate_sample_rate, validate_sensor_arrays
+import asyncio
+import base64
+import binascii
+import json
+import os
+import shutil
+import tempfile
+import zipfile
 
 router = APIRouter(prefix="/api/v1", tags=["Detection"])
 
+SPEECH_MODEL_VERSION = "v1.0"
+
 # 📈 Balance Analysis
 class SensorData(BaseModel):
     accel: List[List[float]]
     gyro: List[List[float]]
 
 
+async def read_sensor_body(request: Request):
+    """accel/gyro arrays from a JSON (SensorData) or packed binary body; see utils/sensor_codec.py."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "application/json")
+    try:
+        if content_type.split(";")[0].strip().lower() in BINARY_CONTENT_TYPES:
+            return decode_sensor_payload(body, content_type, settings.BALANCE_MAX_SAMPLES)
+        if "json" not in content_type:
+            raise HTTPException(status_code=415, detail=f"Unsupported content type '{content_type}'")
+
+        try:
+            data = SensorData.model_validate_json(body)
+        except ValidationError as e:
+            # Same 422 body FastAPI produced when SensorData was a typed parameter
+            errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            raise RequestValidationError(errors, body=body)
+        accel = np.array(data.accel, dtype=np.float64)
+        gyro = np.array(data.gyro, dtype=np.float64)
+        validate_sensor_arrays(accel, gyro, settings.BALANCE_MAX_SAMPLES)
+        return accel, gyro, None
+    except SensorPayloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 # ⚖️ Balance Test Analysis
-@router.post("/analyze_balance",response_model=DetectionOut)
+@router.post(
+    "/analyze_balance",
+    response_model=DetectionOut,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": SensorData.model_json_schema()},
+        "application/x-imu-f32": {"schema": {"type": "string", "format": "binary"}},
+        "application/x-npy": {"schema": {"type": "string", "format": "binary"}},
+        "application/msgpack": {"schema": {"type": "string", "format": "binary"}},
+    }}},
+)
 async def analyze_balance_endpoint(
-    data: SensorData,
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     user_id = str(current_user["_id"])
     username = current_user.get("email", "unknown")
-    result_data = analyze_balance(np.array(data.accel), np.array(data.gyro))
+    with stage_timer("balance", "decode"):
+        accel, gyro, sample_rate = await read_sensor_body(request)
+
+    # Retried uploads of identical sessions skip the analysis entirely
+    classifier = request.app.state.balance_classifier
+    cache = request.app.state.result_cache
+    cache_key = cache.make_key(
+        "balance", classifier.version, str(sample_rate).encode(),
+        f"{accel.dtype}{accel.shape}".encode(), accel.tobytes(), f"{gyro.dtype}{gyro.shape}".encode(), gyro.tobytes()
+    )
+    result_data = await cache.get(cache_key)
+    if result_data is None:
+        with stage_timer("balance", "forward"):
+            result_data = await asyncio.to_thread(score_balance, classifier, accel, gyro, sample_rate)
+        await cache.set(cache_key, result_data)
 
     detection_doc = {
         "user_id": user_id,
         "username": username,
         "detected_at": datetime.now(timezone.utc),
-        "model_version": "v1.0",
+        "model_version": result_data["model_version"],
         "input_type": "balance",
         "test_result": {
             "confidence_score": result_data["confidence_score"],
@@ -44,7 +112,11 @@ async def analyze_balance_endpoint(
         },
         "overall_result": result_data["result"],
         "additional_notes": result_data.get("notes",None),
+        "stroke_probability": result_data["stroke_probability"],
+        "features": result_data["features"],
     }
+    if sample_rate:
+        detection_doc["sample_rate"] = sample_rate
 
     # try:
     #     parsed_doc=Detection(**detection_doc)
@@ -57,26 +129,290 @@ async def analyze_balance_endpoint(
     return detection_doc
 
 
-# 🎤 Slurred Speech Analysis
-@router.post("/analyze_speech",response_model=SlurredSpeechDetectionOut)
-async def analyze_speech_endpoint(
+# 📡 Streaming Balance Analysis
+# Text frames: {"accel": [[x, y, z], ...], "gyro": [[x, y, z], ...]} or {"type": "end"}.
+# Binary frames: the application/x-imu-f32 layout from utils/sensor_codec.py.
+# Metrics are pushed every `emit_every` samples; one detection is stored on close.
+def decode_stream_frame(message: dict):
+    if message.get("bytes") is not None:
+        return decode_sensor_payload(message["bytes"], "application/x-imu-f32", settings.BALANCE_MAX_SAMPLES, min_samples=1)
+
+    try:
+        payload = json.loads(message.get("text") or "")
+        if payload.get("type") == "end":
+            return None
+        accel = np.array(payload["accel"], dtype=np.float64)
+        gyro = np.array(payload["gyro"], dtype=np.float64)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise SensorPayloadError(f"Invalid frame: {e}")
+    validate_sensor_arrays(accel, gyro, settings.BALANCE_MAX_SAMPLES, min_samples=1)
+    return accel, gyro, validate_sample_rate(payload.get("sample_rate"))
+
+def stream_detection_doc(current_user: dict, stats: OnlineBalanceStats, sample_rate: Optional[float]) -> dict:
+    result_data = stats.result()
+    stroke = result_data["potential_stroke"]
+    result = "stroke_detected" if stroke else "normal"
+    notes = "Bad Balance" if stroke else "Good Balance"
+    # Same rules, so p > 0.5 exactly when a limit is exceeded
+    p = rules_stroke_probability(stats.features())
+    detection_doc = {
+        "user_id": str(current_user["_id"]),
+        "username": current_user.get("email", "unknown"),
+        "detected_at": datetime.now(timezone.utc),
+        "model_version": RULES_VERSION,
+        "input_type": "balance",
+        "test_result": {
+            "confidence_score": round(p if stroke else 1.0 - p, 4),
+            "result": result,
+            "notes": notes,
+        },
+        "overall_result": result,
+        "additional_notes": notes,
+        "stroke_probability": round(p, 4),
+        "metrics": result_data,
+        "source": "stream",
+    }
+    if sample_rate:
+        detection_doc["sample_rate"] = sample_rate
+    return detection_doc
+
+@router.websocket("/ws/analyze_balance")
+async def analyze_balance_stream(
+    websocket: WebSocket,
+    emit_every: Optional[int] = Query(None, ge=1, description="Samples between metric updates"),
+    current_user: dict = Depends(get_current_user_ws)
+):
+    await websocket.accept()
+    emit_every = emit_every or settings.BALANCE_STREAM_EMIT_EVERY
+    stats = OnlineBalanceStats()
+    sample_rate = None
+    next_emit = emit_every
+    ended = False
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                frame = decode_stream_frame(message)
+            except SensorPayloadError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            if frame is None:
+                ended = True
+                break
+
+            accel, gyro, rate = frame
+            stats.update(accel, gyro)
+            sample_rate = rate or sample_rate
+            if stats.samples >= next_emit:
+                next_emit = stats.samples + emit_every
+                await websocket.send_json({"type": "metrics", **stats.result()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Persisted even when the client just drops the connection
+        detection_doc = None
+        if stats.samples >= 2:
+            detection_doc = stream_detection_doc(current_user, stats, sample_rate)
+            await get_collection("detections").insert_one(detection_doc)
+
+    if ended:
+        final = {"type": "final", **stats.result()}
+        if detection_doc is not None:
+            final["detection"] = {k: v for k, v in detection_doc.items() if k not in ("_id", "detected_at")}
+            final["detection"]["detected_at"] = detection_doc["detected_at"].isoformat()
+        await websocket.send_json(final)
+        await websocket.close()
+
+
+# 👁️ Gaze Test Analysis
+# The client runs FaceMesh and uploads the recorded test in one request: per
+# frame either all 478 landmarks or just the 22 in GAZE_LANDMARK_INDICES order,
+# normalized [0, 1] like MediaPipe returns them, plus the instruction on screen.
+GAZE_VERSION = "gaze-v1"
+
+class GazeFrames(BaseModel):
+    # (frames, points, 2|3) as nested lists, or packed with `landmarks_shape`:
+    # a flat list of floats, or base64 of little-endian float32. Decoded with
+    # numpy, never validated float by float.
+    landmarks: Any
+    landmarks_shape: Optional[Tuple[int, int, int]] = None
+    instructions: List[Literal[tuple(DIRECTIONS)]]
+    frame_width: Optional[int] = None  # given -> pixel-snapped like the desktop test
+    frame_height: Optional[int] = None
+
+def decode_landmarks(data: GazeFrames) -> np.ndarray:
+    """GazeFrames.landmarks in any accepted layout -> (frames, points, dims) float64."""
+    shape = data.landmarks_shape
+    if shape is not None:
+        if min(shape) <= 0 or shape[2] not in (2, 3):
+            raise ValueError(f"landmarks_shape must be (frames, points, 2|3), got {list(shape)}")
+        if shape[0] > settings.GAZE_MAX_FRAMES:
+            raise ValueError(f"At most {settings.GAZE_MAX_FRAMES} frames per test")
+        size = shape[0] * shape[1] * shape[2]
+        if isinstance(data.landmarks, str):
+            try:
+                raw = base64.b64decode(data.landmarks, validate=True)
+            except binascii.Error:
+                raise ValueError("Packed landmarks are not valid base64")
+            if len(raw) != size * 4:
+                raise ValueError(f"Packed landmarks hold {len(raw) // 4} floats, landmarks_shape needs {size}")
+            landmarks = np.frombuffer(raw, dtype="<f4").astype(np.float64)
+        else:
+            try:
+                landmarks = np.asarray(data.landmarks, dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError("Flat landmarks must be a list of numbers")
+            if landmarks.ndim != 1 or landmarks.size != size:
+                raise ValueError(f"Flat landmarks need {size} numbers for landmarks_shape {list(shape)}")
+        landmarks = landmarks.reshape(shape)
+    else:
+        if not isinstance(data.landmarks, list):
+            raise ValueError("landmarks_shape is required for packed landmarks")
+        if len(data.landmarks) > settings.GAZE_MAX_FRAMES:
+            raise ValueError(f"At most {settings.GAZE_MAX_FRAMES} frames per test")
+        try:
+            landmarks = np.asarray(data.landmarks, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("Every frame needs the same number of landmarks")
+    if not np.isfinite(landmarks).all():
+        raise ValueError("Landmarks must be finite numbers")
+    return landmarks
+
+@router.post("/analyze_gaze", response_model=GazeDetectionOut)
+async def analyze_gaze_endpoint(
+    data: GazeFrames,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        landmarks = decode_landmarks(data)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    cache = request.app.state.result_cache
+    cache_key = cache.make_key(
+        "eye", GAZE_VERSION, f"{data.frame_width}x{data.frame_height}{landmarks.shape}".encode(),
+        landmarks.tobytes(), "|".join(data.instructions).encode()
+    )
+    result_data = await cache.get(cache_key)
+    if result_data is None:
+        try:
+            with stage_timer("gaze", "forward"):
+                result_data = analyze_gaze_frames(landmarks, data.instructions, data.frame_width, data.frame_height)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        await cache.set(cache_key, result_data)
+
+    detection_doc = gaze_detection_doc(current_user, result_data)
+    await get_collection("detections").insert_one(detection_doc)
+    del detection_doc["_id"]
+    return detection_doc
+
+def gaze_detection_doc(current_user: dict, result_data: dict) -> dict:
+    detection_doc = {
+        "user_id": str(current_user["_id"]),
+        "username": current_user.get("email", "unknown"),
+        "detected_at": datetime.now(timezone.utc),
+        "model_version": GAZE_VERSION,
+        "input_type": "eye",
+        "test_result": {
+            "confidence_score": result_data["confidence_score"],
+            "result": result_data["result"],
+            "notes": result_data["notes"],
+        },
+        "overall_result": result_data["result"],
+        "additional_notes": result_data["notes"],
+        "matched_directions": result_data["matched_directions"],
+        "tested_directions": result_data["tested_directions"],
+        "directions": result_data["directions"],
+        "frames": result_data["frames"],
+        "untracked_frames": result_data["untracked_frames"],
+    }
+    if "video" in result_data:
+        detection_doc["video"] = result_data["video"]
+    return detection_doc
+
+# 🎥 Gaze test from a recorded video, for clients that can't run FaceMesh
+# `schedule` is the JSON list of instructions shown: [{"direction", "start_s", "end_s"}, ...]
+@router.post("/analyze_gaze/video", response_model=GazeVideoDetectionOut)
+async def analyze_gaze_video_endpoint(
     request: Request,
     file: UploadFile = File(...),
+    schedule: str = Form(...),
     current_user: dict = Depends(get_current_user)
 ):
-    user_id = str(current_user["_id"])
-    username = current_user.get("email", "unknown")
-    audio_bytes = await file.read()
-    processor = request.app.state.processor
-    model = request.app.state.model
-    device = request.app.state.device
-    result_data = analyze_speech_file(audio_bytes,processor, model, device)
+    try:
+        segments = json.loads(schedule)
+        Schedule(segments)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid schedule: {e}")
 
+    max_bytes = settings.GAZE_VIDEO_MAX_MB * 1024 * 1024
+    # OpenCV decodes from a path, so the upload is spooled to a temp file
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(file.filename or "")[1], delete=False) as f:
+        path = f.name
+    try:
+        try:
+            await spool_to_file(upload_chunks(file), path, max_bytes)
+        except UploadTooLargeError:
+            raise HTTPException(status_code=413, detail=f"Video exceeds {settings.GAZE_VIDEO_MAX_MB} MB")
+        try:
+            result_data = await asyncio.to_thread(
+                analyze_gaze_video, path, segments, request.app.state.gaze_video_pool, settings.GAZE_VIDEO_MAX_SKIP
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        os.remove(path)
+
+    print(f"🎥 Gaze video: {result_data['video']['frames_analyzed']} frames at "
+          f"{result_data['video']['frames_per_s']} frames/s")
+    detection_doc = gaze_detection_doc(current_user, result_data)
+    await get_collection("detections").insert_one(detection_doc)
+    del detection_doc["_id"]
+    return detection_doc
+
+# 🎤 Slurred Speech Analysis
+async def run_speech_analysis(request: Request, audio_bytes: bytes, windowed: bool, aggregate: str) -> dict:
+    # Raises InsufficientSpeechError when the voice-activity gate rejects the audio
+    cache = request.app.state.result_cache
+    executor = request.app.state.speech_executor
+    hop = int(settings.SPEECH_WINDOW_HOP_SEC * TARGET_SR)
+    max_windows = settings.SPEECH_MAX_WINDOWS
+
+    # Retried uploads of byte-identical audio skip decoding and inference
+    mode = f"windowed:{aggregate}:{hop}:{max_windows}" if windowed else "single"
+    # The voice-activity gate changes what is analyzed (and whether it is rejected)
+    mode += f":vad:{executor.min_voiced_sec}"
+    cache_key = cache.make_key("slurred_speech", f"{SPEECH_MODEL_VERSION}:{executor.backend}", mode.encode(), audio_bytes)
+    # A request being profiled skips the cache and the batcher, so every stage
+    # runs (and is measured) on its own
+    profiling = current_capture() is not None
+    result_data = None if profiling else await cache.get(cache_key)
+    if result_data is None:
+        batcher = request.app.state.speech_batcher
+        if windowed:
+            windows, starts = await executor.preprocess_windows(audio_bytes, hop, max_windows)
+            window_results = await (executor.predict(windows) if profiling else batcher.submit_many(windows))
+            result_data = aggregate_windows(window_results, starts, aggregate)
+        else:
+            audio_input = await executor.preprocess(audio_bytes)
+            if profiling:
+                result_data = (await executor.predict(audio_input[np.newaxis, :]))[0]
+            else:
+                result_data = await batcher.submit(audio_input)
+        await cache.set(cache_key, result_data)
+    return result_data
+
+def speech_detection_doc(current_user: dict, result_data: dict, windowed: bool) -> dict:
     detection_doc = {
-        "user_id": user_id,
-        "username": username,
+        "user_id": str(current_user["_id"]),
+        "username": current_user.get("email", "unknown"),
         "detected_at": datetime.now(timezone.utc),
-        "model_version": "v1.0",
+        "model_version": SPEECH_MODEL_VERSION,
         "input_type": "slurred_speech",
         "test_result": {
             "confidence_score": result_data["confidence_score"],
@@ -86,6 +422,28 @@ async def analyze_speech_endpoint(
         "overall_result": result_data["result"],
         "additional_notes": result_data.get("notes",None),
     }
+    if windowed:
+        detection_doc["windows"] = result_data["windows"]
+    return detection_doc
+
+@router.post("/analyze_speech",response_model=SlurredSpeechDetectionOut)
+async def analyze_speech_endpoint(
+    request: Request,
+    file: UploadFile = File(...),
+    windowed: bool = Query(False, description="Score overlapping 4.2 s windows over the whole recording"),
+    aggregate: Literal["mean", "max", "vote"] = Query("mean", description="How window scores are combined"),
+    current_user: dict = Depends(get_current_user)
+):
+    if not request.app.state.speech_ready:
+        raise HTTPException(status_code=503, detail="Speech model is still loading")
+
+    audio_bytes = await file.read()
+    try:
+        result_data = await run_speech_analysis(request, audio_bytes, windowed, aggregate)
+    except InsufficientSpeechError as e:
+        raise HTTPException(status_code=422, detail=f"Not enough speech in the recording. {e}")
+
+    detection_doc = speech_detection_doc(current_user, result_data, windowed)
 
     # try:
     #     parsed_doc=Detection(**detection_doc)
@@ -95,4 +453,133 @@ async def analyze_speech_endpoint(
     result=await get_collection("detections").insert_one(detection_doc)
     detection_doc["_id"] = str(result.inserted_id)
     del detection_doc["_id"]
-    return detection_doc
\ No newline at end of file
+    return detection_doc
+
+
+# 🗂️ Batch Speech Analysis
+def list_archive_members(path: str, max_files: int, max_file_bytes: int) -> List[zipfile.ZipInfo]:
+    try:
+        with zipfile.ZipFile(path) as zf:
+            entries = [
+                info for info in zf.infolist()
+                if not info.is_dir()
+                and not info.filename.startswith("__MACOSX/")
+                and not os.path.basename(info.filename).startswith(".")
+            ]
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="archive must be a .zip file")
+    if len(entries) > max_files:
+        raise HTTPException(status_code=413, detail=f"Archive holds more than {max_files} files")
+    for info in entries:
+        if info.file_size > max_file_bytes:
+            raise HTTPException(status_code=413, detail=f"'{info.filename}' is too large once uncompressed")
+    return entries
+
+def read_batch_item(path: str, member: Optional[zipfile.ZipInfo]) -> bytes:
+    if member is None:
+        with open(path, "rb") as f:
+            return f.read()
+    # zipfile never inflates a member past its declared size, which was checked up front
+    with zipfile.ZipFile(path) as zf:
+        return zf.read(member)
+
+@router.post("/analyze_speech/batch")
+async def analyze_speech_batch_endpoint(
+    request: Request,
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None, description="A .zip of recordings, instead of or alongside files"),
+    windowed: bool = Query(False, description="Score overlapping 4.2 s windows over each recording"),
+    aggregate: Literal["mean", "max", "vote"] = Query("mean", description="How window scores are combined"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Analyze many recordings in one call.
+
+    Results stream back as NDJSON, one line per file in completion order, and
+    a final summary line once all detections are stored with one insert_many.
+    Uploads are spooled to disk and read back a few at a time, so memory
+    doesn't grow with the size of the batch.
+    """
+    if not request.app.state.speech_ready:
+        raise HTTPException(status_code=503, detail="Speech model is still loading")
+
+    max_files = settings.SPEECH_BATCH_MAX_FILES
+    max_file_bytes = settings.SPEECH_BATCH_MAX_FILE_MB * 1024 * 1024
+    max_total_bytes = settings.SPEECH_BATCH_MAX_UNCOMPRESSED_MB * 1024 * 1024
+    if len(files or []) > max_files:
+        raise HTTPException(status_code=413, detail=f"At most {max_files} files per batch")
+
+    workdir = tempfile.mkdtemp(prefix="speech_batch_")
+    try:
+        items = []  # (filename, path, zip member or None)
+        total_bytes = 0
+        for i, upload in enumerate(files or []):
+            path = os.path.join(workdir, f"{i}.upload")
+            try:
+                total_bytes += await spool_to_file(upload_chunks(upload), path, max_file_bytes)
+            except UploadTooLargeError:
+                raise HTTPException(status_code=413, detail=f"'{upload.filename}' exceeds {settings.SPEECH_BATCH_MAX_FILE_MB} MB")
+            items.append((upload.filename, path, None))
+        if archive is not None:
+            path = os.path.join(workdir, "archive.zip")
+            try:
+                await spool_to_file(upload_chunks(archive), path, max_total_bytes)
+            except UploadTooLargeError:
+                raise HTTPException(status_code=413, detail="Archive is too large")
+            members = await asyncio.to_thread(list_archive_members, path, max_files, max_file_bytes)
+            total_bytes += sum(info.file_size for info in members)
+            items += [(info.filename, path, info) for info in members]
+        if not items:
+            raise HTTPException(status_code=400, detail="Upload at least one file or an archive")
+        if len(items) > max_files:
+            raise HTTPException(status_code=413, detail=f"At most {max_files} files per batch")
+        if total_bytes > max_total_bytes:
+            raise HTTPException(status_code=413, detail="Batch is too large once uncompressed")
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+    # Only this many recordings are held in memory at once
+    in_flight = asyncio.Semaphore(settings.SPEECH_BATCH_IN_FLIGHT)
+
+    async def analyze_item(index: int, filename: str, path: str, member: Optional[zipfile.ZipInfo]):
+        # Decoding runs in parallel on the executor; the batcher merges the forward passes
+        async with in_flight:
+            try:
+                audio_bytes = await asyncio.to_thread(read_batch_item, path, member)
+                return index, filename, await run_speech_analysis(request, audio_bytes, windowed, aggregate), None
+            except InsufficientSpeechError as e:
+                return index, filename, None, {"status": "rejected", "detail": str(e)}
+            except Exception as e:
+                return index, filename, None, {"status": "error", "detail": str(e)}
+
+    async def stream_results():
+        tasks = [asyncio.create_task(analyze_item(i, *item)) for i, item in enumerate(items)]
+        detection_docs = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, filename, result_data, failure = await next_done
+                line = {"index": index, "filename": filename}
+                if failure:
+                    line.update(failure)
+                else:
+                    detection_doc = speech_detection_doc(current_user, result_data, windowed)
+                    detection_doc["source_filename"] = filename
+                    detection_docs.append(detection_doc)
+                    line.update({"status": "ok", "test_result": detection_doc["test_result"]})
+                    if windowed:
+                        line["windows"] = detection_doc["windows"]
+                yield json.dumps(line) + "\n"
+
+            if detection_docs:
+                await get_collection("detections").insert_many(detection_docs)
+            yield json.dumps({"summary": {
+                "files": len(items),
+                "analyzed": len(detection_docs),
+                "failed": len(items) - len(detection_docs),
+            }}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
\ No newline at end of file
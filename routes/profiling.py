@@ -0,0 +1,79 @@
+# routes/profiling.py
+
+from bson import ObjectId, errors as bson_errors
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from typing import Literal
+from models.profilier import ProfilingSessionIn
+from service.profiling import speedscope
+from service.profiling_sessions import RequestProfiler
+from utils.jwt import get_current_admin
+
+router = APIRouter(prefix="/api/v1/admin/profiling", tags=["Admin"])
+
+def _public(doc: dict) -> dict:
+    doc = {k: v for k, v in doc.items() if k not in ("collapsed", "pstats")}
+    doc["id"] = str(doc.pop("_id"))
+    if "session_id" in doc:
+        doc["session_id"] = str(doc["session_id"])
+    return doc
+
+
+# 🔬 Profiling sessions: sample live requests (1 in N, or the next K) matching a route
+@router.post("/session")
+async def start_profiling_session(
+    spec: ProfilingSessionIn,
+    request: Request,
+    admin: dict = Depends(get_current_admin)
+):
+    session = await request.app.state.request_profiler.start_session(spec.model_dump(), admin)
+    print(f"🔬 Profiling session started by {session['created_by']}: {spec.route}")
+    return _public(session)
+
+@router.get("/session")
+async def get_profiling_session(admin: dict = Depends(get_current_admin)):
+    session = await RequestProfiler.sessions().find_one({"active": True})
+    return _public(session) if session else {"active": False}
+
+@router.delete("/session")
+async def stop_profiling_session(request: Request, admin: dict = Depends(get_current_admin)):
+    stopped = await request.app.state.request_profiler.stop_session()
+    return {"stopped": stopped}
+
+
+# 📥 Stored profiles
+@router.get("/profiles")
+async def list_profiles(
+    limit: int = Query(20, ge=1, le=200),
+    admin: dict = Depends(get_current_admin)
+):
+    cursor = RequestProfiler.profiles().find({}, {"collapsed": 0, "pstats": 0}).sort("created_at", -1)
+    return [_public(doc) for doc in await cursor.to_list(length=limit)]
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: Literal["collapsed", "speedscope", "pstats", "summary"] = Query(
+        "speedscope", description="collapsed: flamegraph.pl/speedscope text; pstats: cProfile sessions only"
+    ),
+    admin: dict = Depends(get_current_admin)
+):
+    try:
+        profile = await RequestProfiler.profiles().find_one({"_id": ObjectId(profile_id)})
+    except bson_errors.InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid profile id")
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    attachment = {"Content-Disposition": f'attachment; filename="profile-{profile_id}.{format}"'}
+    if format == "summary":
+        return _public(profile)
+    if format == "collapsed":
+        return PlainTextResponse(profile["collapsed"], headers=attachment)
+    if format == "speedscope":
+        attachment["Content-Disposition"] = f'attachment; filename="profile-{profile_id}.speedscope.json"'
+        return JSONResponse(speedscope(profile), headers=attachment)
+    if "pstats" not in profile:
+        raise HTTPException(status_code=404, detail="No pstats data: the session used the sampling profiler")
+    attachment["Content-Disposition"] = f'attachment; filename="profile-{profile_id}.prof"'
+    return Response(bytes(profile["pstats"]), media_type="application/octet-stream", headers=attachment)
@@ -0,0 +1,32 @@
+# routes/stats.py
+
+from fastapi import APIRouter, Depends, Request
+from utils.jwt import get_current_admin
+
+# Operational counters: admins only, like /api/v1/admin/*
+router = APIRouter(prefix="/api/v1/stats", tags=["Stats"], dependencies=[Depends(get_current_admin)])
+
+# 📊 Speech micro-batching counters
+@router.get("/speech_batcher")
+async def speech_batcher_stats(request: Request):
+    return request.app.state.speech_batcher.stats()
+
+# 🗃️ Result cache counters
+@router.get("/cache")
+async def result_cache_stats(request: Request):
+    return request.app.state.result_cache.stats()
+
+# 🔇 Voice-activity gate counters
+@router.get("/speech_gate")
+async def speech_gate_stats(request: Request):
+    return request.app.state.speech_executor.gate_stats()
+
+# 📝 Telemetry write-behind counters
+@router.get("/telemetry")
+async def telemetry_stats(request: Request):
+    return request.app.state.telemetry.stats()
+
+# 📈 Per-minute telemetry rollup progress
+@router.get("/telemetry_rollup")
+async def telemetry_rollup_stats(request: Request):
+    return request.app.state.telemetry_rollup.stats()
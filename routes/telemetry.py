@@ -0,0 +1,81 @@
+# routes/telemetry.py
+
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from db.collections import get_collection
+from service.telemetry_rollup import ROLLUP_COLLECTION
+from utils.jwt import get_current_admin
+
+router = APIRouter(prefix="/api/v1/admin/telemetry", tags=["Admin"])
+
+def _window(since: Optional[datetime], until: Optional[datetime], minutes: int):
+    # Times without an offset are taken as UTC
+    until = until.replace(tzinfo=until.tzinfo or timezone.utc) if until else datetime.now(timezone.utc)
+    since = since.replace(tzinfo=since.tzinfo or timezone.utc) if since else until - timedelta(minutes=minutes)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'")
+    return since, until
+
+
+# 📈 Per-minute request summaries (service/telemetry_rollup.py)
+@router.get("/rollups")
+async def list_rollups(
+    route: Optional[str] = Query(None, description="Route template, e.g. /api/v1/analyze_speech"),
+    method: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    minutes: int = Query(60, ge=1, le=90 * 24 * 60, description="Window length when 'since' is not given"),
+    limit: int = Query(1000, ge=1, le=10_000),
+    admin: dict = Depends(get_current_admin)
+):
+    since, until = _window(since, until, minutes)
+    query = {"minute": {"$gte": since, "$lt": until}}
+    if route:
+        query["route"] = route
+    if method:
+        query["method"] = method.upper()
+    cursor = get_collection(ROLLUP_COLLECTION).find(query, {"_id": 0}).sort("minute", -1)
+    return await cursor.to_list(length=limit)
+
+# 🧮 One line per route over a window. Percentiles can't be merged exactly:
+# p50/p95 are request-weighted means of the minute values, p99 the worst minute.
+@router.get("/summary")
+async def rollup_summary(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    minutes: int = Query(60, ge=1, le=90 * 24 * 60),
+    admin: dict = Depends(get_current_admin)
+):
+    since, until = _window(since, until, minutes)
+    pipeline = [
+        {"$match": {"minute": {"$gte": since, "$lt": until}}},
+        {"$group": {
+            "_id": {"route": "$route", "method": "$method"},
+            "count": {"$sum": "$count"},
+            "errors": {"$sum": "$errors"},
+            "client_errors": {"$sum": "$client_errors"},
+            "p50_weighted": {"$sum": {"$multiply": ["$p50_ms", "$count"]}},
+            "p95_weighted": {"$sum": {"$multiply": ["$p95_ms", "$count"]}},
+            "p99_ms_max": {"$max": "$p99_ms"},
+            "max_ms": {"$max": "$max_ms"},
+        }},
+        {"$sort": {"count": -1}},
+    ]
+    rows = await (await get_collection(ROLLUP_COLLECTION).aggregate(pipeline)).to_list(length=None)
+    return {
+        "since": since,
+        "until": until,
+        "routes": [{
+            "route": row["_id"]["route"],
+            "method": row["_id"]["method"],
+            "count": row["count"],
+            "errors": row["errors"],
+            "client_errors": row["client_errors"],
+            "error_rate": round(row["errors"] / row["count"], 4) if row["count"] else 0.0,
+            "p50_ms_avg": round(row["p50_weighted"] / row["count"], 3) if row["count"] else None,
+            "p95_ms_avg": round(row["p95_weighted"] / row["count"], 3) if row["count"] else None,
+            "p99_ms_max": row["p99_ms_max"],
+            "max_ms": row["max_ms"],
+        } for row in rows]
+    }
@@ -25,7 +25,6 @@ async def create_user(
         name=user.name,
         email=user.email,   
         password_hash=hash_password(user.password),
-        role=user.role,
         emergency_contacts=user.emergency_contacts
     )
 
@@ -0,0 +1,97 @@
+# service/audio.py
+
+import io
+import math
+from typing import Optional, Tuple, Union
+import numpy as np
+import librosa
+import soundfile as sf
+import soxr
+
+# Extra source frames decoded past the window so the resampler's filter tail
+# doesn't touch the samples we keep.
+RESAMPLE_MARGIN_SEC = 0.05
+
+class InsufficientSpeechError(ValueError):
+    """Raised when an upload has too little voiced audio to be worth scoring."""
+
+    def __init__(self, voiced_seconds: float, min_voiced_seconds: float):
+        super().__init__(voiced_seconds, min_voiced_seconds)
+        self.voiced_seconds = voiced_seconds
+        self.min_voiced_seconds = min_voiced_seconds
+
+    def __str__(self):
+        return (f"Only {self.voiced_seconds:.2f}s of voiced audio found, "
+                f"at least {self.min_voiced_seconds:.2f}s is required")
+
+def _open(source: Union[str, bytes]):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+def _read_soundfile(source, target_sr: int, max_samples: Optional[int]):
+    # WAV / FLAC / OGG: decode only the frames the window needs
+    with sf.SoundFile(_open(source)) as f:
+        sr = f.samplerate
+        frames = -1
+        if max_samples is not None:
+            frames = math.ceil(max_samples * sr / target_sr) + int(RESAMPLE_MARGIN_SEC * sr)
+        audio = f.read(frames=frames, dtype="float32", always_2d=True)
+    return audio.mean(axis=1, dtype=np.float32), sr
+
+def _read_librosa(source, target_sr: int, max_samples: Optional[int]):
+    # Exotic codecs (mp3, m4a, webm, ...) go through librosa/audioread
+    duration = None
+    if max_samples is not None:
+        duration = max_samples / target_sr + RESAMPLE_MARGIN_SEC
+    audio, sr = librosa.load(_open(source), sr=None, mono=True, duration=duration)
+    return audio.astype(np.float32, copy=False), sr
+
+def decode_audio(source: Union[str, bytes], target_sr: int, max_samples: Optional[int] = None) -> np.ndarray:
+    """Decode a file path or raw bytes to mono float32 at `target_sr`.
+
+    With `max_samples` set, only the source frames needed to produce that many
+    output samples are decoded and resampled. The result may be shorter than
+    `max_samples` (short recordings); padding is left to the caller.
+    """
+    try:
+        audio, sr = _read_soundfile(source, target_sr, max_samples)
+    except (sf.LibsndfileError, RuntimeError, TypeError):
+        audio, sr = _read_librosa(source, target_sr, max_samples)
+
+    if sr != target_sr:
+        # Same soxr "HQ" resampler librosa.resample uses by default
+        audio = soxr.resample(audio, sr, target_sr, quality="HQ").astype(np.float32, copy=False)
+
+    if max_samples is not None:
+        audio = audio[:max_samples]
+    return audio
+
+
+# === Voice-activity gate ===
+def voiced_frames(audio: np.ndarray, sr: int, frame_ms: float = 20.0,
+                  relative_db: float = -35.0, floor_db: float = -50.0):
+    """Per-frame voiced mask from RMS energy; returns (mask, frame_length).
+
+    A frame counts as voiced if it is within `relative_db` of the loudest frame
+    and above an absolute `floor_db` (dBFS), so both quiet-but-real speech and
+    pure noise floors are handled.
+    """
+    frame_length = max(1, int(sr * frame_ms / 1000))
+    n_frames = len(audio) // frame_length
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool), frame_length
+
+    frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    rms_db = 20 * np.log10(np.maximum(rms, 1e-10))
+    mask = (rms_db > rms_db.max() + relative_db) & (rms_db > floor_db)
+    return mask, frame_length
+
+def voiced_span(audio: np.ndarray, sr: int, min_voiced_seconds: float) -> Tuple[int, int]:
+    """(start, end) samples from the first to the last voiced frame; raise InsufficientSpeechError if too little speech."""
+    mask, frame_length = voiced_frames(audio, sr)
+    voiced_seconds = float(mask.sum()) * frame_length / sr
+    if voiced_seconds < min_voiced_seconds:
+        raise InsufficientSpeechError(voiced_seconds, min_voiced_seconds)
+
+    voiced = np.flatnonzero(mask)
+    return int(voiced[0] * frame_length), int((voiced[-1] + 1) * frame_length)
@@ -0,0 +1,95 @@
+# service/backends.py
+
+import os
+from typing import Dict
+import numpy as np
+import torch
+
+BACKENDS = ("torch", "int8", "onnx")
+ONNX_FILENAME = "model.onnx"
+
+
+class TorchBackend:
+    """Plain PyTorch fp32 forward pass."""
+    name = "torch"
+
+    def __init__(self, model, device):
+        self.model = model
+        self.device = device
+
+    def logits(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        # non_blocking: pooled inputs are pinned on CUDA, so the copy overlaps
+        inputs = {k: v.to(self.device, non_blocking=True) for k, v in inputs.items()}
+        with torch.no_grad():
+            return self.model(**inputs).logits
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch with the Linear layers dynamically quantized to int8 (CPU only)."""
+    name = "int8"
+
+    def __init__(self, model):
+        model = model.to("cpu")
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        quantized.eval()
+        super().__init__(quantized, torch.device("cpu"))
+
+
+class OnnxBackend:
+    """ONNX Runtime session over a model exported with `export_onnx`."""
+    name = "onnx"
+
+    def __init__(self, onnx_path: str, intra_op_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("SPEECH_BACKEND=onnx requires the onnxruntime package") from e
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"ONNX model not found at {onnx_path}. Run `python export_speech_model.py export` first."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.device = torch.device("cpu")
+
+    def logits(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        # Inputs are fixed-length and unpadded, so the attention mask is all ones
+        # and the graph is exported with input_values only.
+        input_values = inputs["input_values"].cpu().numpy().astype(np.float32, copy=False)
+        (logits,) = self.session.run(["logits"], {"input_values": input_values})
+        return torch.from_numpy(logits)
+
+
+class _LogitsOnly(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_values):
+        return self.model(input_values=input_values).logits
+
+
+def default_onnx_path(model_path: str) -> str:
+    return os.path.join(model_path, ONNX_FILENAME)
+
+
+def export_onnx(model, output_path: str, num_samples: int, opset: int = 17):
+    """Export the classifier to ONNX with a dynamic batch axis."""
+    model = model.to("cpu").eval()
+    dummy = torch.zeros(1, num_samples, dtype=torch.float32)
+    torch.onnx.export(
+        _LogitsOnly(model),
+        (dummy,),
+        output_path,
+        input_names=["input_values"],
+        output_names=["logits"],
+        dynamic_axes={"input_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+        do_constant_folding=True,
+        dynamo=False,
+    )
+    return output_path
@@ -1,35 +1,295 @@
 import numpy as np
+import scipy.fft
+from numba import njit, prange
+from typing import Dict, List, Optional, Sequence
 
-def analyze_balance(accel, gyro):
-    # Path length
-    path_length = np.sum(np.linalg.norm(np.diff(accel, axis=0), axis=1))
+# threshold-based classification
+SWAY_AREA_LIMIT = 0.15
+PATH_LENGTH_LIMIT = 15
+GYRO_VARIANCE_LIMIT = 0.002
+JERKINESS_LIMIT = 0.2
+
+def stack_sessions(sessions: Sequence[np.ndarray]):
+    """Pad ragged (n_samples_i, 3) sessions into one (n_sessions, max_samples, 3) array plus lengths."""
+    lengths = np.array([len(s) for s in sessions], dtype=np.int64)
+    stacked = np.zeros((len(sessions), lengths.max(initial=0), 3), dtype=np.float64)
+    for i, session in enumerate(sessions):
+        stacked[i, :lengths[i]] = session
+    return stacked, lengths
+
+def balance_features_batch(accel: np.ndarray, gyro: np.ndarray, lengths: Optional[np.ndarray] = None,
+                           gyro_lengths: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Path length, sway area, gyro variance and jerkiness for many sessions in one pass.
+
+    accel is (n_sessions, n_samples, 3) and gyro (n_sessions, n_gyro_samples, 3);
+    rows past each session's length (`lengths` for accel, `gyro_lengths` for
+    gyro, which default to `lengths` when the shapes match) are padding and
+    ignored. Returns one array of n_sessions values per feature.
+    """
+    accel = np.asarray(accel, dtype=np.float64)
+    gyro = np.asarray(gyro, dtype=np.float64)
+    n_sessions, n_samples, _ = accel.shape
+    n_gyro_samples = gyro.shape[1]
+    if gyro_lengths is None:
+        gyro_lengths = lengths if lengths is not None and n_gyro_samples == n_samples else None
+    if lengths is None:
+        lengths = np.full(n_sessions, n_samples, dtype=np.int64)
+    if gyro_lengths is None:
+        gyro_lengths = np.full(n_sessions, n_gyro_samples, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    gyro_lengths = np.asarray(gyro_lengths, dtype=np.int64)
+    if lengths.min(initial=1) < 1 or gyro_lengths.min(initial=1) < 1:
+        raise ValueError("Every balance session needs at least one sample")
+
+    # Equal-length stacks (the common case) skip the masking copies entirely
+    padded = bool((lengths < n_samples).any())
+    mask = np.arange(n_samples) < lengths[:, None]             # (n, T)
+
+    # One diff serves both path length and jerkiness
+    step = np.linalg.norm(np.diff(accel, axis=1), axis=2)      # (n, T-1)
+    if padded:
+        step = np.where(mask[:, 1:], step, 0.0)                 # diff i valid if sample i+1 is
+    path_length = step.sum(axis=1)
+    # 0.0 for single-sample sessions, as in the compiled kernel and OnlineBalanceStats
+    jerkiness = np.divide(path_length, lengths - 1, out=np.zeros(n_sessions), where=lengths > 1)
 
     # Sway area (approx bounding box)
-    x, y = accel[:, 0], accel[:, 1]
-    sway_area = (max(x) - min(x)) * (max(y) - min(y))
-
-    # Angular velocity variance
-    gyro_variance = np.var(gyro, axis=0).mean()
-
-    # Jerkiness: derivative of acceleration
-    jerk = np.diff(accel, axis=0)
-    jerk_magnitude = np.linalg.norm(jerk, axis=1)
-    jerkiness = np.mean(np.abs(jerk_magnitude))
-
-    # threshold-based classification
-    stroke_flag = (
-        sway_area > 0.15 or 
-        path_length > 15 or 
-        gyro_variance > 0.002 or 
-        jerkiness > 0.2
+    xy = accel[:, :, :2]
+    valid = mask[:, :, None]
+    xy_max = (np.where(valid, xy, -np.inf) if padded else xy).max(axis=1)
+    xy_min = (np.where(valid, xy, np.inf) if padded else xy).min(axis=1)
+    extent = xy_max - xy_min
+    sway_area = extent[:, 0] * extent[:, 1]
+
+    # Angular velocity variance (population variance per axis, then averaged),
+    # over the gyro's own sample count
+    gyro_padded = bool((gyro_lengths < n_gyro_samples).any())
+    gyro_valid = (np.arange(n_gyro_samples) < gyro_lengths[:, None])[:, :, None]
+    if gyro_padded:
+        gyro = np.where(gyro_valid, gyro, 0.0)
+    counts = gyro_lengths[:, None]
+    gyro_mean = gyro.sum(axis=1) / counts
+    deviation = gyro - gyro_mean[:, None, :]
+    if gyro_padded:
+        deviation = np.where(gyro_valid, deviation, 0.0)
+    gyro_variance = ((deviation * deviation).sum(axis=1) / counts).mean(axis=1)
+
+    return {
+        "path_length": path_length,
+        "sway_area": sway_area,
+        "gyro_variance": gyro_variance,
+        "jerkiness": jerkiness,
+    }
+
+def stroke_flags(features: Dict) -> np.ndarray:
+    # Works on per-session arrays and on plain scalars alike
+    return (
+        (features["sway_area"] > SWAY_AREA_LIMIT) |
+        (features["path_length"] > PATH_LENGTH_LIMIT) |
+        (features["gyro_variance"] > GYRO_VARIANCE_LIMIT) |
+        (features["jerkiness"] > JERKINESS_LIMIT)
     )
 
-    result = {
+def _result(path_length, sway_area, gyro_variance, jerkiness, potential_stroke) -> Dict:
+    return {
         "path_length": round(path_length, 2),
         "sway_area": round(sway_area, 2),
         "gyro_variance": round(gyro_variance, 5),
         "jerkiness": round(jerkiness, 5),
-        "potential_stroke": bool(stroke_flag)
+        "potential_stroke": bool(potential_stroke)
     }
 
-    return result
\ No newline at end of file
+def analyze_balance_batch(accel, gyro, lengths: Optional[np.ndarray] = None) -> List[Dict]:
+    """Score many sessions at once; accel/gyro are stacked arrays or lists of ragged sessions."""
+    gyro_lengths = None
+    if isinstance(accel, (list, tuple)):
+        accel, lengths = stack_sessions(accel)
+        gyro, gyro_lengths = stack_sessions(gyro)
+
+    features = balance_features_batch(accel, gyro, lengths, gyro_lengths)
+    flags = stroke_flags(features)
+
+    return [
+        _result(features["path_length"][i], features["sway_area"][i], features["gyro_variance"][i],
+                features["jerkiness"][i], flags[i])
+        for i in range(len(flags))
+    ]
+
+def analyze_balance(accel, gyro):
+    accel = np.asarray(accel, dtype=np.float64)
+    gyro = np.asarray(gyro, dtype=np.float64)
+    return analyze_balance_batch(accel[np.newaxis], gyro[np.newaxis])[0]
+
+
+# === Streaming (one connection, constant memory) ===
+class OnlineBalanceStats:
+    """Incremental balance features over a stream of (n, 3) accel/gyro chunks.
+
+    Keeps only running sums, the last accel sample (so the diff continues
+    across chunk boundaries), running x/y min/max, and per-axis Welford
+    mean/M2 for the gyro. Chunks are merged with Chan's parallel update, so
+    each one is a few vectorized reductions regardless of stream length.
+    """
+
+    def __init__(self):
+        self.samples = 0
+        self.path_length = 0.0            # running sum of |Δaccel|, also the jerk total
+        self._last_accel: Optional[np.ndarray] = None
+        self._xy_min = np.full(2, np.inf)
+        self._xy_max = np.full(2, -np.inf)
+        self._gyro_mean = np.zeros(3)
+        self._gyro_m2 = np.zeros(3)
+
+    def update(self, accel: np.ndarray, gyro: np.ndarray):
+        accel = np.asarray(accel, dtype=np.float64)
+        gyro = np.asarray(gyro, dtype=np.float64)
+        n = len(accel)
+        if n == 0:
+            return
+
+        if self._last_accel is not None:
+            accel_diff = np.diff(accel, axis=0, prepend=self._last_accel[np.newaxis])
+        else:
+            accel_diff = np.diff(accel, axis=0)
+        self.path_length += float(np.linalg.norm(accel_diff, axis=1).sum())
+        self._last_accel = accel[-1].copy()
+
+        np.minimum(self._xy_min, accel[:, :2].min(axis=0), out=self._xy_min)
+        np.maximum(self._xy_max, accel[:, :2].max(axis=0), out=self._xy_max)
+
+        chunk_mean = gyro.mean(axis=0)
+        chunk_m2 = ((gyro - chunk_mean) ** 2).sum(axis=0)
+        total = self.samples + n
+        delta = chunk_mean - self._gyro_mean
+        self._gyro_mean += delta * (n / total)
+        self._gyro_m2 += chunk_m2 + delta * delta * (self.samples * n / total)
+        self.samples = total
+
+    def features(self) -> Dict[str, float]:
+        if self.samples == 0:
+            return {"path_length": 0.0, "sway_area": 0.0, "gyro_variance": 0.0, "jerkiness": 0.0}
+        extent = self._xy_max - self._xy_min
+        return {
+            "path_length": self.path_length,
+            "sway_area": float(extent[0] * extent[1]),
+            "gyro_variance": float((self._gyro_m2 / self.samples).mean()),
+            "jerkiness": self.path_length / (self.samples - 1) if self.samples > 1 else 0.0,
+        }
+
+    def result(self) -> Dict:
+        features = self.features()
+        return {"samples": self.samples, **_result(**features, potential_stroke=stroke_flags(features))}
+
+
+# === Classifier features (time-domain + spectral) ===
+FEATURE_NAMES = ("path_length", "sway_area", "gyro_variance", "jerkiness", "tremor_power", "sway_frequency")
+DEFAULT_SAMPLE_RATE = 50.0
+TREMOR_BAND_HZ = (3.5, 12.0)   # pathological/enhanced physiological tremor
+SWAY_BAND_HZ = (0.1, 3.0)      # postural sway
+
+@njit(parallel=True, nogil=True, cache=True)
+def _time_domain_kernel(accel, gyro, lengths, gyro_lengths, features, spectral_in):
+    # One prange iteration per session. First pass: path length, x/y extent,
+    # Welford gyro variance and the means needed for detrending. Second pass:
+    # fill mean-removed |accel|, x and y (zero past the session) for the FFT.
+    for i in prange(accel.shape[0]):
+        n = lengths[i]
+        path = 0.0
+        x_min = x_max = accel[i, 0, 0]
+        y_min = y_max = accel[i, 0, 1]
+        mag_sum = 0.0
+        x_sum = 0.0
+        y_sum = 0.0
+        g_mean = np.zeros(3)
+        g_m2 = np.zeros(3)
+        for t in range(n):
+            ax = accel[i, t, 0]
+            ay = accel[i, t, 1]
+            az = accel[i, t, 2]
+            if t > 0:
+                dx = ax - accel[i, t - 1, 0]
+                dy = ay - accel[i, t - 1, 1]
+                dz = az - accel[i, t - 1, 2]
+                path += np.sqrt(dx * dx + dy * dy + dz * dz)
+            x_min = min(x_min, ax)
+            x_max = max(x_max, ax)
+            y_min = min(y_min, ay)
+            y_max = max(y_max, ay)
+            mag_sum += np.sqrt(ax * ax + ay * ay + az * az)
+            x_sum += ax
+            y_sum += ay
+        # The gyro stream may hold a different number of samples
+        for t in range(gyro_lengths[i]):
+            for k in range(3):
+                delta = gyro[i, t, k] - g_mean[k]
+                g_mean[k] += delta / (t + 1)
+                g_m2[k] += delta * (gyro[i, t, k] - g_mean[k])
+
+        features[i, 0] = path
+        features[i, 1] = (x_max - x_min) * (y_max - y_min)
+        features[i, 2] = (g_m2[0] + g_m2[1] + g_m2[2]) / (3 * gyro_lengths[i])
+        features[i, 3] = path / (n - 1) if n > 1 else 0.0
+
+        mag_mean = mag_sum / n
+        x_mean = x_sum / n
+        y_mean = y_sum / n
+        for t in range(n):
+            ax = accel[i, t, 0]
+            ay = accel[i, t, 1]
+            az = accel[i, t, 2]
+            spectral_in[0, i, t] = np.sqrt(ax * ax + ay * ay + az * az) - mag_mean
+            spectral_in[1, i, t] = ax - x_mean
+            spectral_in[2, i, t] = ay - y_mean
+        for t in range(n, accel.shape[1]):
+            spectral_in[0, i, t] = 0.0
+            spectral_in[1, i, t] = 0.0
+            spectral_in[2, i, t] = 0.0
+
+def extract_features_batch(accel: np.ndarray, gyro: np.ndarray, lengths: Optional[np.ndarray] = None,
+                           sample_rate: float = DEFAULT_SAMPLE_RATE,
+                           gyro_lengths: Optional[np.ndarray] = None) -> np.ndarray:
+    """(n_sessions, len(FEATURE_NAMES)) classifier features for stacked sessions.
+
+    Time-domain features come from one compiled pass per session (parallel
+    across sessions); the spectral ones from a single batched real FFT.
+    tremor_power is the share of |accel| power in TREMOR_BAND_HZ and
+    sway_frequency the dominant horizontal sway frequency in SWAY_BAND_HZ.
+    """
+    accel = np.ascontiguousarray(accel, dtype=np.float64)
+    gyro = np.ascontiguousarray(gyro, dtype=np.float64)
+    n_sessions, n_samples, _ = accel.shape
+    n_gyro_samples = gyro.shape[1]
+    if gyro_lengths is None:
+        gyro_lengths = lengths if lengths is not None and n_gyro_samples == n_samples else None
+    if lengths is None:
+        lengths = np.full(n_sessions, n_samples, dtype=np.int64)
+    if gyro_lengths is None:
+        gyro_lengths = np.full(n_sessions, n_gyro_samples, dtype=np.int64)
+    lengths = np.ascontiguousarray(lengths, dtype=np.int64)
+    gyro_lengths = np.ascontiguousarray(gyro_lengths, dtype=np.int64)
+    if lengths.min(initial=1) < 1 or gyro_lengths.min(initial=1) < 1:
+        raise ValueError("Every balance session needs at least one sample")
+    if lengths.max(initial=0) > n_samples or gyro_lengths.max(initial=0) > n_gyro_samples:
+        raise ValueError("Session lengths exceed the stacked arrays")  # the kernel doesn't bounds-check
+
+    features = np.empty((n_sessions, len(FEATURE_NAMES)), dtype=np.float64)
+    spectral_in = np.empty((3, n_sessions, n_samples), dtype=np.float64)
+    _time_domain_kernel(accel, gyro, lengths, gyro_lengths, features, spectral_in)
+
+    spectrum = scipy.fft.rfft(spectral_in, axis=-1, workers=-1)             # (3, n, F)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    freqs = scipy.fft.rfftfreq(n_samples, d=1.0 / sample_rate)
+
+    magnitude_power = power[0, :, 1:]                      # DC is ~0 after detrending
+    tremor = (freqs[1:] >= TREMOR_BAND_HZ[0]) & (freqs[1:] <= TREMOR_BAND_HZ[1])
+    total = magnitude_power.sum(axis=1)
+    features[:, 4] = np.divide(magnitude_power[:, tremor].sum(axis=1), total,
+                               out=np.zeros(n_sessions), where=total > 0)
+
+    sway_band = (freqs >= SWAY_BAND_HZ[0]) & (freqs <= SWAY_BAND_HZ[1])
+    if sway_band.any():
+        sway_power = power[1][:, sway_band] + power[2][:, sway_band]
+        features[:, 5] = np.where(sway_power.max(axis=1) > 0, freqs[sway_band][sway_power.argmax(axis=1)], 0.0)
+    else:
+        features[:, 5] = 0.0   # session too short to resolve sway
+    return features
@@ -0,0 +1,301 @@
+# service/balance_jobs.py
+
+import asyncio
+import os
+from datetime import datetime, timezone
+from tokenize import TokenError
+from typing import Callable, Dict, List, Optional, Set
+import numpy as np
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from db.collections import get_collection
+from service.balance import DEFAULT_SAMPLE_RATE, FEATURE_NAMES, extract_features_batch
+from service.balance_model import BalanceClassifier
+from utils.sensor_codec import RAW_HEADER, RAW_MAGIC, RAW_VERSION, SensorPayloadError, validate_sample_rate
+
+# Rough bytes the feature pass touches per input sample: float64 accel/gyro
+# copies, the (3, n) spectral input, its complex spectrum and power.
+_BYTES_PER_SAMPLE = 8 * (3 + 3 + 3 + 2 * 3 + 3)
+
+# Per-window results are stored apart from the job, this many to a document,
+# so a long recording never pushes a document past Mongo's 16 MB limit
+WINDOWS_PER_DOC = 2000
+
+
+# === Recording files (memory-mapped, never loaded whole) ===
+def describe_recording(path: str) -> Dict:
+    """Layout of an uploaded recording: an IMU1 raw file or an (n, 6)/(2, n, 3) .npy."""
+    with open(path, "rb") as f:
+        head = f.read(RAW_HEADER.size)
+        size = os.fstat(f.fileno()).st_size
+
+        if head[:len(RAW_MAGIC)] == RAW_MAGIC:
+            if len(head) < RAW_HEADER.size:
+                raise SensorPayloadError("File is shorter than the IMU1 header")
+            magic, version, axes, samples, rate = RAW_HEADER.unpack(head)
+            if version != RAW_VERSION or axes != 3:
+                raise SensorPayloadError(f"Unsupported IMU1 header v{version} with {axes} axes")
+            if size != RAW_HEADER.size + samples * 6 * 4:
+                raise SensorPayloadError(f"File is {size} bytes, header describes {RAW_HEADER.size + samples * 24}")
+            return {"dtype": "<f4", "samples": samples, "sample_rate": validate_sample_rate(rate), "interleaved": False,
+                    "accel_offset": RAW_HEADER.size, "gyro_offset": RAW_HEADER.size + samples * 12}
+
+        if head.startswith(b"\x93NUMPY"):
+            f.seek(0)
+            try:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            except (ValueError, SyntaxError, TokenError) as e:
+                # numpy's header parser fails in several ways on a corrupt header
+                raise SensorPayloadError(f"Invalid .npy header: {e}")
+            offset = f.tell()
+            if dtype.kind != "f" or fortran_order:
+                raise SensorPayloadError(f"Expected a C-ordered float array, got {dtype}")
+            if size != offset + int(np.prod(shape)) * dtype.itemsize:
+                raise SensorPayloadError("The .npy data length doesn't match its header")
+            if len(shape) == 2 and shape[1] == 6:
+                return {"dtype": dtype.str, "samples": shape[0], "sample_rate": None, "interleaved": True,
+                        "accel_offset": offset, "gyro_offset": offset}
+            if len(shape) == 3 and shape[0] == 2 and shape[2] == 3:
+                return {"dtype": dtype.str, "samples": shape[1], "sample_rate": None, "interleaved": False,
+                        "accel_offset": offset, "gyro_offset": offset + shape[1] * 3 * dtype.itemsize}
+            raise SensorPayloadError(f"Expected shape (n, 6) or (2, n, 3), got {shape}")
+
+    raise SensorPayloadError("Unrecognised recording format (expected IMU1 or .npy)")
+
+def _read_span(path: str, layout: Dict, start: int, stop: int):
+    # A fresh mapping per chunk; dropping it unmaps the pages, so resident
+    # memory stays at one chunk no matter how long the recording is.
+    dtype = np.dtype(layout["dtype"])
+    count = stop - start
+    if layout["interleaved"]:
+        rows = np.memmap(path, dtype=dtype, mode="r", offset=layout["accel_offset"] + start * 6 * dtype.itemsize,
+                         shape=(count, 6))
+        accel, gyro = np.array(rows[:, :3], dtype=np.float64), np.array(rows[:, 3:], dtype=np.float64)
+    else:
+        accel = np.array(np.memmap(path, dtype=dtype, mode="r", shape=(count, 3),
+                                   offset=layout["accel_offset"] + start * 3 * dtype.itemsize), dtype=np.float64)
+        gyro = np.array(np.memmap(path, dtype=dtype, mode="r", shape=(count, 3),
+                                  offset=layout["gyro_offset"] + start * 3 * dtype.itemsize), dtype=np.float64)
+    return accel, gyro
+
+
+def analyze_recording(path: str, classifier: BalanceClassifier, window_sec: float = 10.0,
+                      sample_rate: Optional[float] = None, memory_budget_mb: int = 64,
+                      progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """Per-window balance features/probabilities for a long recording, chunk by chunk.
+
+    Every window goes through the same extract_features_batch +
+    classifier as a short /analyze_balance session of that length, so the
+    numbers are directly comparable. A trailing partial window is kept if it
+    covers at least half a window. Windows with non-finite samples are skipped;
+    a recording left with no window to analyze raises ValueError (the job
+    fails) rather than passing for a normal result.
+    """
+    layout = describe_recording(path)
+    rate = sample_rate or layout["sample_rate"] or DEFAULT_SAMPLE_RATE
+    window = max(2, int(round(window_sec * rate)))
+    total = layout["samples"]
+    windows_per_chunk = max(1, (memory_budget_mb * 2**20) // (window * _BYTES_PER_SAMPLE))
+
+    # (first window index, window count, samples per window). A trailing
+    # partial window runs as its own batch: zero-padding it to the full window
+    # would change its FFT grid and break parity with a short session.
+    spans = [(first, min(windows_per_chunk, total // window - first), window)
+             for first in range(0, total // window, windows_per_chunk)]
+    remainder = total % window
+    if remainder >= window // 2:
+        spans.append((total // window, 1, remainder))
+
+    windows, probabilities, skipped = [], [], 0
+    feature_sums = np.zeros(len(FEATURE_NAMES))
+    for done, (first, count, size) in enumerate(spans, start=1):
+        start = first * window
+        accel, gyro = _read_span(path, layout, start, start + count * size)
+        accel = accel.reshape(count, size, 3)
+        gyro = gyro.reshape(count, size, 3)
+
+        finite = np.isfinite(accel).all(axis=(1, 2)) & np.isfinite(gyro).all(axis=(1, 2))
+        skipped += int((~finite).sum())
+        if finite.any():
+            features = extract_features_batch(accel[finite], gyro[finite], sample_rate=rate)
+            chunk_probabilities = classifier.stroke_probability(features)
+            feature_sums += features.sum(axis=0)
+
+            for index, row, p in zip(np.flatnonzero(finite) + first, features, chunk_probabilities):
+                windows.append({
+                    "start_s": round(index * window / rate, 3),
+                    "end_s": round((index * window + size) / rate, 3),
+                    "stroke_probability": round(float(p), 4),
+                    **{name: round(float(value), 6) for name, value in zip(FEATURE_NAMES, row)},
+                })
+                probabilities.append(p)
+        if progress:
+            progress(done, len(spans))
+
+    probabilities = np.array(probabilities)
+    analyzed = len(probabilities)
+    if not analyzed:
+        if skipped:
+            raise ValueError(f"No window could be analyzed: {skipped} window(s) contain non-finite samples")
+        raise ValueError(f"No window could be analyzed: {total} samples is less than half a "
+                         f"{window_sec:g}s window ({window} samples at {rate:g} Hz)")
+    flagged = int((probabilities >= classifier.threshold).sum())
+    mean_probability = float(probabilities.mean())
+    stroke = mean_probability >= classifier.threshold
+    summary = {
+        "result": "stroke_detected" if stroke else "normal",
+        "confidence_score": round(mean_probability if stroke else 1.0 - mean_probability, 4),
+        "stroke_probability": round(mean_probability, 4),
+        "max_stroke_probability": round(float(probabilities.max()), 4),
+        "flagged_windows": flagged,
+        "windows": analyzed,
+        "skipped_windows": skipped,
+        "samples": total,
+        "duration_s": round(total / rate, 3),
+        "sample_rate": rate,
+        "window_sec": window / rate,
+        "model_version": classifier.version,
+        "mean_features": {name: round(float(value), 6) for name, value in
+                          zip(FEATURE_NAMES, feature_sums / analyzed)},
+    }
+    return {"summary": summary, "windows": windows}
+
+
+# === Jobs ===
+class BalanceJobRunner:
+    """Runs recording analyses in the background, at most `concurrency` at a time.
+
+    Job state lives in the `balance_jobs` collection:
+    queued -> running -> done | failed. Jobs left queued/running by a restart
+    are picked up again by resume(). The per-window time series goes to
+    `balance_job_windows` in chunks of WINDOWS_PER_DOC (see load_windows).
+    """
+
+    def __init__(self, classifier_getter: Callable[[], BalanceClassifier], concurrency: int = 1,
+                 memory_budget_mb: int = 64, keep_files: bool = False):
+        self.classifier_getter = classifier_getter
+        self.memory_budget_mb = memory_budget_mb
+        self.keep_files = keep_files
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def collection():
+        return get_collection("balance_jobs")
+
+    @staticmethod
+    def windows_collection():
+        return get_collection("balance_job_windows")
+
+    async def ensure_indexes(self):
+        await self.windows_collection().create_index([("job_id", 1), ("chunk", 1)])
+
+    @classmethod
+    async def load_windows(cls, job_id: ObjectId) -> List[Dict]:
+        cursor = cls.windows_collection().find({"job_id": job_id}).sort("chunk", 1)
+        return [window for doc in await cursor.to_list(length=None) for window in doc["windows"]]
+
+    async def _store_windows(self, job_id: ObjectId, windows: List[Dict]):
+        # A resumed job may have stored some chunks before the restart
+        await self.windows_collection().delete_many({"job_id": job_id})
+        chunks = [{"job_id": job_id, "chunk": i, "windows": windows[start:start + WINDOWS_PER_DOC]}
+                  for i, start in enumerate(range(0, len(windows), WINDOWS_PER_DOC))]
+        if chunks:
+            await self.windows_collection().insert_many(chunks)
+
+    def submit(self, job_id: ObjectId):
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def resume(self):
+        try:
+            cursor = self.collection().find({"status": {"$in": ["queued", "running"]}})
+            pending = await cursor.to_list(length=None)
+        except PyMongoError as e:
+            print(f"⚠️ Could not resume balance jobs: {e}")
+            return
+        for job in pending:
+            self.submit(job["_id"])
+        if pending:
+            print(f"🔁 Resumed {len(pending)} balance job(s)")
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, job_id: ObjectId):
+        jobs = self.collection()
+        async with self._slots:
+            job = await jobs.find_one({"_id": job_id})
+            if job is None or job["status"] not in ("queued", "running"):
+                return
+            await jobs.update_one({"_id": job_id}, {"$set": {"status": "running",
+                                                             "started_at": datetime.now(timezone.utc)}})
+            loop = asyncio.get_running_loop()
+
+            def progress(done: int, total: int):
+                # Called from the worker thread; Mongo writes belong on the loop
+                asyncio.run_coroutine_threadsafe(
+                    jobs.update_one({"_id": job_id}, {"$set": {"progress": round(done / max(total, 1), 3)}}), loop
+                )
+
+            try:
+                analysis = await asyncio.to_thread(
+                    analyze_recording, job["path"], self.classifier_getter(), job["window_sec"],
+                    job.get("sample_rate"), self.memory_budget_mb, progress
+                )
+            except Exception as e:
+                print(f"❌ Balance job {job_id} failed: {e}")
+                await jobs.update_one({"_id": job_id}, {"$set": {
+                    "status": "failed", "error": str(e), "finished_at": datetime.now(timezone.utc)}})
+                return
+
+            summary = analysis["summary"]
+            try:
+                await self._store_windows(job_id, analysis["windows"])
+                await jobs.update_one({"_id": job_id}, {"$set": {
+                    "status": "done", "progress": 1.0, "summary": summary,
+                    "finished_at": datetime.now(timezone.utc)}})
+                await get_collection("detections").insert_one(recording_detection_doc(job, summary))
+            except Exception as e:
+                # Don't leave the job "running": resume() would redo the whole analysis on every restart
+                print(f"❌ Balance job {job_id} failed storing results: {e}")
+                try:
+                    await jobs.update_one({"_id": job_id}, {"$set": {
+                        "status": "failed", "error": f"Could not store results: {e}",
+                        "finished_at": datetime.now(timezone.utc)}})
+                except PyMongoError:
+                    pass
+                return
+            if not self.keep_files and os.path.exists(job["path"]):
+                os.remove(job["path"])
+            print(f"✅ Balance job {job_id} done: {summary['windows']} windows, {summary['result']}")
+
+
+def recording_detection_doc(job: Dict, summary: Dict) -> Dict:
+    notes = f"{summary['flagged_windows']}/{summary['windows']} windows flagged over {summary['duration_s']:.0f}s"
+    return {
+        "user_id": job["user_id"],
+        "username": job["username"],
+        "detected_at": datetime.now(timezone.utc),
+        "model_version": summary["model_version"],
+        "input_type": "balance",
+        "test_result": {
+            "confidence_score": summary["confidence_score"],
+            "result": summary["result"],
+            "notes": notes,
+        },
+        "overall_result": summary["result"],
+        "additional_notes": notes,
+        "stroke_probability": summary["stroke_probability"],
+        "features": summary["mean_features"],
+        "sample_rate": summary["sample_rate"],
+        "source": "recording",
+        "job_id": str(job["_id"]),
+    }
@@ -0,0 +1,137 @@
+# service/balance_model.py
+
+import json
+import os
+from typing import Dict, List, Optional
+import numpy as np
+from service.balance import (
+    DEFAULT_SAMPLE_RATE, FEATURE_NAMES, GYRO_VARIANCE_LIMIT, JERKINESS_LIMIT, PATH_LENGTH_LIMIT,
+    SWAY_AREA_LIMIT, extract_features_batch, stack_sessions,
+)
+
+RULES_VERSION = "rules-v1"
+
+class BalanceClassifier:
+    """Logistic regression over FEATURE_NAMES, serialized as plain JSON.
+
+    {"version": str, "features": [...], "mean": [...], "scale": [...],
+     "coef": [...], "intercept": float, "threshold": float}
+
+    Written by `python train_balance_model.py`; loading is a json.load, so
+    every worker can afford its own copy.
+    """
+
+    def __init__(self, version: str, features, mean, scale, coef, intercept: float, threshold: float = 0.5):
+        unknown = set(features) - set(FEATURE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown balance features {sorted(unknown)}")
+        self.version = version
+        self.features = list(features)
+        self._columns = [FEATURE_NAMES.index(name) for name in self.features]
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.threshold = float(threshold)
+
+    @classmethod
+    def load(cls, path: str) -> "BalanceClassifier":
+        with open(path) as f:
+            spec = json.load(f)
+        return cls(spec["version"], spec["features"], spec["mean"], spec["scale"], spec["coef"],
+                   spec["intercept"], spec.get("threshold", 0.5))
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.version,
+            "features": self.features,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+            "threshold": self.threshold,
+        }
+
+    def stroke_probability(self, features: np.ndarray) -> np.ndarray:
+        z = (features[:, self._columns] - self.mean) / self.scale
+        return 1.0 / (1.0 + np.exp(-(z @ self.coef + self.intercept)))
+
+
+class RuleBalanceClassifier(BalanceClassifier):
+    """Fallback when no trained model is deployed: the original threshold rules
+    with a probability attached.
+
+    Each time-domain feature is divided by its limit; the largest ratio goes
+    through a logistic in log space, so p > 0.5 exactly when a limit is
+    exceeded (same verdict as the rules) and confidence grows with the margin.
+    """
+
+    LIMITS = {
+        "path_length": PATH_LENGTH_LIMIT,
+        "sway_area": SWAY_AREA_LIMIT,
+        "gyro_variance": GYRO_VARIANCE_LIMIT,
+        "jerkiness": JERKINESS_LIMIT,
+    }
+    SLOPE = 4.0
+
+    def __init__(self):
+        names = list(self.LIMITS)
+        super().__init__(RULES_VERSION, names, np.zeros(len(names)), np.array(list(self.LIMITS.values())),
+                         np.zeros(len(names)), 0.0)
+
+    def stroke_probability(self, features: np.ndarray) -> np.ndarray:
+        ratios = features[:, self._columns] / self.scale
+        worst = np.log(np.maximum(ratios.max(axis=1), 1e-12))
+        return 1.0 / (1.0 + np.exp(-self.SLOPE * worst))
+
+_RULES = RuleBalanceClassifier()
+
+def rules_stroke_probability(features: Dict[str, float]) -> float:
+    """RuleBalanceClassifier's probability from the four time-domain features alone
+    (e.g. OnlineBalanceStats, which has no spectral ones; the rules don't use them)."""
+    row = np.array([[features.get(name, 0.0) for name in FEATURE_NAMES]], dtype=np.float64)
+    return float(_RULES.stroke_probability(row)[0])
+
+
+def load_balance_classifier(path: Optional[str]) -> BalanceClassifier:
+    if path and os.path.exists(path):
+        classifier = BalanceClassifier.load(path)
+        print(f"✅ Balance classifier loaded ({classifier.version})")
+    else:
+        classifier = RuleBalanceClassifier()
+        print(f"⚠️ No balance classifier at {path}, using threshold rules ({classifier.version})")
+
+    # Compile the feature kernel now instead of on the first request
+    warm = np.zeros((1, 8, 3))
+    score_balance_batch(classifier, warm, warm)
+    return classifier
+
+
+def score_balance_batch(classifier: BalanceClassifier, accel, gyro, lengths: Optional[np.ndarray] = None,
+                        sample_rate: Optional[float] = None) -> List[Dict]:
+    """Classify stacked (or a list of ragged) sessions; same result shape the API stores."""
+    gyro_lengths = None
+    if isinstance(accel, (list, tuple)):
+        accel, lengths = stack_sessions(accel)
+        gyro, gyro_lengths = stack_sessions(gyro)
+
+    features = extract_features_batch(accel, gyro, lengths, sample_rate or DEFAULT_SAMPLE_RATE, gyro_lengths)
+    probabilities = classifier.stroke_probability(features)
+
+    results = []
+    for row, p in zip(features, probabilities):
+        stroke = bool(p >= classifier.threshold)
+        results.append({
+            "result": "stroke_detected" if stroke else "normal",
+            "confidence_score": round(float(p if stroke else 1.0 - p), 4),
+            "stroke_probability": round(float(p), 4),
+            "model_version": classifier.version,
+            "notes": "Bad Balance" if stroke else "Good Balance",
+            "features": {name: round(float(value), 6) for name, value in zip(FEATURE_NAMES, row)},
+        })
+    return results
+
+def score_balance(classifier: BalanceClassifier, accel, gyro, sample_rate: Optional[float] = None) -> Dict:
+    accel = np.asarray(accel, dtype=np.float64)
+    gyro = np.asarray(gyro, dtype=np.float64)
+    return score_balance_batch(classifier, accel[np.newaxis], gyro[np.newaxis], sample_rate=sample_rate)[0]
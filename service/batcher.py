@@ -0,0 +1,135 @@
+# service/batcher.py
+
+import asyncio
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from service.executor import SpeechExecutor
+
+class SpeechBatcher:
+    """Micro-batches concurrent speech requests into a single forward pass.
+
+    Requests are queued and collected until either `max_batch_size` inputs are
+    waiting or `max_wait_ms` has passed since the first one arrived. Every input
+    is already fixed at MAX_LENGTH samples, so the batch is a plain np.stack.
+    At most one batch per executor worker is in flight; while they are all busy
+    the queue keeps filling, so batches grow with load.
+    """
+
+    def __init__(self, executor: SpeechExecutor, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+
+        # 📊 Counters
+        self.requests_total = 0
+        self.batches_total = 0
+        self.batch_sizes = Counter()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.executor.workers)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        # Fail anything still waiting so callers don't hang on shutdown
+        while self._queue and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Speech batcher stopped"))
+
+    async def submit(self, audio: np.ndarray) -> Dict:
+        if self._task is None:
+            raise RuntimeError("Speech batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio, future))
+        return await future
+
+    async def submit_many(self, audio_rows: np.ndarray) -> List[Dict]:
+        # e.g. the windows of one long recording; they batch with everyone else's rows
+        return list(await asyncio.gather(*(self.submit(row) for row in audio_rows)))
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without yielding
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # Wait for a free worker first, so the batch keeps growing while all are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            # Drop callers that already went away (client disconnect / cancel)
+            batch = [(audio, future) for audio, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            self.requests_total += len(batch)
+            self.batches_total += 1
+            self.batch_sizes[len(batch)] += 1
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        try:
+            audio_batch = np.stack([audio for audio, _ in batch])
+            results = await self.executor.predict(audio_batch)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "batches_in_flight": len(self._inflight),
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batch_size_distribution": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+        }
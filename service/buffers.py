@@ -0,0 +1,72 @@
+# service/buffers.py
+
+import queue
+import threading
+from typing import Dict
+import numpy as np
+import torch
+
+class InputBufferPool:
+    """Reusable (rows, length) float32 input buffers.
+
+    Buffers are handed out per forward pass and returned afterwards, so steady
+    state inference allocates no new input memory. On CUDA the buffers are
+    pinned, which makes the host-to-device copy asynchronous.
+    """
+
+    def __init__(self, length: int, pin_memory: bool = False):
+        self.length = length
+        self.pin_memory = pin_memory
+        self._free: "queue.SimpleQueue[torch.Tensor]" = queue.SimpleQueue()
+        self._ones: Dict[int, torch.Tensor] = {}
+        self._lock = threading.Lock()
+        self.allocated = 0
+
+    def acquire(self, rows: int) -> torch.Tensor:
+        while True:
+            try:
+                buffer = self._free.get_nowait()
+            except queue.Empty:
+                break
+            if buffer.shape[0] >= rows:
+                return buffer
+            # Too small for this batch; drop it and allocate a bigger one below
+        with self._lock:
+            self.allocated += 1
+        capacity = 1 << max(0, rows - 1).bit_length()  # next power of two
+        return torch.empty((capacity, self.length), dtype=torch.float32, pin_memory=self.pin_memory)
+
+    def release(self, buffer: torch.Tensor):
+        self._free.put(buffer)
+
+    def attention_mask(self, rows: int) -> torch.Tensor:
+        # Inputs are never padded, so the mask is all ones; build it once per size
+        mask = self._ones.get(rows)
+        if mask is None:
+            mask = self._ones[rows] = torch.ones((rows, self.length), dtype=torch.long)
+        return mask
+
+
+_pools: Dict[tuple, InputBufferPool] = {}
+_pools_lock = threading.Lock()
+
+def get_buffer_pool(length: int, device: torch.device) -> InputBufferPool:
+    key = (length, device.type)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = InputBufferPool(length, pin_memory=device.type == "cuda")
+        return _pools[key]
+
+def normalize_into(audio_batch: np.ndarray, out: np.ndarray):
+    """Zero-mean/unit-variance per row, written straight into `out`.
+
+    Same expression Wav2Vec2FeatureExtractor.zero_mean_unit_var_norm uses,
+    evaluated with `out=` so no temporaries of the input size are created.
+    """
+    for row, x in zip(out, audio_batch):
+        np.subtract(x, x.mean(), out=row)
+        np.divide(row, np.sqrt(x.var() + 1e-7), out=row)
+
+def supports_fused_inputs(processor) -> bool:
+    extractor = getattr(processor, "feature_extractor", None)
+    return extractor is not None and hasattr(extractor, "do_normalize") and extractor.feature_size == 1
@@ -0,0 +1,128 @@
+# service/cache.py
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from db.collections import get_collection
+
+class ResultCache:
+    """Content-addressed cache for analysis results.
+
+    Tier 1 is an in-process LRU bounded by entry count and approximate size,
+    with a TTL per entry. Tier 2 (optional) is a Mongo collection shared by all
+    workers, expired by a TTL index on `created_at`.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024,
+                 ttl_seconds: int = 3600, shared_collection: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.shared_collection = shared_collection
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+
+        # 📊 Counters
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(kind: str, model_version: str, *parts: bytes) -> str:
+        digest = hashlib.sha256(f"{kind}:{model_version}".encode())
+        for part in parts:
+            digest.update(part)
+        return digest.hexdigest()
+
+    async def ensure_indexes(self):
+        if self.shared_collection:
+            collection = get_collection(self.shared_collection)
+            try:
+                await collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+            except OperationFailure as e:
+                # RESULT_CACHE_TTL_SECONDS changed: update the existing TTL index in place
+                if e.code != 85:  # IndexOptionsConflict
+                    raise
+                await collection.database.command({"collMod": self.shared_collection, "index": {
+                    "keyPattern": {"created_at": 1}, "expireAfterSeconds": self.ttl_seconds}})
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = self._get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.shared_collection:
+            try:
+                doc = await get_collection(self.shared_collection).find_one({"_id": key})
+            except PyMongoError as e:
+                print(f"⚠️ Shared cache lookup failed: {e}")
+                doc = None
+            if doc is not None:
+                self.shared_hits += 1
+                self._set_local(key, doc["result"])
+                return doc["result"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict):
+        self._set_local(key, value)
+        if self.shared_collection:
+            try:
+                await get_collection(self.shared_collection).replace_one(
+                    {"_id": key},
+                    {"_id": key, "result": value, "created_at": datetime.now(timezone.utc)},
+                    upsert=True
+                )
+            except PyMongoError as e:
+                print(f"⚠️ Shared cache write failed: {e}")
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Dict):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "shared_tier": bool(self.shared_collection),
+        }
@@ -0,0 +1,167 @@
+# service/executor.py
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing as mp
+from typing import Dict, List, Optional
+import numpy as np
+import torch
+from service.audio import InsufficientSpeechError
+from service.metrics import collect_stages, observe_stages
+from service.profiling import current_capture, profiled_call
+from service.ml import MAX_LENGTH, MIN_VOICED_SEC, load_model, preprocess_audio_from_bytes, preprocess_audio_windows, predict_batch
+
+EXECUTOR_KINDS = ("thread", "process")
+
+# === Process-pool worker state (one model per worker process) ===
+_worker_model = None
+
+def _init_process_worker(model_path: str, backend: str, mmap_weights: bool, torch_threads: int, warmed):
+    global _worker_model
+    torch.set_num_threads(torch_threads)
+    _worker_model = load_model(model_path, backend=backend, mmap_weights=mmap_weights)
+    # Warm up here so every worker is warm before it takes any job, then report in
+    _process_predict(np.zeros((1, MAX_LENGTH), dtype=np.float32))
+    with warmed.get_lock():
+        warmed.value += 1
+
+def _noop():
+    return None
+
+def _process_predict(audio_batch: np.ndarray) -> List[Dict]:
+    processor, model, device = _worker_model
+    return predict_batch(audio_batch, processor, model, device)
+
+
+class SpeechExecutor:
+    """Runs speech decoding and inference off the event loop.
+
+    kind="thread": a thread pool sharing the model loaded in this process.
+    kind="process": a process pool where every worker loads its own model, so
+    one pod can use all of its cores without fighting over the GIL.
+    """
+
+    def __init__(self, kind: str, model_path: str, workers: int = 0, backend: str = "torch",
+                 mmap_weights: bool = False, min_voiced_sec: Optional[float] = MIN_VOICED_SEC):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown speech executor '{kind}', expected one of {EXECUTOR_KINDS}")
+        self.kind = kind
+        self.model_path = model_path
+        self.backend = backend
+        self.mmap_weights = mmap_weights
+        self.workers = workers or os.cpu_count() or 1
+        self.min_voiced_sec = min_voiced_sec  # None disables the voice-activity gate
+
+        # 📊 Voice-activity gate counters
+        self.gate_checked = 0
+        self.gate_rejected = 0
+
+        self.processor = None
+        self.model = None
+        self.device = None
+        self._pool: Executor = None
+        self._warmed = None  # process pool: workers done loading + warming up
+        self._closed = False
+
+    def start(self):
+        if self.kind == "thread":
+            self.processor, self.model, self.device = load_model(
+                self.model_path, backend=self.backend, mmap_weights=self.mmap_weights
+            )
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="speech")
+        else:
+            # Split the cores between workers instead of every worker grabbing all of them
+            torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            context = mp.get_context("spawn")
+            self._warmed = context.Value("i", 0)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_process_worker,
+                initargs=(self.model_path, self.backend, self.mmap_weights, torch_threads, self._warmed)
+            )
+        if self._closed:
+            # shutdown() ran while the model was loading (startup failed): don't leak the pool
+            self.shutdown()
+            raise RuntimeError("Speech executor was shut down during start-up")
+        print(f"✅ Speech executor started ({self.kind}, {self.workers} workers, {self.backend} backend)")
+
+    def shutdown(self):
+        self._closed = True
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, fn, *args, model_stage: bool = False):
+        loop = asyncio.get_running_loop()
+        capture = current_capture()
+        call = (fn, *args)
+        if capture is not None:
+            # Request picked by an admin profiling session (service/profiling.py)
+            options = {**capture.options, "torch": capture.options["torch"] and model_stage}
+            call = (profiled_call, fn, args, options)
+
+        if self.kind == "process":
+            # Stage timings observed in a worker would stay in its own registry:
+            # they come back with the result and are observed here
+            try:
+                result, stages = await loop.run_in_executor(self._pool, collect_stages, *call)
+            except Exception as e:
+                observe_stages(getattr(e, "stages", ()))
+                raise
+            observe_stages(stages)
+        else:
+            result = await loop.run_in_executor(self._pool, *call)
+
+        if capture is not None:
+            result, part = result
+            capture.add(part)
+        return result
+
+    async def _gated(self, fn, *args):
+        # Count uploads short-circuited by the voice-activity gate (no model compute spent)
+        if self.min_voiced_sec is None:
+            return await self._run(fn, *args, None)
+        self.gate_checked += 1
+        try:
+            return await self._run(fn, *args, self.min_voiced_sec)
+        except InsufficientSpeechError:
+            self.gate_rejected += 1
+            raise
+
+    async def preprocess(self, audio_bytes: bytes) -> np.ndarray:
+        return await self._gated(preprocess_audio_from_bytes, audio_bytes)
+
+    async def preprocess_windows(self, audio_bytes: bytes, hop: int, max_windows: int):
+        return await self._gated(preprocess_audio_windows, audio_bytes, hop, max_windows)
+
+    async def predict(self, audio_batch: np.ndarray) -> List[Dict]:
+        if self.kind == "thread":
+            return await self._run(predict_batch, audio_batch, self.processor, self.model, self.device,
+                                   model_stage=True)
+        return await self._run(_process_predict, audio_batch, model_stage=True)
+
+    async def warm_up(self):
+        # Synthetic forward pass so the first real request doesn't pay lazy init costs
+        if self.kind == "thread":
+            await self.predict(np.zeros((1, MAX_LENGTH), dtype=np.float32))
+            return
+        # Process pool: workers warm up in their initializer. One job each makes
+        # the pool spawn all of them; ready once every initializer has reported.
+        loop = asyncio.get_running_loop()
+        jobs = [loop.run_in_executor(self._pool, _noop) for _ in range(self.workers)]
+        while self._warmed.value < self.workers:
+            done = [job for job in jobs if job.done()]
+            for job in done:
+                job.result()  # a worker that failed to start breaks the pool: raise here
+            await asyncio.sleep(0.05)
+        await asyncio.gather(*jobs)
+
+    def gate_stats(self) -> Dict:
+        return {
+            "enabled": self.min_voiced_sec is not None,
+            "min_voiced_sec": self.min_voiced_sec,
+            "checked": self.gate_checked,
+            "short_circuited": self.gate_rejected,
+        }
@@ -0,0 +1,168 @@
+# service/gaze.py
+
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+# MediaPipe FaceMesh (refine_landmarks=True) indices, as in eye_test.py
+LEFT_EYE_INDICES = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE_INDICES = [362, 385, 387, 263, 373, 380]
+LEFT_IRIS_INDICES = [468, 469, 470, 471, 472]
+RIGHT_IRIS_INDICES = [473, 474, 475, 476, 477]
+MESH_LANDMARKS = 478
+
+# The 22 points gaze needs, in this order; clients may send just these
+GAZE_LANDMARK_INDICES = LEFT_EYE_INDICES + RIGHT_EYE_INDICES + LEFT_IRIS_INDICES + RIGHT_IRIS_INDICES
+_LEFT_EYE = slice(0, 6)
+_RIGHT_EYE = slice(6, 12)
+_LEFT_IRIS = slice(12, 17)
+_RIGHT_IRIS = slice(17, 22)
+
+# All 8 possible gaze directions
+DIRECTIONS = ["Left", "Right", "Up", "Down",
+              "Up-Left", "Up-Right", "Down-Left", "Down-Right"]
+DIRECTION_VECTORS = {
+    "Left": (-1, 0),
+    "Right": (1, 0),
+    "Up": (0, -1),
+    "Down": (0, 1),
+    "Up-Left": (-1, -1),
+    "Up-Right": (1, -1),
+    "Down-Left": (-1, 1),
+    "Down-Right": (1, 1)
+}
+
+# [vertical + 1][horizontal + 1] with -1 = Up/Left, 0 = neither, 1 = Down/Right
+_DIRECTION_GRID = np.array([
+    ["Up-Left", "Up", "Up-Right"],
+    ["Left", "Center", "Right"],
+    ["Down-Left", "Down", "Down-Right"],
+], dtype=object)
+
+LOW, HIGH = 0.4, 0.6
+
+
+# === Single frame (live desktop test) ===
+def get_gaze_ratio(eye_landmarks, iris_landmarks, frame_shape=None):
+    """Calculate gaze direction ratios for one eye"""
+    eye_region = np.array([(landmark[0], landmark[1]) for landmark in eye_landmarks])
+    x_min, y_min = np.min(eye_region, axis=0)
+    x_max, y_max = np.max(eye_region, axis=0)
+
+    iris_center = np.mean(iris_landmarks, axis=0)
+
+    x_ratio = (iris_center[0] - x_min) / (x_max - x_min)
+    y_ratio = (iris_center[1] - y_min) / (y_max - y_min)
+
+    return x_ratio, y_ratio
+
+def determine_gaze_direction(x_ratio, y_ratio):
+    """Determine gaze direction based on normalized ratios"""
+    horizontal = ""
+    vertical = ""
+
+    if x_ratio < LOW:
+        horizontal = "Left"
+    elif x_ratio > HIGH:
+        horizontal = "Right"
+
+    if y_ratio < LOW:
+        vertical = "Up"
+    elif y_ratio > HIGH:
+        vertical = "Down"
+
+    if not horizontal and not vertical:
+        return "Center"
+
+    direction = f"{vertical}-{horizontal}" if vertical and horizontal else f"{vertical}{horizontal}"
+    return direction.replace("--", "-").strip("-")
+
+
+# === Batches of frames ===
+def select_gaze_landmarks(landmarks: np.ndarray) -> np.ndarray:
+    """(frames, 478|22, 2|3) landmarks -> (frames, 22, 2) gaze points."""
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    if landmarks.ndim != 3 or landmarks.shape[2] not in (2, 3):
+        raise ValueError(f"Expected landmarks shaped (frames, points, 2|3), got {landmarks.shape}")
+    if landmarks.shape[1] == len(GAZE_LANDMARK_INDICES):
+        return landmarks[:, :, :2]
+    if landmarks.shape[1] >= MESH_LANDMARKS:
+        return landmarks[:, GAZE_LANDMARK_INDICES, :2]
+    raise ValueError(f"Expected {MESH_LANDMARKS} mesh or {len(GAZE_LANDMARK_INDICES)} gaze landmarks per frame, "
+                     f"got {landmarks.shape[1]}")
+
+def to_pixels(points: np.ndarray, frame_width: int, frame_height: int) -> np.ndarray:
+    # int(p.x * w) truncation, exactly what the desktop test does per landmark
+    return (points * np.array([frame_width, frame_height])).astype(np.int64)
+
+def gaze_ratios(points: np.ndarray) -> np.ndarray:
+    """(frames, 22, 2) gaze points -> (frames, 2) x/y ratios averaged over both eyes.
+
+    Frames where an eye has zero width/height come out as NaN.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    ratios = []
+    for eye, iris in ((_LEFT_EYE, _LEFT_IRIS), (_RIGHT_EYE, _RIGHT_IRIS)):
+        lo = points[:, eye].min(axis=1)
+        hi = points[:, eye].max(axis=1)
+        center = points[:, iris].mean(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = (center - lo) / (hi - lo)
+        ratio[~np.isfinite(ratio)] = np.nan
+        ratios.append(ratio)
+    return (ratios[0] + ratios[1]) / 2
+
+def classify_directions(x_ratio: np.ndarray, y_ratio: np.ndarray) -> np.ndarray:
+    """Vectorized determine_gaze_direction; a NaN ratio counts as neither side of its axis."""
+    x_ratio = np.asarray(x_ratio, dtype=np.float64)
+    y_ratio = np.asarray(y_ratio, dtype=np.float64)
+    horizontal = (x_ratio > HIGH).astype(np.int8) - (x_ratio < LOW).astype(np.int8)
+    vertical = (y_ratio > HIGH).astype(np.int8) - (y_ratio < LOW).astype(np.int8)
+    return _DIRECTION_GRID[vertical + 1, horizontal + 1]
+
+def analyze_gaze_frames(landmarks, instructions: Sequence[str], frame_width: Optional[int] = None,
+                        frame_height: Optional[int] = None, expected: Sequence[str] = ()) -> Dict:
+    """Score a recorded gaze test: per-frame landmarks plus the direction shown on each frame.
+
+    A direction counts as matched once any frame shown with that instruction
+    looks that way, the same rule the live test applies. Every instructed
+    direction, plus any in `expected` (e.g. shown while the face was lost),
+    must be matched for a "normal" result.
+    """
+    points = select_gaze_landmarks(landmarks)
+    instructions = np.asarray(instructions, dtype=object)
+    if len(instructions) != len(points):
+        raise ValueError(f"Got {len(points)} frames but {len(instructions)} instructions")
+    unknown = (set(instructions.tolist()) | set(expected)) - set(DIRECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown gaze directions {sorted(unknown)}")
+
+    if frame_width and frame_height:
+        points = to_pixels(points, frame_width, frame_height)
+    ratios = gaze_ratios(points)
+    gazes = classify_directions(ratios[:, 0], ratios[:, 1])
+    matches = gazes == instructions
+
+    directions: Dict[str, Dict] = {}
+    for direction in DIRECTIONS:
+        shown = instructions == direction
+        frames = int(shown.sum())
+        if frames == 0 and direction not in expected:
+            continue
+        matched_frames = int((matches & shown).sum())
+        directions[direction] = {"frames": frames, "matched_frames": matched_frames, "matched": matched_frames > 0}
+
+    tested = len(directions)
+    matched = sum(d["matched"] for d in directions.values())
+    normal = tested > 0 and matched == tested
+    return {
+        "result": "normal" if normal else "stroke_detected",
+        # Share of tested directions that agree with the verdict
+        "confidence_score": round(matched / tested if normal else (tested - matched) / max(tested, 1), 4),
+        "notes": (f"No abnormalities detected - all {tested} directions matched" if normal
+                  else f"Potential abnormalities detected - matched {matched}/{tested} directions"),
+        "matched_directions": matched,
+        "tested_directions": tested,
+        "directions": directions,
+        "frames": len(points),
+        "untracked_frames": int(np.isnan(ratios).any(axis=1).sum()),
+    }
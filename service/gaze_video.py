@@ -0,0 +1,277 @@
+# service/gaze_video.py
+
+import importlib
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from service.gaze import DIRECTIONS, GAZE_LANDMARK_INDICES, analyze_gaze_frames, classify_directions, gaze_ratios, to_pixels
+from service.metrics import stage_timer
+
+DEFAULT_LANDMARKER = "service.gaze_video:face_mesh_landmarker"
+
+# A landmarker takes an RGB image and returns ((22, 2) gaze points, (x0, y0, x1, y1)
+# face box), both normalized to that image, or None when there is no face.
+# A tracking landmarker also has a reset() that forgets the previous frames.
+Landmarker = Callable[[np.ndarray], Optional[Tuple[np.ndarray, np.ndarray]]]
+
+
+def face_mesh_landmarker() -> Landmarker:
+    """MediaPipe FaceMesh with iris refinement, as in eye_test.py."""
+    import mediapipe as mp_solutions
+    face_mesh = mp_solutions.solutions.face_mesh.FaceMesh(
+        static_image_mode=False,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5)
+
+    def detect(rgb: np.ndarray):
+        results = face_mesh.process(rgb)
+        if not results.multi_face_landmarks:
+            return None
+        mesh = np.array([(p.x, p.y) for p in results.multi_face_landmarks[0].landmark])
+        return mesh[GAZE_LANDMARK_INDICES], np.concatenate([mesh.min(axis=0), mesh.max(axis=0)])
+
+    detect.reset = face_mesh.reset
+    return detect
+
+def _resolve(spec: str):
+    module, name = spec.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+# === Process-pool worker state (one landmarker per worker process) ===
+_worker_landmarker: Optional[Landmarker] = None
+
+def _init_gaze_worker(landmarker: str):
+    global _worker_landmarker
+    import cv2
+    cv2.setNumThreads(1)  # the pool is the parallelism
+    _worker_landmarker = _resolve(landmarker)()
+
+def _detect_frames(frames: List[np.ndarray]) -> List:
+    # A task is a contiguous run of same-sized frames (one crop) from one video,
+    # so FaceMesh tracking stays warm within it. Tasks from other uploads, or
+    # full frames/other crops of this one, run on the same worker in between:
+    # start every task from a fresh detection.
+    import cv2
+    reset = getattr(_worker_landmarker, "reset", None)
+    if reset is not None:
+        reset()
+    return [_worker_landmarker(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+
+
+class GazeVideoPool:
+    """FaceMesh spread over worker processes, one landmarker instance per worker."""
+
+    def __init__(self, workers: int = 2, landmarker: str = DEFAULT_LANDMARKER):
+        self.workers = max(1, workers)
+        self.landmarker = landmarker
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_gaze_worker,
+            initargs=(self.landmarker,)
+        )
+        print(f"✅ Gaze video pool started ({self.workers} workers, {self.landmarker})")
+
+    def shutdown(self):
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def ensure_started(self):
+        # Spawning workers and building their landmarkers takes seconds; waiting
+        # here keeps that out of the per-video timings
+        with self._lock:
+            if self._pool is None:
+                self.start()
+                list(self._pool.map(_detect_frames, [[]] * self.workers))
+
+    def detect(self, frames: List[np.ndarray]) -> List:
+        self.ensure_started()
+        per_task = -(-len(frames) // self.workers)
+        runs = [frames[i:i + per_task] for i in range(0, len(frames), per_task)]
+        return [result for run in self._pool.map(_detect_frames, runs) for result in run]
+
+
+# === Decoding ===
+def iter_frames(capture, stride: Callable[[int], Optional[int]]) -> Iterator[Tuple[int, np.ndarray]]:
+    """(index, BGR frame) from an open cv2.VideoCapture, streamed one at a time.
+
+    After each yielded frame, stride(index) says how far to advance (None
+    stops); the frames in between are only grabbed, never retrieved/converted.
+    """
+    index = 0
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            return
+        yield index, frame
+        step = stride(index)
+        if step is None:
+            return
+        step = max(1, step)
+        for _ in range(step - 1):
+            if not capture.grab():
+                return
+        index += step
+
+
+class Schedule:
+    """Which direction was on screen when: [{"direction", "start_s", "end_s"}, ...]."""
+
+    def __init__(self, segments: Sequence[Dict]):
+        segments = sorted(segments, key=lambda s: s["start_s"])
+        for segment in segments:
+            if segment["direction"] not in DIRECTIONS:
+                raise ValueError(f"Unknown gaze direction '{segment['direction']}'")
+            if segment["end_s"] <= segment["start_s"]:
+                raise ValueError(f"Empty schedule segment {segment}")
+        self.directions = [s["direction"] for s in segments]
+        self.starts = np.array([s["start_s"] for s in segments], dtype=np.float64)
+        self.ends = np.array([s["end_s"] for s in segments], dtype=np.float64)
+
+    def segment_at(self, t: float) -> int:
+        """Index of the segment showing at t, -1 if none."""
+        i = int(np.searchsorted(self.starts, t, side="right")) - 1
+        return i if i >= 0 and t < self.ends[i] else -1
+
+    def next_start(self, t: float) -> Optional[float]:
+        i = int(np.searchsorted(self.starts, t, side="right"))
+        return float(self.starts[i]) if i < len(self.starts) else None
+
+
+def _expand_roi(box: np.ndarray, margin: float, width: int, height: int) -> Tuple[int, int, int, int]:
+    # Normalized face box -> pixel crop with `margin` of the face size on every side
+    x0, y0, x1, y1 = box
+    mx, my = (x1 - x0) * margin, (y1 - y0) * margin
+    return (max(0, int((x0 - mx) * width)), max(0, int((y0 - my) * height)),
+            min(width, int(np.ceil((x1 + mx) * width))), min(height, int(np.ceil((y1 + my) * height))))
+
+
+def analyze_gaze_video(path: str, schedule: Sequence[Dict], pool: GazeVideoPool, max_skip: int = 8,
+                       roi_margin: float = 0.3, stable_frames: int = 3, batch_per_worker: int = 4) -> Dict:
+    """Run the gaze test on a recorded video, headless.
+
+    - Frames are decoded one at a time; nothing holds more than one batch.
+    - Once an instruction is matched, or outside any instruction, decoding
+      jumps to the next instruction; while the gaze stays the same for
+      `stable_frames` analyzed frames the stride doubles up to `max_skip`.
+    - After a face is found, only its box (plus `roi_margin`) is sent to the
+      workers; a miss or a face near the crop edge goes back to full frames.
+    """
+    import cv2
+
+    plan = Schedule(schedule)
+    pool.ensure_started()
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError("Could not open the video")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    matched = set()
+    recent: List[str] = []
+    skip = 1
+
+    def stride(index: int) -> Optional[int]:
+        t = index / fps
+        segment = plan.segment_at(t)
+        if segment < 0 or plan.directions[segment] in matched:
+            upcoming = plan.next_start(t)
+            # None past the last instruction: nothing left to look at
+            return int(np.ceil((upcoming - t) * fps)) if upcoming is not None else None
+        return skip
+
+    roi = None
+    points, instructions = [], []
+    position = analyzed = tracked = 0
+    started = time.perf_counter()
+    frames = iter_frames(capture, stride)
+    try:
+        while True:
+            batch = []
+            with stage_timer("gaze", "decode"):
+                for index, frame in frames:
+                    segment = plan.segment_at(index / fps)
+                    if segment < 0:
+                        continue
+                    batch.append((index, segment, roi, frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]))
+                    if len(batch) == pool.workers * batch_per_worker:
+                        break
+            if not batch:
+                break
+            position = batch[-1][0] + 1
+            analyzed += len(batch)
+
+            with stage_timer("gaze", "forward"):
+                detections = pool.detect([crop for _, _, _, crop in batch])
+            batch_points, batch_segments = [], []
+            for (index, segment, crop_roi, crop), detection in zip(batch, detections):
+                if detection is None:
+                    roi = None
+                    continue
+                gaze, box = detection
+                if crop_roi is not None:
+                    # Crop-normalized -> frame-normalized
+                    x0, y0, x1, y1 = crop_roi
+                    scale = np.array([(x1 - x0) / width, (y1 - y0) / height])
+                    offset = np.array([x0 / width, y0 / height])
+                    gaze = gaze * scale + offset
+                    box = box * np.tile(scale, 2) + np.tile(offset, 2)
+                    # Face drifting out of the crop (sides clamped at the frame border can't clip)
+                    gaps = [box[0] - x0 / width if x0 > 0 else 1.0, box[1] - y0 / height if y0 > 0 else 1.0,
+                            x1 / width - box[2] if x1 < width else 1.0, y1 / height - box[3] if y1 < height else 1.0]
+                    if min(gaps) < 0.02:
+                        roi = None
+                        continue
+                if roi is None:
+                    roi = _expand_roi(box, roi_margin, width, height)
+                batch_points.append(gaze)
+                batch_segments.append(segment)
+            tracked += len(batch_points)
+            if not batch_points:
+                continue
+
+            # Same classification as the final summary, to steer skipping
+            ratios = gaze_ratios(to_pixels(np.array(batch_points), width, height))
+            gazes = classify_directions(ratios[:, 0], ratios[:, 1])
+            for gaze, segment in zip(gazes, batch_segments):
+                if gaze == plan.directions[segment]:
+                    matched.add(gaze)
+                recent = (recent + [gaze])[-stable_frames:]
+            stable = len(recent) == stable_frames and len(set(recent)) == 1
+            skip = min(max_skip, skip * 2) if stable else 1
+
+            points.extend(batch_points)
+            instructions.extend(plan.directions[s] for s in batch_segments)
+    finally:
+        capture.release()
+
+    if not tracked:
+        raise ValueError("No face found in the video")
+    elapsed = time.perf_counter() - started
+    summary = analyze_gaze_frames(np.array(points).reshape(-1, len(GAZE_LANDMARK_INDICES), 2), instructions,
+                                  width, height, expected=plan.directions)
+    summary["video"] = {
+        "fps": round(fps, 3),
+        "width": width,
+        "height": height,
+        "analyzed_until_s": round(position / fps, 3),
+        "frames_read": position,
+        "frames_analyzed": analyzed,
+        "frames_tracked": tracked,
+        "elapsed_s": round(elapsed, 3),
+        "frames_per_s": round(analyzed / elapsed, 2) if elapsed else 0.0,
+        "realtime_factor": round(position / fps / elapsed, 2) if elapsed else 0.0,
+    }
+    return summary
@@ -0,0 +1,168 @@
+# service/metrics.py
+#
+# In-process Prometheus metrics, exposed at /metrics.
+#
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+# directory shared by the workers (wipe it before each deploy): every worker
+# then writes its samples there and whichever worker answers the scrape
+# reports the sum over all of them. The variable must be set before this
+# module is first imported.
+#
+# Stage timings taken inside a pool worker process (SPEECH_EXECUTOR=process)
+# are sent back with the result (collect_stages) and observed by the parent,
+# so they reach /metrics with or without multiprocess mode.
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import psutil
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# === HTTP ===
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response body was fully sent",
+    ["method", "route"], buckets=REQUEST_BUCKETS
+)
+
+# === Inference stages ===
+STAGE_LATENCY = Histogram(
+    "inference_stage_duration_seconds", "Time per inference stage (decode, preprocess, forward)",
+    ["kind", "stage"], buckets=STAGE_BUCKETS
+)
+
+# === Process gauges, sampled on a timer (summed over live workers) ===
+PROCESS_CPU = Gauge("process_cpu_percent", "Process CPU use, 100 = one core", multiprocess_mode="livesum")
+PROCESS_RSS = Gauge("process_resident_memory_bytes_sampled", "Process resident memory", multiprocess_mode="livesum")
+COMPONENT_STAT = Gauge(
+    "app_component_stat", "Counters from /api/v1/stats (cache, speech batcher/gate, telemetry)",
+    ["component", "stat"], multiprocess_mode="livesum"
+)
+
+
+def route_label(scope) -> str:
+    # The route template ("/api/v1/balance_jobs/{job_id}"), never the raw path,
+    # so ids don't explode the label set
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    REQUESTS.labels(method, route, str(status)).inc()
+    REQUEST_LATENCY.labels(method, route).observe(seconds)
+
+# Set inside collect_stages(): timings are gathered for the parent instead of observed
+_collected_stages: ContextVar[Optional[list]] = ContextVar("collected_stages", default=None)
+
+@contextmanager
+def stage_timer(kind: str, stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        collected = _collected_stages.get()
+        if collected is None:
+            STAGE_LATENCY.labels(kind, stage).observe(seconds)
+        else:
+            collected.append((kind, stage, seconds))
+
+def collect_stages(fn: Callable, *args):
+    """Run fn(*args) in a pool worker; returns (result, [(kind, stage, seconds), ...]).
+
+    On failure the timings ride along on the exception as `.stages`.
+    """
+    collected = []
+    token = _collected_stages.set(collected)
+    try:
+        return fn(*args), collected
+    except Exception as e:
+        e.stages = collected  # pickled with the exception's __dict__
+        raise
+    finally:
+        _collected_stages.reset(token)
+
+def observe_stages(stages: Iterable[Tuple[str, str, float]]):
+    for kind, stage, seconds in stages:
+        STAGE_LATENCY.labels(kind, stage).observe(seconds)
+
+
+class ProcessSampler:
+    """Samples this process's CPU/RSS and the app's stats counters every `interval_s`.
+
+    The latest sample stays in `latest` so request profiling can reuse it
+    instead of querying psutil per request.
+    """
+
+    def __init__(self, interval_s: float = 5.0, sources: Optional[Dict[str, Callable[[], Dict]]] = None):
+        self.interval = max(0.1, interval_s)
+        self.sources = sources or {}
+        self.process = psutil.Process()
+        self.process.cpu_percent(interval=None)  # primes the CPU delta
+        self.latest = {"cpu_percent": 0.0, "rss_mb": self.process.memory_info().rss / (1024 * 1024)}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.sample()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if MULTIPROCESS:
+            # Drop this worker's live gauges from the shared directory
+            multiprocess.mark_process_dead(os.getpid())
+
+    def sample(self):
+        cpu = self.process.cpu_percent(interval=None)
+        rss = self.process.memory_info().rss
+        PROCESS_CPU.set(cpu)
+        PROCESS_RSS.set(rss)
+        self.latest = {"cpu_percent": cpu, "rss_mb": rss / (1024 * 1024)}
+
+        for component, stats in self.sources.items():
+            for stat, value in _numeric(stats()).items():
+                COMPONENT_STAT.labels(component, stat).set(value)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sample()
+
+
+def _numeric(stats: Dict, prefix: str = "") -> Dict[str, float]:
+    # Flatten {"pushed": {"logs": 3}} -> {"pushed_logs": 3}; skip non-numbers
+    flat = {}
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_numeric(value, f"{name}_"))
+        elif isinstance(value, (int, float)):
+            flat[name] = float(value)
+    return flat
+
+
+def render_metrics():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
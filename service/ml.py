@@ -3,10 +3,13 @@
 import os
 import torch
 import numpy as np
-import librosa
-from typing import Dict
+from typing import Dict, List, Optional, Tuple, Union
 from transformers import Wav2Vec2Processor, Wav2Vec2ForSequenceClassification
-import io
+from service.audio import decode_audio, voiced_span
+from service.weights import share_weights_from_safetensors
+from service.buffers import get_buffer_pool, normalize_into, supports_fused_inputs
+from service.metrics import stage_timer
+from service.backends import BACKENDS, TorchBackend, QuantizedTorchBackend, OnnxBackend, default_onnx_path
 
 # Constants
 MODEL_PATH = "outputs/wav2vec2_full_20250516-042720"
@@ -14,70 +17,184 @@ TARGET_DURATION = 4.2
 TARGET_SR = 16000
 MAX_LENGTH = int(TARGET_DURATION * TARGET_SR)
 
+# Windowed mode (long recordings)
+WINDOW_HOP = MAX_LENGTH // 2  # 50% overlap
+MAX_WINDOWS = 8
+AGGREGATIONS = ("mean", "max", "vote")
+
+# Voice-activity gate
+MIN_VOICED_SEC = 0.5
+MAX_LEADING_SILENCE = int(2.0 * TARGET_SR)  # extra samples decoded so trimmed lead-in doesn't eat the window
+
 # Disable advisory warnings
 os.environ["TRANSFORMERS_NO_ADVISORY_WARNINGS"] = "true"
 
-def load_model(model_path: str):
-    processor = Wav2Vec2Processor.from_pretrained(model_path)
-    model = Wav2Vec2ForSequenceClassification.from_pretrained(model_path)
-    model.eval()
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model.to(device)
-    print("✅ Model loaded successfully")
-    return processor, model, device
-
+def load_model(model_path: str, backend: str = "torch", onnx_path: Optional[str] = None, mmap_weights: bool = False):
+    """Load the processor plus an inference backend ("torch", "int8" or "onnx").
 
-# === Preprocess audio ===
-def preprocess_audio(audio_path: str) -> np.ndarray:
-    # Load and resample to 16kHz
+    The returned model exposes `logits(inputs)`, so callers don't care which
+    backend is active. With `mmap_weights`, the fp32 torch backend on CPU keeps
+    its weights memory-mapped from the safetensors files so they are shared
+    across worker processes.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown speech backend '{backend}', expected one of {BACKENDS}")
 
-    audio, sr = librosa.load(audio_path, sr=None)
-    if sr != TARGET_SR:
-        audio = librosa.resample(audio, orig_sr=sr, target_sr=TARGET_SR)
+    processor = Wav2Vec2Processor.from_pretrained(model_path)
 
-    # Pad or truncate to fixed length
-    if len(audio) < MAX_LENGTH:
-        padding = MAX_LENGTH - len(audio)
-        audio = np.pad(audio, (0, padding), mode="constant")
+    if backend == "onnx":
+        model = OnnxBackend(onnx_path or default_onnx_path(model_path), intra_op_threads=torch.get_num_threads())
     else:
-        audio = audio[:MAX_LENGTH]
+        hf_model = Wav2Vec2ForSequenceClassification.from_pretrained(model_path)
+        hf_model.eval()
+        if backend == "int8":
+            model = QuantizedTorchBackend(hf_model)
+        else:
+            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            if mmap_weights and device.type == "cpu":
+                share_weights_from_safetensors(hf_model, model_path)
+            model = TorchBackend(hf_model.to(device), device)
 
-    return audio
-
-def preprocess_audio_from_bytes(audio_bytes: bytes) -> np.ndarray:
-    # Load from bytes and resample to 16kHz
-    audio_stream = io.BytesIO(audio_bytes)
-    audio, sr = librosa.load(audio_stream, sr=None)
+    print(f"✅ Model loaded successfully ({backend})")
+    return processor, model, model.device
 
-    if sr != TARGET_SR:
-        audio = librosa.resample(audio, orig_sr=sr, target_sr=TARGET_SR)
 
+# === Preprocess audio ===
+def _fit_length(audio: np.ndarray) -> np.ndarray:
     # Pad or truncate to fixed length
     if len(audio) < MAX_LENGTH:
         padding = MAX_LENGTH - len(audio)
         audio = np.pad(audio, (0, padding), mode="constant")
     else:
         audio = audio[:MAX_LENGTH]
-
     return audio
 
+def _decode_gated(source: Union[str, bytes], max_samples: int, min_voiced_sec: Optional[float]) -> Tuple[np.ndarray, int]:
+    # Returns (audio, samples trimmed from the start); min_voiced_sec=None disables the voice-activity gate
+    if min_voiced_sec is None:
+        return decode_audio(source, TARGET_SR, max_samples=max_samples), 0
+    audio = decode_audio(source, TARGET_SR, max_samples=max_samples + MAX_LEADING_SILENCE)
+    start, end = voiced_span(audio, TARGET_SR, min_voiced_sec)
+    return audio[start:end], start
+
+def preprocess_audio_source(source: Union[str, bytes], min_voiced_sec: Optional[float] = MIN_VOICED_SEC) -> np.ndarray:
+    # Decode only the 4.2 s window we keep, resampled straight to 16kHz float32
+    with stage_timer("speech", "decode"):
+        return _fit_length(_decode_gated(source, MAX_LENGTH, min_voiced_sec)[0])
+
+def preprocess_audio(audio_path: str, min_voiced_sec: Optional[float] = MIN_VOICED_SEC) -> np.ndarray:
+    return preprocess_audio_source(audio_path, min_voiced_sec)
+
+def preprocess_audio_from_bytes(audio_bytes: bytes, min_voiced_sec: Optional[float] = MIN_VOICED_SEC) -> np.ndarray:
+    return preprocess_audio_source(audio_bytes, min_voiced_sec)
+
+def frame_windows(audio: np.ndarray, hop: int = WINDOW_HOP, max_windows: int = MAX_WINDOWS):
+    """Cut audio into overlapping MAX_LENGTH windows; returns (windows, start_samples)."""
+    if len(audio) <= MAX_LENGTH:
+        return _fit_length(audio)[np.newaxis, :], np.array([0])
+
+    starts = np.arange(0, len(audio) - MAX_LENGTH + 1, hop)[:max_windows]
+    # Cover the tail with one window aligned to the end, if there's room for it
+    if starts[-1] + MAX_LENGTH < len(audio) and len(starts) < max_windows:
+        starts = np.append(starts, len(audio) - MAX_LENGTH)
+
+    windows = np.lib.stride_tricks.sliding_window_view(audio, MAX_LENGTH)[starts]
+    return np.ascontiguousarray(windows), starts
+
+def preprocess_audio_windows(source: Union[str, bytes], hop: int = WINDOW_HOP, max_windows: int = MAX_WINDOWS,
+                             min_voiced_sec: Optional[float] = MIN_VOICED_SEC):
+    # Decoding stops after the last window the cap allows, bounding the cost of long uploads
+    max_samples = MAX_LENGTH + hop * (max_windows - 1)
+    with stage_timer("speech", "decode"):
+        audio, offset = _decode_gated(source, max_samples, min_voiced_sec)
+        windows, starts = frame_windows(audio, hop, max_windows)
+    # Window times on the upload's timeline, not the trimmed audio's
+    return windows, starts + offset
 
-# === Predict function ===
-def analyze_speech_file(audio_bytes: bytes, processor, model, device) -> Dict:
-    audio_input = preprocess_audio_from_bytes(audio_bytes)
-
-    inputs = processor(audio_input, sampling_rate=TARGET_SR, return_tensors="pt", padding=True)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
-
-    with torch.no_grad():
-        logits = model(**inputs).logits
-        probs = torch.softmax(logits, dim=-1)
-        pred_class = torch.argmax(probs, dim=-1).item()
-        confidence = round(probs[0, pred_class].item(), 4)
 
+# === Predict function ===
+def _to_result(probs: np.ndarray) -> Dict:
+    pred_class = int(np.argmax(probs))
+    confidence = round(float(probs[pred_class]), 4)
     label = "stroke_detected" if pred_class == 1 else "normal"
-
     return {
         "result": label,
-        "confidence_score": confidence
-    }
\ No newline at end of file
+        "confidence_score": confidence,
+        "stroke_probability": round(float(probs[1]), 4)
+    }
+
+def aggregate_windows(window_results: List[Dict], starts: np.ndarray, method: str = "mean") -> Dict:
+    """Combine per-window predictions into one result ("mean", "max" or "vote")."""
+    if method not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{method}', expected one of {AGGREGATIONS}")
+
+    stroke = np.array([r["stroke_probability"] for r in window_results])
+    if method == "mean":
+        result = _to_result(np.array([1 - stroke.mean(), stroke.mean()]))
+    elif method == "max":
+        # Slurring in any single window flags the recording
+        result = _to_result(np.array([1 - stroke.max(), stroke.max()]))
+    else:
+        votes = np.mean([r["result"] == "stroke_detected" for r in window_results])
+        label = "stroke_detected" if votes >= 0.5 else "normal"
+        result = {
+            "result": label,
+            "confidence_score": round(float(votes if label == "stroke_detected" else 1 - votes), 4),
+            "stroke_probability": round(float(stroke.mean()), 4)
+        }
+
+    result["notes"] = f"{len(window_results)} windows, {method} aggregation"
+    result["windows"] = [
+        {
+            "start_s": round(float(start) / TARGET_SR, 3),
+            "end_s": round(float(start + MAX_LENGTH) / TARGET_SR, 3),
+            "result": r["result"],
+            "stroke_probability": r["stroke_probability"]
+        }
+        for start, r in zip(starts, window_results)
+    ]
+    return result
+
+def predict_batch(audio_batch: np.ndarray, processor, model, device) -> List[Dict]:
+    # audio_batch: (batch, MAX_LENGTH), every row already padded/truncated
+    if not supports_fused_inputs(processor):
+        with stage_timer("speech", "preprocess"):
+            inputs = processor(list(audio_batch), sampling_rate=TARGET_SR, return_tensors="pt", padding=True)
+        with stage_timer("speech", "forward"):
+            probs = torch.softmax(model.logits(inputs), dim=-1).cpu().numpy()
+        return [_to_result(row) for row in probs]
+
+    # Fast path: normalize straight into a pooled buffer and hand torch a
+    # zero-copy view, instead of the processor's list -> pad -> stack -> copy.
+    audio_batch = np.asarray(audio_batch, dtype=np.float32)
+    rows, length = audio_batch.shape
+    extractor = processor.feature_extractor
+    pool = get_buffer_pool(length, device)
+    buffer = pool.acquire(rows)
+    try:
+        with stage_timer("speech", "preprocess"):
+            input_values = buffer[:rows]
+            if extractor.do_normalize:
+                normalize_into(audio_batch, input_values.numpy())
+            else:
+                input_values.numpy()[:] = audio_batch
+            inputs = {"input_values": input_values}
+            if extractor.return_attention_mask:
+                inputs["attention_mask"] = pool.attention_mask(rows)
+        with stage_timer("speech", "forward"):
+            probs = torch.softmax(model.logits(inputs), dim=-1).cpu().numpy()
+    finally:
+        # Only reused once the forward pass (and any device copy) has finished
+        pool.release(buffer)
+
+    return [_to_result(row) for row in probs]
+
+def analyze_speech_file(audio_bytes: bytes, processor, model, device, windowed: bool = False,
+                        aggregate: str = "mean", hop: int = WINDOW_HOP, max_windows: int = MAX_WINDOWS) -> Dict:
+    if not windowed:
+        audio_input = preprocess_audio_from_bytes(audio_bytes)
+        return predict_batch(audio_input[np.newaxis, :], processor, model, device)[0]
+
+    # All windows go through the model as one batch
+    windows, starts = preprocess_audio_windows(audio_bytes, hop, max_windows)
+    return aggregate_windows(predict_batch(windows, processor, model, device), starts, aggregate)
\ No newline at end of file
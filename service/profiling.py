@@ -0,0 +1,241 @@
+# service/profiling.py
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from bson import Binary
+
+PROFILERS = ("sampling", "cprofile")
+# Request paths whose handlers run their stages through profiled_call (the
+# speech executor); a session can only record these
+PROFILED_PATHS = ("/api/v1/analyze_speech", "/api/v1/analyze_speech/batch")
+MAX_STACKS = 5000  # distinct collapsed stacks kept per profile
+
+# The capture for the request being profiled, if any. Set by
+# ProfilingMiddleware for sampled requests only; everything else sees None.
+_capture: ContextVar[Optional["ProfileCapture"]] = ContextVar("profile_capture", default=None)
+
+def current_capture() -> Optional["ProfileCapture"]:
+    return _capture.get()
+
+def activate_capture(capture: "ProfileCapture"):
+    return _capture.set(capture)
+
+def reset_capture(token):
+    _capture.reset(token)
+
+
+# === Worker side: one profiled stage (runs in the speech thread/process pool) ===
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler(threading.Thread):
+    """Statistical profiler: samples one thread's Python stack every `interval_ms`.
+
+    Frames from `root` (the profiled_call frame) outwards are left off, so
+    stacks start at the profiled stage rather than at thread bootstrap.
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float, root=None):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = max(0.5, interval_ms) / 1000.0
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and frame.f_code is not self.root:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> Counter:
+        self._done.set()
+        self.join()
+        return self.stacks
+
+def _cprofile_stacks(stats: Dict) -> Counter:
+    """Approximate collapsed stacks (microseconds of self time) from cProfile's caller graph.
+
+    cProfile only records caller -> callee edges, so each function's self
+    time is split across its callers in proportion to the time each caller
+    spent in it.
+    """
+    children: Dict[Tuple, List[Tuple[Tuple, float]]] = {}
+    for func, (_, _, _, cumtime, callers) in stats.items():
+        for caller, (_, _, _, edge_cumtime) in callers.items():
+            children.setdefault(caller, []).append((func, edge_cumtime / cumtime if cumtime else 0.0))
+    roots = [func for func, (_, _, _, _, callers) in stats.items() if not callers]
+
+    stacks = Counter()
+    def walk(func, path: Tuple[str, ...], share: float, seen: frozenset):
+        if share * stats[func][3] < 1e-6 or len(path) > 200:
+            return
+        filename, line, name = func
+        path = path + (f"{name} ({os.path.basename(filename)}:{line})",)
+        self_us = int(share * stats[func][2] * 1e6)
+        if self_us:
+            stacks[";".join(path)] += self_us
+        for child, fraction in children.get(func, []):
+            if child not in seen:
+                walk(child, path, share * fraction, seen | {child})
+
+    for root in roots:
+        walk(root, (), 1.0, frozenset([root]))
+    return stacks
+
+# The torch profiler is process-wide: two at once in one process break each
+# other (the speech thread pool runs stages concurrently). Only one stage per
+# process gets it; the others are marked `torch_skipped`.
+_torch_profiler_lock = threading.Lock()
+
+def profiled_call(fn: Callable, args: Tuple, options: Dict):
+    """Run fn(*args) under the requested profilers; returns (result, profile part).
+
+    Module-level so the speech process pool can pickle it.
+    """
+    profiler = options["profiler"]
+    sampler = prof = None
+    if profiler == "sampling":
+        sampler = StackSampler(threading.get_ident(), options["interval_ms"], root=profiled_call.__code__)
+        sampler.start()
+    else:
+        prof = cProfile.Profile()
+
+    torch_prof = nullcontext()
+    use_torch = bool(options.get("torch")) and _torch_profiler_lock.acquire(blocking=False)
+    if use_torch:
+        from torch.profiler import ProfilerActivity, profile
+        torch_prof = profile(activities=[ProfilerActivity.CPU])
+
+    started = time.perf_counter()
+    try:
+        with torch_prof:
+            if prof:
+                prof.enable()
+            try:
+                result = fn(*args)
+            finally:
+                if prof:
+                    prof.disable()
+    finally:
+        wall_ms = (time.perf_counter() - started) * 1000
+        stacks = sampler.stop() if sampler else Counter()
+        if use_torch:
+            _torch_profiler_lock.release()
+
+    part = {"stage": getattr(fn, "__name__", "stage"), "wall_ms": round(wall_ms, 3)}
+    if options.get("torch") and not use_torch:
+        part["torch_skipped"] = True  # another stage in this process held the torch profiler
+    if prof:
+        prof.create_stats()
+        part["pstats"] = marshal.dumps(prof.stats)
+        stacks = _cprofile_stacks(prof.stats)
+    if use_torch:
+        ops = sorted(torch_prof.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)
+        part["torch_ops"] = [{"op": e.key, "calls": e.count, "self_cpu_ms": round(e.self_cpu_time_total / 1000, 3),
+                              "cpu_total_ms": round(e.cpu_time_total / 1000, 3)} for e in ops[:25]]
+    part["stacks"] = dict(stacks)
+    return result, part
+
+
+# === Request side ===
+class ProfileCapture:
+    """Profile parts collected from the stages of one sampled request."""
+
+    def __init__(self, session: Dict, path: str, method: str):
+        self.session = session
+        self.path = path
+        self.method = method
+        self.options = {"profiler": session["profiler"], "interval_ms": session["interval_ms"],
+                        "torch": session["torch"]}
+        self.parts: List[Dict] = []
+
+    def add(self, part: Dict):
+        self.parts.append(part)
+
+    def document(self, status_code: int, duration_ms: float) -> Dict:
+        # Collapsed stacks are prefixed with the stage, so one flamegraph shows them all
+        stacks = Counter()
+        for part in self.parts:
+            for stack, value in part["stacks"].items():
+                stacks[f"{part['stage']};{stack}"] += value
+        collapsed = "\n".join(f"{stack} {value}" for stack, value in stacks.most_common(MAX_STACKS))
+
+        doc = {
+            "session_id": self.session["_id"],
+            "path": self.path,
+            "method": self.method,
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "profiler": self.options["profiler"],
+            "unit": "microseconds" if self.options["profiler"] == "cprofile" else "samples",
+            "interval_ms": self.options["interval_ms"],
+            "created_at": datetime.now(timezone.utc),
+            "stages": [{k: p[k] for k in ("stage", "wall_ms", "torch_skipped") if k in p} for p in self.parts],
+            "torch_ops": [dict(op, stage=p["stage"]) for p in self.parts for op in p.get("torch_ops", [])],
+            "collapsed": collapsed,
+        }
+        pstats_parts = [p["pstats"] for p in self.parts if "pstats" in p]
+        if pstats_parts:
+            doc["pstats"] = Binary(_merge_pstats(pstats_parts))
+        return doc
+
+def _merge_pstats(parts: List[bytes]) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, data in enumerate(parts):
+            paths.append(os.path.join(tmp, f"{i}.prof"))
+            with open(paths[-1], "wb") as f:
+                f.write(data)
+        merged = os.path.join(tmp, "merged.prof")
+        pstats.Stats(*paths, stream=io.StringIO()).dump_stats(merged)
+        with open(merged, "rb") as f:
+            return f.read()
+
+
+def speedscope(profile: Dict) -> Dict:
+    """speedscope.app JSON ("sampled" profile) from a stored profile's collapsed stacks."""
+    frames, index = [], {}
+    samples, weights = [], []
+    for line in profile["collapsed"].splitlines():
+        stack, _, value = line.rpartition(" ")
+        sample = []
+        for name in stack.split(";"):
+            if name not in index:
+                index[name] = len(frames)
+                frames.append({"name": name})
+            sample.append(index[name])
+        samples.append(sample)
+        weights.append(int(value))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{profile['method']} {profile['path']} ({profile['profiler']})",
+            "unit": "microseconds" if profile["unit"] == "microseconds" else "none",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": str(profile["_id"]),
+        "exporter": "strokesence",
+    }
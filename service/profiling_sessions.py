@@ -0,0 +1,126 @@
+# service/profiling_sessions.py
+
+import asyncio
+import fnmatch
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from db.collections import get_collection
+from service.profiling import PROFILED_PATHS, ProfileCapture
+
+
+class RequestProfiler:
+    """Admin-controlled sampling of live requests (see routes/profiling.py).
+
+    At most one session is active, stored in `profiling_sessions` so every
+    worker follows it (each refreshes every `refresh_s`). A session samples
+    requests to PROFILED_PATHS that match `route` (fnmatch), either 1 in `every_n` per
+    worker or the next `next_k` overall. While no session is active the only
+    per-request cost is reading `self.session`.
+    """
+
+    def __init__(self, refresh_s: float = 5.0):
+        self.refresh_interval = max(0.5, refresh_s)
+        self.session: Optional[Dict] = None
+        self._seen = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def sessions():
+        return get_collection("profiling_sessions")
+
+    @staticmethod
+    def profiles():
+        return get_collection("profiles")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except PyMongoError as e:
+                print(f"⚠️ Could not refresh the profiling session: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self):
+        session = await self.sessions().find_one({"active": True})
+        if session and session["expires_at"].replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+            await self.sessions().update_one({"_id": session["_id"]}, {"$set": {"active": False}})
+            session = None
+        if (session and session["_id"]) != (self.session and self.session["_id"]):
+            self._seen = 0
+        self.session = session
+
+    async def start_session(self, spec: Dict, user: Dict) -> Dict:
+        await self.sessions().update_many({"active": True}, {"$set": {"active": False}})
+        now = datetime.now(timezone.utc)
+        session = {
+            **spec,
+            "active": True,
+            "remaining": spec.get("next_k"),
+            "created_by": user.get("email", str(user["_id"])),
+            "created_at": now,
+            "expires_at": now + timedelta(minutes=spec["ttl_minutes"]),
+        }
+        result = await self.sessions().insert_one(session)
+        session["_id"] = result.inserted_id
+        self.session = session
+        self._seen = 0
+        return session
+
+    async def stop_session(self) -> int:
+        result = await self.sessions().update_many({"active": True}, {"$set": {"active": False}})
+        self.session = None
+        return result.modified_count
+
+    async def begin(self, scope) -> Optional[ProfileCapture]:
+        session = self.session
+        # Other paths would record nothing (and use up "next K" claims)
+        if session is None or scope["path"] not in PROFILED_PATHS \
+                or not fnmatch.fnmatchcase(scope["path"], session["route"]):
+            return None
+        if session.get("every_n"):
+            self._seen += 1
+            if self._seen % session["every_n"]:
+                return None
+        else:
+            # "next K" is shared by all workers: claim one atomically
+            try:
+                claimed = await self.sessions().find_one_and_update(
+                    {"_id": session["_id"], "active": True, "remaining": {"$gt": 0}},
+                    {"$inc": {"remaining": -1}}, return_document=ReturnDocument.AFTER
+                )
+                if claimed is None:
+                    self.session = None
+                    return None
+                if claimed["remaining"] == 0:
+                    await self.sessions().update_one({"_id": session["_id"]}, {"$set": {"active": False}})
+                    self.session = None
+            except PyMongoError as e:
+                # Profiling must never fail the request: this one just isn't sampled
+                print(f"⚠️ Could not claim a profiling sample: {e}")
+                return None
+        return ProfileCapture(session, scope["path"], scope["method"])
+
+    async def finish(self, capture: ProfileCapture, status_code: int, duration_ms: float):
+        if not capture.parts:
+            return  # never reached a profiled stage (e.g. the upload was rejected before decoding)
+        try:
+            # Merging cProfile stats goes through temp files: keep it off the loop
+            document = await asyncio.to_thread(capture.document, status_code, duration_ms)
+            await self.profiles().insert_one(document)
+        except Exception as e:
+            # Called from the middleware's finally: a bad profile must not replace the response
+            print(f"⚠️ Could not store profile for {capture.path}: {e}")
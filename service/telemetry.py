@@ -0,0 +1,122 @@
+# service/telemetry.py
+
+import asyncio
+from collections import Counter, deque
+from typing import Dict, Optional
+from pymongo.errors import PyMongoError
+from db.collections import get_collection
+
+MIN_FLUSH_INTERVAL_MS = 10.0  # 0 would make the background task spin
+
+class TelemetrySink:
+    """Write-behind buffer for request logs/profiles, off the response path.
+
+    push() appends to a bounded in-memory queue and returns immediately. A
+    background task writes everything queued with one insert_many per
+    collection once `batch_size` records are waiting or `flush_interval_ms`
+    has passed. When the queue is full the oldest record is dropped (and
+    counted) rather than making requests wait on Mongo. stop() lets the
+    background task drain what is left, for at most `drain_timeout_s`; records
+    it could not write by then are counted as dropped (still queued) or failed
+    (mid-write).
+    """
+
+    def __init__(self, max_queue: int = 10_000, batch_size: int = 500, flush_interval_ms: float = 1000.0,
+                 drain_timeout_s: float = 10.0):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(MIN_FLUSH_INTERVAL_MS, flush_interval_ms) / 1000.0
+        self.drain_timeout = max(0.0, drain_timeout_s)
+        self._queue = deque(maxlen=max(1, max_queue))
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # 📊 Counters
+        self.pushed = Counter()
+        self.written = Counter()
+        self.dropped = Counter()
+        self.failed = Counter()
+        self.flushes = 0
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # Drain: the task writes whatever is still queued before the Mongo client closes
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the task; flush() counted the batch it was writing
+            for collection, _ in self._queue:
+                self.dropped[collection] += 1
+            print(f"⚠️ Telemetry drain timed out after {self.drain_timeout}s; dropped {len(self._queue)} queued records")
+            self._queue.clear()
+        self._task = None
+
+    def push(self, collection: str, record: Dict):
+        if len(self._queue) == self._queue.maxlen:
+            dropped, _ = self._queue[0]
+            self.dropped[dropped] += 1  # deque(maxlen) evicts it on append
+        self._queue.append((collection, record))
+        self.pushed[collection] += 1
+        if self._wakeup and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        batches: Dict[str, list] = {}
+        for _ in range(min(len(self._queue), self.batch_size)):
+            collection, record = self._queue.popleft()
+            batches.setdefault(collection, []).append(record)
+        if not batches:
+            return
+        self.flushes += 1
+        pending = dict(batches)
+        try:
+            for collection, records in batches.items():
+                try:
+                    await get_collection(collection).insert_many(records, ordered=False)
+                    self.written[collection] += len(records)
+                except PyMongoError as e:
+                    # Telemetry is best effort: count the loss and move on
+                    self.failed[collection] += len(records)
+                    print(f"⚠️ Telemetry write to '{collection}' failed ({len(records)} records): {e}")
+                del pending[collection]
+        except asyncio.CancelledError:
+            # Already off the queue: count them as lost rather than vanish
+            for collection, records in pending.items():
+                self.failed[collection] += len(records)
+            raise
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue:
+                await self.flush()
+                if len(self._queue) < self.batch_size:
+                    break
+        while self._queue:
+            await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "queued": len(self._queue),
+            "max_queue": self._queue.maxlen,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "drain_timeout_s": self.drain_timeout,
+            "flushes": self.flushes,
+            "pushed": dict(self.pushed),
+            "written": dict(self.written),
+            "dropped": dict(self.dropped),
+            "failed": dict(self.failed),
+        }
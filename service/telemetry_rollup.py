@@ -0,0 +1,283 @@
+# service/telemetry_rollup.py
+#
+# Retention and per-minute summaries for the request telemetry that
+# middleware.py writes through service/telemetry.py:
+#
+#   logs, profiling    raw, one document per request; MongoDB time-series
+#                      collections that expire after TELEMETRY_RAW_RETENTION_HOURS
+#   request_rollups    one document per (minute, method, route): count, error
+#                      rate, p50/p95/p99 latency, CPU/RSS; kept for
+#                      TELEMETRY_ROLLUP_RETENTION_DAYS
+#
+# So raw data is downsampled to per-minute summaries, and only the summaries
+# outlive the raw retention window.
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure, PyMongoError
+from db.collections import get_collection
+
+ROLLUP_COLLECTION = "request_rollups"
+STATE_COLLECTION = "telemetry_rollup_state"
+
+# collection -> time field written by the middleware; `route` (the route
+# template) is the meta field, so each endpoint's measurements are bucketed together
+RAW_COLLECTIONS = {"logs": "timestamp", "profiling": "time_stamp"}
+
+
+async def ensure_telemetry_collections(raw_retention_s: int, rollup_retention_s: int):
+    """Create the raw collections as time-series (once), and the rollup indexes.
+
+    Must run before the first telemetry flush: inserting into a missing
+    collection would create a plain one. A plain collection left over from
+    before (it can't be converted in place) keeps working with a TTL index on
+    its time field; rename it away to get a time-series collection. Older
+    versions stored that field as an ISO string, which a TTL index never
+    expires, so those values are converted to dates in place (once; they are
+    all gone afterwards).
+    """
+    for name, time_field in RAW_COLLECTIONS.items():
+        collection = get_collection(name)
+        db = collection.database
+        existing = await (await db.list_collections(filter={"name": name})).to_list(length=1)
+        if not existing:
+            try:
+                await db.create_collection(
+                    name,
+                    timeseries={"timeField": time_field, "metaField": "route", "granularity": "seconds"},
+                    expireAfterSeconds=raw_retention_s
+                )
+                print(f"✅ Created time-series collection '{name}'")
+                continue
+            except CollectionInvalid:
+                pass
+            except OperationFailure as e:
+                # Another worker created it first (the driver only checks up front)
+                if e.code != 48:  # NamespaceExists
+                    raise
+            existing = await (await db.list_collections(filter={"name": name})).to_list(length=1)
+
+        info = existing[0] if existing else {}
+        if info.get("type") == "timeseries":
+            if info.get("options", {}).get("expireAfterSeconds") != raw_retention_s:
+                await db.command({"collMod": name, "expireAfterSeconds": raw_retention_s})
+        elif existing:
+            print(f"⚠️ '{name}' is not a time-series collection; expiring it with a TTL index instead")
+            try:
+                await collection.create_index(time_field, expireAfterSeconds=raw_retention_s)
+            except OperationFailure as e:
+                # Same index with a different TTL: update it in place
+                if e.code != 85:  # IndexOptionsConflict
+                    raise
+                await db.command({"collMod": name, "index": {"keyPattern": {time_field: 1},
+                                                              "expireAfterSeconds": raw_retention_s}})
+            # Server-side, so nothing is read back; anything unparseable expires a
+            # retention period from now
+            result = await collection.update_many({time_field: {"$type": "string"}}, [{"$set": {time_field: {
+                "$dateFromString": {"dateString": f"${time_field}", "onError": "$$NOW"}}}}])
+            if result.modified_count:
+                print(f"✅ Converted {result.modified_count} string '{time_field}' values in '{name}' to dates")
+
+    rollups = get_collection(ROLLUP_COLLECTION)
+    await rollups.create_index([("route", 1), ("method", 1), ("minute", 1)], unique=True)
+    try:
+        await rollups.create_index("minute", expireAfterSeconds=rollup_retention_s)
+    except OperationFailure as e:
+        if e.code != 85:
+            raise
+        await rollups.database.command({"collMod": ROLLUP_COLLECTION, "index": {
+            "keyPattern": {"minute": 1}, "expireAfterSeconds": rollup_retention_s}})
+
+
+def _minute(t: datetime) -> datetime:
+    return t.replace(second=0, microsecond=0)
+
+def _utc(t: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes unless the client is tz_aware
+    return t if t.tzinfo else t.replace(tzinfo=timezone.utc)
+
+# One minute of raw records -> one row per (method, route). Counts are summed
+# server-side; only the latencies come back, for the percentiles.
+def _request_pipeline(since: datetime, end: datetime) -> List[Dict]:
+    status = "$status_code"
+    return [
+        {"$match": {"timestamp": {"$gte": since, "$lt": end}}},
+        {"$group": {
+            "_id": {"method": "$method", "route": {"$ifNull": ["$route", "$path"]}},
+            "errors": {"$sum": {"$cond": [{"$gte": [status, 500]}, 1, 0]}},
+            "client_errors": {"$sum": {"$cond": [{"$and": [{"$gte": [status, 400]}, {"$lt": [status, 500]}]}, 1, 0]}},
+            "durations": {"$push": "$duration"},
+        }},
+    ]
+
+def _usage_pipeline(since: datetime, end: datetime) -> List[Dict]:
+    return [
+        {"$match": {"time_stamp": {"$gte": since, "$lt": end}}},
+        {"$group": {
+            "_id": {"method": "$method", "route": {"$ifNull": ["$route", "$endpoint"]}},
+            "cpu_percent_avg": {"$avg": "$cpu_usage"},
+            "rss_mb_max": {"$max": "$memory_usage"},
+        }},
+    ]
+
+def summarize(minute: datetime, requests: List[Dict], usage: List[Dict]) -> List[Dict]:
+    """Grouped rows for one minute (see the pipelines above) -> one rollup per (method, route)."""
+    process = {(row["_id"]["method"], row["_id"]["route"]): row for row in usage}
+    rollups = []
+    for row in requests:
+        method, route = row["_id"]["method"], row["_id"]["route"]
+        latency = np.asarray(row["durations"], dtype=np.float64) * 1000
+        p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+        count = len(latency)
+        rollup = {
+            "minute": minute,
+            "method": method,
+            "route": route,
+            "count": count,
+            "errors": row["errors"],
+            "client_errors": row["client_errors"],
+            "error_rate": round(row["errors"] / count, 4),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(latency.max()), 3),
+            "mean_ms": round(float(latency.mean()), 3),
+        }
+        if (method, route) in process:
+            rollup["cpu_percent_avg"] = round(float(process[method, route]["cpu_percent_avg"]), 2)
+            rollup["rss_mb_max"] = round(float(process[method, route]["rss_mb_max"]), 2)
+        rollups.append(rollup)
+    return rollups
+
+
+class TelemetryRollup:
+    """Background per-minute rollup of `logs`/`profiling` into `request_rollups`.
+
+    Every `interval_s` it summarizes the whole minutes that ended at least
+    `delay_s` ago (telemetry is written behind the response, so the last
+    seconds are still arriving), one minute at a time so a long backlog never
+    has to be held at once. Progress is a watermark in
+    `telemetry_rollup_state`, moved only after a minute's rollups are written.
+    Workers take turns through a claim on that document; a claim older than
+    `lease_s` (its worker crashed or was cancelled) is taken over, and since
+    rollups are upserts, redoing a minute is harmless. Records that land after
+    their minute was rolled up are not counted.
+    """
+
+    STATE_ID = "request_rollups"
+
+    def __init__(self, interval_s: float = 60.0, delay_s: float = 30.0,
+                 backfill_s: float = 3600.0, lease_s: float = 300.0):
+        self.interval = max(1.0, interval_s)
+        self.delay = timedelta(seconds=max(0.0, delay_s))
+        self.backfill = timedelta(seconds=max(60.0, backfill_s))
+        self.lease = timedelta(seconds=max(10.0, lease_s))
+        self._task: Optional[asyncio.Task] = None
+
+        # 📊 Counters
+        self.runs = 0
+        self.minutes = 0
+        self.rollups_written = 0
+        self.failures = 0
+        self.last_duration_ms = 0.0
+        self.watermark: Optional[datetime] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except PyMongoError as e:
+                self.failures += 1
+                print(f"⚠️ Telemetry rollup failed: {e}")
+
+    async def _claim(self, until: datetime) -> Optional[Tuple[datetime, datetime]]:
+        # Returns the claimed watermark and claim time, or None (caught up, or another worker holds it)
+        state = get_collection(STATE_COLLECTION)
+        doc = await state.find_one({"_id": self.STATE_ID})
+        if doc is None:
+            # First run: start from the backfill window, not from the beginning of time
+            try:
+                await state.insert_one({"_id": self.STATE_ID, "until": _minute(until - self.backfill),
+                                        "claimed_at": None})
+            except DuplicateKeyError:
+                pass
+            doc = await state.find_one({"_id": self.STATE_ID})
+        self.watermark = _utc(doc["until"])
+        if self.watermark >= until:
+            return None
+        now = datetime.now(timezone.utc).replace(microsecond=0)  # stored exactly, so it can be matched again
+        claimed = await state.find_one_and_update(
+            {"_id": self.STATE_ID, "until": doc["until"],
+             "$or": [{"claimed_at": None}, {"claimed_at": {"$lt": now - self.lease}}]},
+            {"$set": {"claimed_at": now}}
+        )
+        return (doc["until"], now) if claimed is not None else None
+
+    async def run_once(self) -> int:
+        """Roll up every whole minute that is due; returns the rollups written."""
+        until = _minute(datetime.now(timezone.utc) - self.delay)
+        state = get_collection(STATE_COLLECTION)
+        written = 0
+        while True:
+            claim = await self._claim(until)
+            if claim is None:
+                return written
+            since, claimed_at = claim
+            end = _utc(since) + timedelta(minutes=1)
+            mine = {"_id": self.STATE_ID, "until": since, "claimed_at": claimed_at}
+            started = time.perf_counter()
+            try:
+                written += await self._roll_up(_utc(since), end)
+            except PyMongoError:
+                # Let the next run retry the minute straight away (else the claim times out)
+                await state.update_one(mine, {"$set": {"claimed_at": None}})
+                raise
+            # Only now does the watermark move; if the claim was taken over
+            # meanwhile this matches nothing and the new holder redoes the minute
+            await state.update_one(mine, {"$set": {"until": end, "claimed_at": None}})
+            self.runs += 1
+            self.minutes += 1
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            self.watermark = end
+
+    async def _roll_up(self, since: datetime, end: datetime) -> int:
+        requests = await (await get_collection("logs").aggregate(_request_pipeline(since, end))).to_list(length=None)
+        usage = await (await get_collection("profiling").aggregate(_usage_pipeline(since, end))).to_list(length=None)
+
+        rollups = summarize(since, requests, usage)
+        if rollups:
+            # Upserts keyed on (route, method, minute): re-running a minute is harmless
+            await get_collection(ROLLUP_COLLECTION).bulk_write([
+                UpdateOne({"route": r["route"], "method": r["method"], "minute": r["minute"]},
+                          {"$set": r}, upsert=True)
+                for r in rollups
+            ], ordered=False)
+        self.rollups_written += len(rollups)
+        return len(rollups)
+
+    def stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "minutes": self.minutes,
+            "rollups_written": self.rollups_written,
+            "failures": self.failures,
+            "last_duration_ms": self.last_duration_ms,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+        }
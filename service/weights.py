@@ -0,0 +1,82 @@
+# service/weights.py
+
+import glob
+import json
+import os
+import struct
+from typing import Dict
+import torch
+
+# safetensors dtype tags -> torch dtypes
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+def mmap_safetensors(path: str) -> Dict[str, torch.Tensor]:
+    """Map a .safetensors file and return tensors that are views into the mapping.
+
+    The file is mapped MAP_PRIVATE (copy-on-write): nothing is read up front,
+    and every process mapping the same file shares the same page-cache pages
+    until something writes to them, which inference never does.
+    """
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    header.pop("__metadata__", None)
+
+    data_start = 8 + header_len
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    raw = torch.empty(0, dtype=torch.uint8).set_(storage)
+
+    tensors = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        offset = data_start + begin
+        itemsize = torch.empty(0, dtype=dtype).element_size()
+        if offset % itemsize:
+            # Misaligned for this dtype; can't view in place, so take a private copy
+            tensors[name] = raw[offset:data_start + end].clone().view(dtype).reshape(info["shape"])
+        else:
+            tensors[name] = raw[offset:data_start + end].view(dtype).reshape(info["shape"])
+    return tensors
+
+def share_weights_from_safetensors(model: torch.nn.Module, model_path: str) -> Dict:
+    """Point the model's parameters/buffers at memory-mapped safetensors data.
+
+    The privately loaded copies are released, so the weights' resident memory is
+    shared by every worker process on the node instead of duplicated per worker.
+    Tensors whose name or shape doesn't match the checkpoint keep their private
+    copy (e.g. weight-norm parametrizations renamed at load time).
+    """
+    files = sorted(glob.glob(os.path.join(model_path, "*.safetensors")))
+    if not files:
+        raise FileNotFoundError(
+            f"No .safetensors files in {model_path}. Run `python export_speech_model.py safetensors` first."
+        )
+
+    mapped = {}
+    for path in files:
+        mapped.update(mmap_safetensors(path))
+
+    shared, private = 0, 0
+    with torch.no_grad():
+        for name, tensor in list(model.named_parameters()) + list(model.named_buffers()):
+            source = mapped.get(name)
+            if source is not None and source.shape == tensor.shape and source.dtype == tensor.dtype:
+                tensor.data = source
+                shared += tensor.numel() * tensor.element_size()
+            else:
+                private += tensor.numel() * tensor.element_size()
+
+    print(f"🔗 Weights memory-mapped: {shared / 2**20:.1f} MiB shared, {private / 2**20:.1f} MiB private")
+    return {"shared_bytes": shared, "private_bytes": private}
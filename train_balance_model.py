@@ -0,0 +1,104 @@
+# train_balance_model.py
+#
+# Fits the balance classifier served by /api/v1/analyze_balance
+# (service/balance_model.py) and writes it as JSON:
+#
+#   python train_balance_model.py --data "sessions/*.npz" --output outputs/balance_classifier.json
+#
+# Each .npz holds one session: `accel` and `gyro` shaped (n, 3), `label`
+# (1 = stroke, 0 = normal) and optionally `sample_rate` in Hz.
+# `--synthetic N` trains on generated sessions instead; that only exercises the
+# pipeline and must not be deployed.
+
+import argparse
+import glob
+import json
+import os
+from collections import defaultdict
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from service.balance import DEFAULT_SAMPLE_RATE, FEATURE_NAMES, extract_features_batch, stack_sessions
+from service.balance_model import BalanceClassifier
+
+
+def _load_sessions(pattern: str):
+    sessions = []
+    for path in sorted(glob.glob(pattern)):
+        with np.load(path) as data:
+            rate = float(data["sample_rate"]) if "sample_rate" in data else DEFAULT_SAMPLE_RATE
+            sessions.append((data["accel"], data["gyro"], int(data["label"]), rate))
+    return sessions
+
+def _synthetic_sessions(count: int, seed: int):
+    # Same noise profiles check_route.py uses, plus a tremor component for "stroke"
+    from benchmarks.synthetic import balance_session
+    rng = np.random.default_rng(seed)
+    sessions = []
+    for i in range(count):
+        label = int(rng.integers(0, 2))
+        samples = int(rng.integers(250, 1500))
+        accel, gyro = balance_session(samples, sway=0.08 if label else rng.choice([0.02, 0.05]), seed=seed + i)
+        if label:
+            t = np.arange(samples) / DEFAULT_SAMPLE_RATE
+            accel[:, 2] += 0.05 * np.sin(2 * np.pi * rng.uniform(4, 8) * t)
+        sessions.append((accel, gyro, label, DEFAULT_SAMPLE_RATE))
+    return sessions
+
+def _features(sessions) -> np.ndarray:
+    # The spectral features need one sample rate per batch
+    by_rate = defaultdict(list)
+    for index, (_, _, _, rate) in enumerate(sessions):
+        by_rate[rate].append(index)
+
+    features = np.empty((len(sessions), len(FEATURE_NAMES)))
+    for rate, indices in by_rate.items():
+        accel, lengths = stack_sessions([sessions[i][0] for i in indices])
+        gyro, _ = stack_sessions([sessions[i][1] for i in indices])
+        features[indices] = extract_features_batch(accel, gyro, lengths, rate)
+    return features
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the balance classifier")
+    parser.add_argument("--data", default=None, help="Glob of labelled .npz sessions")
+    parser.add_argument("--synthetic", type=int, default=0, help="Train on N generated sessions (pipeline test only)")
+    parser.add_argument("--output", default="outputs/balance_classifier.json")
+    parser.add_argument("--version", default="lr-v1")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.data:
+        sessions = _load_sessions(args.data)
+        version = args.version
+    elif args.synthetic:
+        sessions = _synthetic_sessions(args.synthetic, args.seed)
+        version = f"{args.version}-synthetic"
+    else:
+        parser.error("Pass --data or --synthetic")
+    if not sessions:
+        parser.error("No sessions found")
+
+    X = _features(sessions)
+    y = np.array([label for _, _, label, _ in sessions])
+    print(f"📊 {len(y)} sessions, {int(y.sum())} stroke / {int(len(y) - y.sum())} normal")
+
+    pipeline = make_pipeline(StandardScaler(), LogisticRegression(class_weight="balanced", max_iter=1000))
+    folds = min(5, int(np.bincount(y).min()))
+    if folds >= 2:
+        auc = cross_val_score(pipeline, X, y, cv=folds, scoring="roc_auc")
+        print(f"📈 {folds}-fold ROC AUC: {auc.mean():.3f} ± {auc.std():.3f}")
+
+    pipeline.fit(X, y)
+    scaler, model = pipeline[0], pipeline[1]
+    classifier = BalanceClassifier(
+        version, FEATURE_NAMES, scaler.mean_, scaler.scale_, model.coef_[0], model.intercept_[0], args.threshold
+    )
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(classifier.to_dict(), f, indent=2)
+    print(f"📝 Classifier written to {args.output}")
@@ -0,0 +1,190 @@
+# utils/artifact_sync.py
+import base64
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import google_crc32c
+
+MANIFEST_NAME = ".artifact_manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+# === Checksums (base64 digests, same encoding GCS uses) ===
+def file_md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode()
+
+def file_crc32c(path: str) -> str:
+    checksum = google_crc32c.Checksum()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            checksum.update(chunk)
+    return base64.b64encode(checksum.digest()).decode()
+
+
+# === Sources ===
+class GCSArtifactSource:
+    """Blobs under `prefix` in a GCS bucket."""
+
+    def __init__(self, bucket_name: str, prefix: str):
+        from google.cloud import storage
+        self.bucket = storage.Client().bucket(bucket_name)
+        self.prefix = prefix
+
+    def list(self) -> List[Dict]:
+        entries = []
+        for blob in self.bucket.client.list_blobs(self.bucket, prefix=self.prefix):
+            if blob.name.endswith("/"):
+                continue  # folder placeholder objects
+            entries.append({
+                "name": blob.name[len(self.prefix):].lstrip("/"),
+                "blob": blob.name,
+                "size": blob.size,
+                "md5": blob.md5_hash,  # None for composite objects
+                "crc32c": blob.crc32c,
+            })
+        return entries
+
+    def download(self, entry: Dict, dest_path: str):
+        self.bucket.blob(entry["blob"]).download_to_filename(dest_path)
+
+
+class LocalArtifactSource:
+    """A plain directory standing in for the bucket (offline runs and tests)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def list(self) -> List[Dict]:
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                entries.append({
+                    "name": os.path.relpath(path, self.root).replace(os.sep, "/"),
+                    "size": os.path.getsize(path),
+                    "md5": file_md5(path),
+                    "crc32c": None,
+                })
+        return entries
+
+    def download(self, entry: Dict, dest_path: str):
+        shutil.copyfile(os.path.join(self.root, entry["name"]), dest_path)
+
+
+# === Manifest ===
+def _manifest_path(local_dir: str) -> str:
+    return os.path.join(local_dir, MANIFEST_NAME)
+
+def load_manifest(local_dir: str) -> Dict:
+    # {"complete": bool, "files": {name: {"size", "md5", "crc32c"}}}
+    try:
+        with open(_manifest_path(local_dir)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"complete": False, "files": {}}
+
+def _write_manifest(local_dir: str, manifest: Dict):
+    tmp_path = f"{_manifest_path(local_dir)}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, _manifest_path(local_dir))
+
+def is_usable(local_dir: str) -> bool:
+    """True if `local_dir` holds a complete copy we can serve without syncing."""
+    if os.path.exists(_manifest_path(local_dir)):
+        return bool(load_manifest(local_dir).get("complete"))
+    # Populated outside the sync (e.g. baked into the image)
+    return os.path.isdir(local_dir) and bool(os.listdir(local_dir))
+
+
+# === Sync ===
+def _is_current(entry: Dict, recorded: Optional[Dict], local_path: str) -> bool:
+    if not recorded or not os.path.exists(local_path):
+        return False
+    if os.path.getsize(local_path) != entry["size"]:
+        return False
+    for key in ("md5", "crc32c"):
+        if entry.get(key):
+            return recorded.get(key) == entry[key]
+    return recorded.get("size") == entry["size"]
+
+def _verify(entry: Dict, path: str):
+    if os.path.getsize(path) != entry["size"]:
+        raise IOError(f"Size mismatch for {entry['name']}")
+    if entry.get("md5"):
+        if file_md5(path) != entry["md5"]:
+            raise IOError(f"MD5 mismatch for {entry['name']}")
+    elif entry.get("crc32c"):
+        if file_crc32c(path) != entry["crc32c"]:
+            raise IOError(f"CRC32C mismatch for {entry['name']}")
+
+def sync_artifacts(source, local_dir: str, max_workers: int = 8) -> Dict:
+    """Mirror `source` into `local_dir`, fetching only new or changed files.
+
+    Each file is downloaded to a temp name, checksum-verified, then renamed into
+    place, and the manifest is updated after every file, so an interrupted sync
+    resumes where it stopped instead of leaving a broken model directory.
+    Files that aren't tracked in the manifest (e.g. a locally exported
+    model.onnx) are never touched.
+    """
+    os.makedirs(local_dir, exist_ok=True)
+    manifest = load_manifest(local_dir)
+    files = manifest["files"]
+    remote = {entry["name"]: entry for entry in source.list()}
+    lock = threading.Lock()
+
+    pending = [
+        entry for name, entry in remote.items()
+        if not _is_current(entry, files.get(name), os.path.join(local_dir, name))
+    ]
+    if pending:
+        manifest["complete"] = False
+        _write_manifest(local_dir, manifest)
+
+    def fetch(entry: Dict):
+        local_path = os.path.join(local_dir, entry["name"])
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        tmp_path = f"{local_path}.{uuid.uuid4().hex}.part"
+        print(f"⬇️ Downloading {entry['name']} → {local_path}")
+        try:
+            source.download(entry, tmp_path)
+            _verify(entry, tmp_path)
+            os.replace(tmp_path, local_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with lock:
+            files[entry["name"]] = {k: entry.get(k) for k in ("size", "md5", "crc32c")}
+            _write_manifest(local_dir, manifest)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        # list() so the first download error is raised here
+        list(pool.map(fetch, pending))
+
+    # Drop files that were removed from the source since the last sync
+    removed = [name for name in files if name not in remote]
+    for name in removed:
+        local_path = os.path.join(local_dir, name)
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        del files[name]
+    manifest["complete"] = True
+    _write_manifest(local_dir, manifest)
+
+    summary = {
+        "total": len(remote),
+        "downloaded": len(pending),
+        "unchanged": len(remote) - len(pending),
+        "removed": len(removed),
+    }
+    print(f"✅ Artifacts in sync: {summary}")
+    return summary
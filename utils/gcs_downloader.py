@@ -1,15 +1,6 @@
 # utils/gcs_downloader.py
-import os
-from google.cloud import storage
+from utils.artifact_sync import GCSArtifactSource, sync_artifacts
 
-def download_folder(bucket_name: str, prefix: str, local_dir: str):
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-
-    blobs = bucket.list_blobs(prefix=prefix)
-    for blob in blobs:
-        relative_path = blob.name[len(prefix):].lstrip('/')
-        local_path = os.path.join(local_dir, relative_path)
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        print(f"⬇️ Downloading {blob.name} → {local_path}")
-        blob.download_to_filename(local_path)
+def download_folder(bucket_name: str, prefix: str, local_dir: str, max_workers: int = 8):
+    # Incremental, checksum-verified mirror of gs://bucket/prefix (see utils/artifact_sync.py)
+    return sync_artifacts(GCSArtifactSource(bucket_name, prefix), local_dir, max_workers=max_workers)
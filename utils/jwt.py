@@ -4,7 +4,7 @@ from passlib.context import CryptContext
 from typing import Optional
 from config import settings
 from utils import hashing
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer
 from deps.mongo import get_users_collection
 from pymongo.asynchronous.collection import AsyncCollection
@@ -51,10 +51,7 @@ def decode_access_token(token: str) -> dict:
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    users_col: AsyncCollection = Depends(get_users_collection)
-):
+async def user_from_token(token: str, users_col: AsyncCollection):
     try:
         payload = decode_access_token(token)
         user_id = payload.get("sub")
@@ -72,4 +69,32 @@ async def get_current_user(
 
         return user
     except Exception as e:
-        raise HTTPException(status_code=401, detail=f"Invalid credentials, error :- {e}")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail=f"Invalid credentials, error :- {e}")
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    users_col: AsyncCollection = Depends(get_users_collection)
+):
+    return await user_from_token(token, users_col)
+
+async def get_current_admin(current_user: dict = Depends(get_current_user)):
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+# WebSockets can't send an Authorization header from browsers, so the access
+# token may also come as ?token=...
+async def get_current_user_ws(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    users_col: AsyncCollection = Depends(get_users_collection)
+):
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    if not token:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated")
+    try:
+        return await user_from_token(token, users_col)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
\ No newline at end of file
@@ -0,0 +1,162 @@
+# utils/sensor_codec.py
+#
+# Binary accelerometer/gyroscope payloads for /api/v1/analyze_balance.
+# Every format is decoded with np.frombuffer straight over the request body,
+# so no per-float Python objects are created.
+#
+# application/x-imu-f32 (raw), little-endian:
+#   magic   4s   b"IMU1"
+#   version u16  1
+#   axes    u16  3
+#   samples u32  n
+#   rate    f32  sample rate in Hz (0 = unknown)
+#   accel   f32[n * 3]
+#   gyro    f32[n * 3]
+#
+# application/x-npy: one .npy array shaped (n, 6) as [ax ay az gx gy gz] or (2, n, 3).
+#
+# application/msgpack: {"accel": <bin>, "gyro": <bin>, "sample_rate": float}
+#   where each bin is little-endian float32 (n * 3); nested lists also work.
+
+import ast
+import struct
+from typing import Optional, Tuple
+import msgpack
+import numpy as np
+
+RAW_HEADER = struct.Struct("<4sHHIf")
+RAW_MAGIC = b"IMU1"
+RAW_VERSION = 1
+MAX_SAMPLE_RATE = 10_000.0  # Hz; wearable IMUs run at tens to hundreds
+
+RAW_CONTENT_TYPES = ("application/x-imu-f32", "application/octet-stream")
+NPY_CONTENT_TYPES = ("application/x-npy", "application/npy")
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+BINARY_CONTENT_TYPES = RAW_CONTENT_TYPES + NPY_CONTENT_TYPES + MSGPACK_CONTENT_TYPES
+
+class SensorPayloadError(ValueError):
+    """The body could not be decoded into valid (n, 3) accel/gyro arrays."""
+
+
+def encode_raw(accel: np.ndarray, gyro: np.ndarray, sample_rate: float = 0.0) -> bytes:
+    """Client-side helper (and tests/benchmarks): pack arrays into the raw format."""
+    accel = np.ascontiguousarray(accel, dtype="<f4")
+    gyro = np.ascontiguousarray(gyro, dtype="<f4")
+    header = RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, 3, len(accel), sample_rate)
+    return header + accel.tobytes() + gyro.tobytes()
+
+
+def _decode_raw(body: bytes) -> Tuple[np.ndarray, np.ndarray, Optional[float]]:
+    if len(body) < RAW_HEADER.size:
+        raise SensorPayloadError("Body is shorter than the IMU1 header")
+    magic, version, axes, samples, rate = RAW_HEADER.unpack_from(body)
+    if magic != RAW_MAGIC or version != RAW_VERSION:
+        raise SensorPayloadError(f"Unsupported header {magic!r} v{version}, expected {RAW_MAGIC!r} v{RAW_VERSION}")
+    if axes != 3:
+        raise SensorPayloadError(f"Expected 3 axes, got {axes}")
+
+    count = samples * 3
+    expected = RAW_HEADER.size + 2 * count * 4
+    if len(body) != expected:
+        raise SensorPayloadError(f"Body is {len(body)} bytes, header describes {expected}")
+    data = np.frombuffer(body, dtype="<f4", count=2 * count, offset=RAW_HEADER.size)
+    return data[:count].reshape(samples, 3), data[count:].reshape(samples, 3), (rate or None)
+
+
+def _decode_npy(body: bytes) -> Tuple[np.ndarray, np.ndarray, Optional[float]]:
+    # Parse the .npy header by hand so the data itself is a view over `body`
+    if not body.startswith(b"\x93NUMPY") or len(body) < 10:
+        raise SensorPayloadError("Not a .npy payload")
+    major = body[6]
+    if major == 1:
+        (header_len,) = struct.unpack_from("<H", body, 8)
+        data_start = 10 + header_len
+    elif major in (2, 3):
+        (header_len,) = struct.unpack_from("<I", body, 8)
+        data_start = 12 + header_len
+    else:
+        raise SensorPayloadError(f"Unsupported .npy version {major}")
+
+    try:
+        header = ast.literal_eval(body[data_start - header_len:data_start].decode("latin1"))
+        dtype = np.dtype(header["descr"])
+        shape = tuple(header["shape"])
+    except (ValueError, SyntaxError, KeyError, TypeError) as e:
+        raise SensorPayloadError(f"Invalid .npy header: {e}")
+    if dtype.kind != "f" or dtype.hasobject:
+        raise SensorPayloadError(f"Expected a float array, got {dtype}")
+
+    count = int(np.prod(shape))
+    if len(body) - data_start != count * dtype.itemsize:
+        raise SensorPayloadError("The .npy data length doesn't match its header")
+    order = "F" if header.get("fortran_order") else "C"
+    array = np.frombuffer(body, dtype=dtype, count=count, offset=data_start).reshape(shape, order=order)
+
+    if array.ndim == 2 and array.shape[1] == 6:
+        return array[:, :3], array[:, 3:], None
+    if array.ndim == 3 and array.shape[0] == 2 and array.shape[2] == 3:
+        return array[0], array[1], None
+    raise SensorPayloadError(f"Expected shape (n, 6) or (2, n, 3), got {array.shape}")
+
+
+def _msgpack_array(value, name: str) -> np.ndarray:
+    if isinstance(value, bytes):
+        if len(value) % 12:
+            raise SensorPayloadError(f"'{name}' is {len(value)} bytes, not a whole number of float32 triples")
+        return np.frombuffer(value, dtype="<f4").reshape(-1, 3)
+    try:
+        return np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise SensorPayloadError(f"'{name}' must be float32 bytes or a list of [x, y, z] rows")
+
+def _decode_msgpack(body: bytes) -> Tuple[np.ndarray, np.ndarray, Optional[float]]:
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except (msgpack.UnpackException, ValueError) as e:
+        raise SensorPayloadError(f"Invalid msgpack body: {e}")
+    if not isinstance(payload, dict) or "accel" not in payload or "gyro" not in payload:
+        raise SensorPayloadError("msgpack body must be a map with 'accel' and 'gyro'")
+    rate = payload.get("sample_rate")
+    return _msgpack_array(payload["accel"], "accel"), _msgpack_array(payload["gyro"], "gyro"), rate
+
+
+def validate_sample_rate(rate) -> Optional[float]:
+    """None/0 means unknown; anything else must be a finite rate in (0, MAX_SAMPLE_RATE] Hz."""
+    if rate is None or (isinstance(rate, (int, float)) and not isinstance(rate, bool) and rate == 0):
+        return None
+    if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not np.isfinite(rate):
+        raise SensorPayloadError(f"sample_rate must be a number, got {rate!r}")
+    if not 0 < rate <= MAX_SAMPLE_RATE:
+        raise SensorPayloadError(f"sample_rate must be between 0 and {MAX_SAMPLE_RATE:g} Hz, got {rate:g}")
+    return float(rate)
+
+
+def validate_sensor_arrays(accel: np.ndarray, gyro: np.ndarray, max_samples: int, min_samples: int = 2):
+    """Shape, size and finiteness checks, each a single vectorized pass."""
+    for name, array in (("accel", accel), ("gyro", gyro)):
+        if array.ndim != 2 or array.shape[1] != 3:
+            raise SensorPayloadError(f"'{name}' must be shaped (n, 3), got {array.shape}")
+    if len(accel) != len(gyro):
+        raise SensorPayloadError(f"accel has {len(accel)} samples but gyro has {len(gyro)}")
+    if len(accel) < min_samples:
+        raise SensorPayloadError(f"At least {min_samples} samples are required")
+    if len(accel) > max_samples:
+        raise SensorPayloadError(f"{len(accel)} samples exceeds the limit of {max_samples}")
+    if not (np.isfinite(accel).all() and np.isfinite(gyro).all()):
+        raise SensorPayloadError("Sensor values must be finite (no NaN/inf)")
+
+
+def decode_sensor_payload(body: bytes, content_type: str, max_samples: int, min_samples: int = 2):
+    """Decode a binary body into (accel, gyro, sample_rate); arrays are read-only views of `body`."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in RAW_CONTENT_TYPES:
+        accel, gyro, rate = _decode_raw(body)
+    elif media_type in NPY_CONTENT_TYPES:
+        accel, gyro, rate = _decode_npy(body)
+    elif media_type in MSGPACK_CONTENT_TYPES:
+        accel, gyro, rate = _decode_msgpack(body)
+    else:
+        raise SensorPayloadError(f"Unsupported content type '{media_type}'")
+
+    validate_sensor_arrays(accel, gyro, max_samples, min_samples)
+    return accel, gyro, validate_sample_rate(rate)
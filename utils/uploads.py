@@ -0,0 +1,38 @@
+# utils/uploads.py
+import asyncio
+from typing import AsyncIterator
+from fastapi import UploadFile
+
+CHUNK_SIZE = 1024 * 1024
+
+class UploadTooLargeError(ValueError):
+    pass
+
+async def upload_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await upload.read(CHUNK_SIZE):
+        yield chunk
+
+async def spool_to_file(chunks: AsyncIterator[bytes], path: str, max_bytes: int) -> int:
+    """Write a streamed body to `path` without blocking the event loop; returns the byte count.
+
+    Chunks are gathered into ~1 MB writes that run in a worker thread.
+    Raises UploadTooLargeError once more than `max_bytes` arrive; the partial
+    file is left for the caller to remove.
+    """
+    written = 0
+    pending = bytearray()
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for chunk in chunks:
+            written += len(chunk)
+            if written > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+            pending += chunk
+            if len(pending) >= CHUNK_SIZE:
+                await asyncio.to_thread(f.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await asyncio.to_thread(f.write, bytes(pending))
+    finally:
+        await asyncio.to_thread(f.close)
+    return written